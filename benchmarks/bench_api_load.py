@@ -0,0 +1,435 @@
+# This script is developed to load test the serving API and catch throughput regressions.
+# It fits a stand-in model on the Iris data and seeds it into a temporary model cache, so the API starts
+# under uvicorn on localhost without MLflow or /app/mlruns. Keep-alive connections then drive /predict
+# with a configurable request mix, and it reports RPS, p50/p95/p99 latency and per-worker CPU/RSS.
+# Results are written as JSON and can be compared against a stored baseline with a pass/fail threshold.
+#
+# Usage:
+#   python benchmarks/bench_api_load.py --concurrency 32 --duration-s 15 --output load.json
+#   python benchmarks/bench_api_load.py --mix valid=80,invalid=10,missing=5,batch=5 --workers 2
+#   python benchmarks/bench_api_load.py --launcher --workers 4
+#   python benchmarks/bench_api_load.py --set serving.batching.enabled=true --baseline load.json --threshold 0.1
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.datasets import load_iris
+from sklearn.preprocessing import StandardScaler
+
+from common import project_root, read_repo_config
+from src.api.model_loader import store_local_model
+from src.drift import build_reference
+from src.feature_transform import FEATURE_COLUMNS, RAW_COLUMNS, FeatureTransform, engineer
+from src.model_builder import get_model
+
+# Expected status per request kind; anything else counts as an error
+EXPECTED_STATUS = {"valid": 200, "invalid": 422, "missing": 422, "batch": 200}
+
+# Summary metrics checked against the baseline, and whether higher is better
+CHECKED_METRICS = [("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)]
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        kind, weight = part.split("=")
+        if kind not in EXPECTED_STATUS:
+            raise ValueError(f"Unknown request kind '{kind}', expected one of {list(EXPECTED_STATUS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def apply_overrides(config: dict, overrides: list):
+    """Applies dotted KEY=VALUE overrides, with values parsed as YAML (e.g. serving.batching.enabled=true)."""
+    for override in overrides:
+        key, value = override.split("=", 1)
+        node = config
+        *parents, leaf = key.split(".")
+        for name in parents:
+            node = node.setdefault(name, {})
+        node[leaf] = yaml.safe_load(value)
+
+
+def prepare_app(workdir: str, model_name: str, overrides: list) -> str:
+    """Fits the stand-in model, seeds the model cache and writes the API config; returns the config path."""
+    config = read_repo_config()
+    raw, labels = load_iris(return_X_y=True)
+    features = engineer(raw)
+    transform = FeatureTransform.from_scaler(StandardScaler().fit(pd.DataFrame(features, columns=FEATURE_COLUMNS)))
+    X = pd.DataFrame(transform.transform(raw), columns=FEATURE_COLUMNS)
+    estimator = get_model(model_name, config["models"][model_name]["params"]).fit(X, labels)
+
+    cache_dir = os.path.join(workdir, "model_cache")
+    store_local_model(cache_dir, config["model"]["registry_name"], "1", estimator, transform,
+                      drift_reference=build_reference(raw, labels))
+
+    serving = config.setdefault("serving", {})
+    serving["model_cache_dir"] = cache_dir
+    serving["registry_ttl_s"] = 10**9  # never ask the registry; the seeded version is served
+    serving.setdefault("hot_reload", {})["enabled"] = False
+    # Start serving once the model is loaded, so no request of the run sees a 503
+    serving.setdefault("startup", {})["background_init"] = False
+    serving.setdefault("logging", {})["file"] = os.path.join(workdir, "prediction.log")
+    serving.setdefault("log_storage", {}).setdefault("segments", {})["directory"] = os.path.join(workdir, "segments")
+    apply_overrides(config, overrides)
+
+    config_path = os.path.join(workdir, "model_config.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+    return config_path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(workdir: str, config_path: str) -> dict:
+    """Environment for an API process using the config, log database and MLflow store under `workdir`."""
+    return dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([project_root, os.path.join(project_root, "src")]),
+        MODEL_CONFIG_PATH=config_path,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'logs.db')}",
+        MLFLOW_TRACKING_URI=f"file:{os.path.join(workdir, 'mlruns')}",
+    )
+
+
+def start_server(workdir: str, config_path: str, port: int, workers: int, launcher: bool = False) -> subprocess.Popen:
+    """Starts uvicorn, or the preforking launcher (src/api/server.py), and waits until every worker serves."""
+    env = server_env(workdir, config_path)
+    log = open(os.path.join(workdir, "server.log"), "w")
+    if launcher:
+        command = [sys.executable, "-m", "src.api.server", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--metrics-dir", os.path.join(workdir, "metrics")]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "src.api.app:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--no-access-log"]
+    server = subprocess.Popen(command, cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode}; see {log.name}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            # The port answers once the first worker is up; wait for the others too
+            with open(log.name) as f:
+                if f.read().count("Application startup complete") >= workers:
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server did not become ready; see {log.name}")
+
+
+def _is_helper(pid: int) -> bool:
+    """multiprocessing's resource tracker is also a child of the uvicorn supervisor."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"resource_tracker" in f.read()
+    except OSError:
+        return True
+
+
+def worker_pids(server_pid: int) -> list:
+    """The uvicorn process and its worker children (only the server itself with --workers 1)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == server_pid and not _is_helper(int(entry)):
+                children.append(int(entry))
+    return [server_pid] + sorted(children)
+
+
+# /proc/<pid>/smaps_rollup fields: PSS splits shared pages between the processes mapping them,
+# and private (USS) pages are what each extra worker really costs
+SMAPS_FIELDS = {"Pss:": "pss_mb", "Private_Clean:": "uss_mb", "Private_Dirty:": "uss_mb"}
+
+
+def process_stats(pid: int):
+    """CPU seconds, RSS, PSS and USS of `pid`, or None if it has exited."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = f.readlines()
+    except OSError:
+        return None
+    stats = {"cpu_s": (int(fields[11]) + int(fields[12])) / CLK_TCK}
+    for line in status:
+        if line.startswith(("VmRSS:", "VmHWM:")):
+            key = "rss_mb" if line.startswith("VmRSS") else "peak_rss_mb"
+            stats[key] = int(line.split()[1]) / 1024
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, *values = line.split()
+                if name in SMAPS_FIELDS:
+                    key = SMAPS_FIELDS[name]
+                    stats[key] = stats.get(key, 0.0) + int(values[0]) / 1024
+    except OSError:
+        pass
+    return stats
+
+
+def request_pool(kind: str, rng: random.Random, size: int, batch_rows: int) -> list:
+    """Pre-encoded (path, body) pairs for a request kind, so the client does no JSON work while timing."""
+    raw, _ = load_iris(return_X_y=True)
+
+    def row():
+        values = raw[rng.randrange(len(raw))] + [rng.gauss(0, 0.05) for _ in RAW_COLUMNS]
+        return {col: round(float(v), 3) for col, v in zip(RAW_COLUMNS, values)}
+
+    pool = []
+    for _ in range(size):
+        if kind == "valid":
+            path, payload = "/predict", row()
+        elif kind == "invalid":
+            path, payload = "/predict", dict(row(), sepal_length="not-a-number")
+        elif kind == "missing":
+            payload = row()
+            payload.pop(rng.choice(RAW_COLUMNS))
+            path = "/predict"
+        else:
+            path, payload = "/predict/batch", [row() for _ in range(batch_rows)]
+        pool.append((path, json.dumps(payload).encode()))
+    return pool
+
+
+def encode_request(path: str, body: bytes, headers: dict = None) -> bytes:
+    extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    return (f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n{extra}"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def exchange(reader, writer, request: bytes) -> tuple:
+    """Sends an encoded request on a keep-alive connection and reads the response; returns (status, close)."""
+    writer.write(request)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, close = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "connection" and value.strip().lower() == "close":
+            close = True
+    await reader.readexactly(length)
+    return status, close
+
+
+async def connection(port: int, pools: dict, mix: dict, seed: int, stop_at: float, measure_from: float,
+                     results: dict):
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < stop_at:
+            kind = rng.choices(kinds, weights)[0]
+            path, body = rng.choice(pools[kind])
+            request = encode_request(path, body)
+
+            start = time.perf_counter()
+            status, close = await exchange(reader, writer, request)
+            end = time.perf_counter()
+
+            if start >= measure_from:
+                results[kind].append((end - start, status))
+            if close:
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    finally:
+        writer.close()
+
+
+def latency_summary(latencies) -> dict:
+    ms = np.asarray(latencies) * 1000.0
+    if len(ms) == 0:
+        return {}
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def run_load(port: int, server_pid: int, args, mix: dict) -> dict:
+    rng = random.Random(args.seed)
+    pools = {kind: request_pool(kind, rng, 256, args.batch_rows) for kind in mix}
+    results = defaultdict(list)
+
+    async def drive():
+        now = time.perf_counter()
+        measure_from = now + args.warmup_s
+        stop_at = measure_from + args.duration_s
+        await asyncio.gather(*(
+            connection(port, pools, mix, args.seed + i, stop_at, measure_from, results)
+            for i in range(args.concurrency)
+        ))
+
+    before = {}
+
+    async def snapshot_after_warmup():
+        await asyncio.sleep(args.warmup_s)
+        for pid in worker_pids(server_pid):
+            before[pid] = process_stats(pid)
+
+    async def main():
+        await asyncio.gather(drive(), snapshot_after_warmup())
+
+    asyncio.run(main())
+    after = {pid: process_stats(pid) for pid in before}
+
+    workers = [
+        {
+            "pid": pid,
+            "role": "server" if pid == server_pid else "worker",
+            "cpu_percent": 100.0 * (after[pid]["cpu_s"] - before[pid]["cpu_s"]) / args.duration_s,
+            "rss_mb": after[pid].get("rss_mb"),
+            "peak_rss_mb": after[pid].get("peak_rss_mb"),
+            "pss_mb": after[pid].get("pss_mb"),
+            "uss_mb": after[pid].get("uss_mb"),
+        }
+        for pid in before
+        if before[pid] is not None and after[pid] is not None
+    ]
+
+    all_latencies, errors, total = [], 0, 0
+    by_kind = {}
+    for kind, samples in results.items():
+        statuses = Counter(status for _, status in samples)
+        kind_errors = sum(n for status, n in statuses.items() if status != EXPECTED_STATUS[kind])
+        latencies = [latency for latency, _ in samples]
+        all_latencies.extend(latencies)
+        errors += kind_errors
+        total += len(samples)
+        by_kind[kind] = {
+            "requests": len(samples),
+            "rps": len(samples) / args.duration_s,
+            "errors": kind_errors,
+            "status": {str(status): n for status, n in sorted(statuses.items())},
+            **latency_summary(latencies),
+        }
+
+    return {
+        "summary": {"requests": total, "rps": total / args.duration_s, "errors": errors,
+                    **latency_summary(all_latencies)},
+        "by_kind": by_kind,
+        "workers": workers,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Prints the comparison with the baseline summary and returns True if every metric is within threshold."""
+    passed = True
+    print(f"\n{'metric':<10}{'baseline':>12}{'current':>12}{'change':>10}  result")
+    for metric, higher_is_better in CHECKED_METRICS:
+        old, new = baseline["summary"].get(metric), current["summary"].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        regressed = change < -threshold if higher_is_better else change > threshold
+        passed &= not regressed
+        print(f"{metric:<10}{old:>12.2f}{new:>12.2f}{change:>+9.1%}  {'FAIL' if regressed else 'ok'}")
+    if current["summary"]["errors"] > 0:
+        print(f"{current['summary']['errors']} requests returned an unexpected status")
+        passed = False
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16, help="keep-alive connections sending requests")
+    parser.add_argument("--duration-s", type=float, default=10.0, help="measured duration")
+    parser.add_argument("--warmup-s", type=float, default=2.0, help="load before measuring starts")
+    parser.add_argument("--mix", default="valid=90,invalid=5,missing=5",
+                        help="request kinds and weights: valid, invalid, missing, batch")
+    parser.add_argument("--batch-rows", type=int, default=32, help="rows per /predict/batch request")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--launcher", action="store_true",
+                        help="serve through src/api/server.py (preloaded model shared by forked workers)")
+    parser.add_argument("--model", default="logistic_regression", help="model family from the repo config")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config value for the API, e.g. serving.engine=compiled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative regression in RPS and latency percentiles")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix="bench_api_load_")
+    config_path = prepare_app(workdir, args.model, args.overrides)
+    port = free_port()
+    server = start_server(workdir, config_path, port, args.workers, args.launcher)
+    try:
+        results = run_load(port, server.pid, args, mix)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "concurrency": args.concurrency, "duration_s": args.duration_s, "mix": mix,
+            "batch_rows": args.batch_rows, "workers": args.workers, "launcher": args.launcher, "model": args.model,
+            "overrides": args.overrides, "cpu_count": os.cpu_count(),
+        },
+        **results,
+    }
+
+    summary = report["summary"]
+    print(f"{summary['requests']} requests in {args.duration_s:.0f}s at concurrency {args.concurrency}: "
+          f"{summary['rps']:.0f} req/s, p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, "
+          f"p99 {summary['p99_ms']:.2f} ms, {summary['errors']} unexpected statuses")
+    for kind, stats in report["by_kind"].items():
+        print(f"  {kind:<8}{stats['rps']:>9.0f} req/s  p99 {stats.get('p99_ms', float('nan')):>8.2f} ms  "
+              f"status {stats['status']}")
+    for worker in report["workers"]:
+        print(f"  {worker['role']} pid {worker['pid']}: {worker['cpu_percent']:.0f}% CPU, "
+              f"RSS {worker['rss_mb']:.0f} MB (peak {worker['peak_rss_mb']:.0f} MB), "
+              f"PSS {worker['pss_mb'] or 0:.0f} MB, private {worker['uss_mb'] or 0:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.threshold):
+            sys.exit("Load test regressed against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
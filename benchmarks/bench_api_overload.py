@@ -0,0 +1,165 @@
+# This script is developed to show how the API behaves when it is offered more traffic than it can serve.
+# It starts the API like bench_api_load.py, measures its capacity with a closed-loop run, then sends
+# /predict requests open loop (Poisson arrivals at a fixed rate, whatever the responses do) at multiples
+# of that capacity, with admission control (serving.admission) disabled and enabled. Latency counts from
+# the scheduled arrival, so time spent waiting for a connection is included. Without admission control
+# the backlog, and the p99, grow for as long as the overload lasts; with it, the excess gets 503 quickly
+# and the requests that are served keep a bounded p99.
+#
+# Usage:
+#   python benchmarks/bench_api_overload.py --load 0.5 1 2 4 --duration-s 10
+#   python benchmarks/bench_api_overload.py --deadline-ms 250 --set serving.log_writer.enabled=false --output overload.json
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from bench_api_load import (
+    encode_request, exchange, free_port, latency_summary, prepare_app, request_pool, run_load, start_server,
+)
+
+MODES = {"no admission control": False, "admission control": True}
+
+
+async def open_loop(port: int, requests: list, rate: float, duration_s: float, max_connections: int,
+                    seed: int) -> list:
+    """Sends `requests` at Poisson arrivals of `rate` per second for `duration_s`; returns (latency, status)."""
+    rng = random.Random(seed)
+    idle, opened, samples = [], 0, []
+    available = asyncio.Condition()
+
+    async def checkout():
+        nonlocal opened
+        async with available:
+            while not idle and opened >= max_connections:
+                await available.wait()
+            if idle:
+                return idle.pop()
+            opened += 1
+        return await asyncio.open_connection("127.0.0.1", port)
+
+    async def checkin(conn):
+        nonlocal opened
+        async with available:
+            if conn is None:
+                opened -= 1
+            else:
+                idle.append(conn)
+            available.notify()
+
+    async def send(scheduled: float, request: bytes):
+        conn = await checkout()
+        try:
+            status, close = await exchange(*conn, request)
+        except (OSError, asyncio.IncompleteReadError, IndexError):
+            status, close = 0, True
+        samples.append((time.perf_counter() - scheduled, status))
+        if close:
+            conn[1].close()
+            conn = None
+        await checkin(conn)
+
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + duration_s:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(scheduled, rng.choice(requests))))
+        scheduled += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    for _, writer in idle:
+        writer.close()
+    return samples
+
+
+def summarize(samples: list, rate: float, duration_s: float) -> dict:
+    statuses = Counter(status for _, status in samples)
+    served = [latency for latency, status in samples if status == 200]
+    shed = [latency for latency, status in samples if status == 503]
+    return {
+        "offered_rps": rate,
+        "goodput_rps": len(served) / duration_s,
+        "shed_share": len(shed) / max(len(samples), 1),
+        "status": {str(status): n for status, n in sorted(statuses.items())},
+        "served": latency_summary(served),
+        "shed": latency_summary(shed),
+    }
+
+
+def run_mode(args, admission: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_api_overload_")
+    overrides = args.overrides + [f"serving.admission.enabled={str(admission).lower()}"]
+    config_path = prepare_app(workdir, args.model, overrides)
+    port = free_port()
+    server = start_server(workdir, config_path, port, args.workers)
+    try:
+        # Capacity: what a closed loop of a few connections gets through
+        capacity_args = argparse.Namespace(seed=args.seed, batch_rows=1, warmup_s=1.0, duration_s=args.capacity_s,
+                                           concurrency=args.capacity_concurrency)
+        capacity = run_load(port, server.pid, capacity_args, {"valid": 1})["summary"]["rps"]
+
+        headers = {args.deadline_header: f"{args.deadline_ms:g}"} if args.deadline_ms else None
+        requests = [encode_request(path, body, headers)
+                    for path, body in request_pool("valid", random.Random(args.seed), 256, 1)]
+        levels = []
+        for load in args.load:
+            rate = capacity * load
+            samples = asyncio.run(open_loop(port, requests, rate, args.duration_s, args.max_connections, args.seed))
+            levels.append(dict(summarize(samples, rate, args.duration_s), load=load))
+            time.sleep(args.pause_s)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"capacity_rps": capacity, "levels": levels}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--load", type=float, nargs="+", default=[0.5, 1.0, 2.0, 4.0],
+                        help="offered rates as multiples of the measured capacity")
+    parser.add_argument("--duration-s", type=float, default=10.0, help="duration of each offered rate")
+    parser.add_argument("--pause-s", type=float, default=2.0, help="idle time between rates")
+    parser.add_argument("--capacity-s", type=float, default=5.0, help="duration of the capacity measurement")
+    parser.add_argument("--capacity-concurrency", type=int, default=8, help="connections of the capacity measurement")
+    parser.add_argument("--max-connections", type=int, default=1024, help="most connections the client opens")
+    parser.add_argument("--deadline-ms", type=float, help="send this budget in the deadline header")
+    parser.add_argument("--deadline-header", default="X-Request-Timeout-Ms")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--model", default="logistic_regression", help="model family from the repo config")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="config override, e.g. serving.admission.target_latency_ms=20 (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = run_mode(args, MODES[mode])
+        print(f"{mode}: capacity {results[mode]['capacity_rps']:.0f} req/s", flush=True)
+
+    print(f"\n{'mode':<22}{'load':>6}{'offered/s':>11}{'served/s':>10}{'shed':>7}"
+          f"{'served p50 ms':>15}{'served p99 ms':>15}{'shed p99 ms':>13}")
+    for mode, result in results.items():
+        for level in result["levels"]:
+            served, shed = level["served"], level["shed"]
+            print(f"{mode:<22}{level['load']:>5.1f}x{level['offered_rps']:>11.0f}{level['goodput_rps']:>10.0f}"
+                  f"{level['shed_share']:>7.0%}{served.get('p50_ms', float('nan')):>15.1f}"
+                  f"{served.get('p99_ms', float('nan')):>15.1f}{shed.get('p99_ms', float('nan')):>13.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# This script is developed to measure how quickly the API starts serving.
+# It seeds a stand-in model like bench_api_load.py, then in fresh interpreters measures the import of
+# src.api.app with -X importtime (total, and the heavy packages it pulls in) and starts uvicorn to time
+# the first /healthz, /readyz and /predict responses, with the model loaded in the foreground (the port
+# opens once it is warm) and in the background. The server also runs with -X importtime, which shows
+# whether MLflow, pandas or SQLAlchemy were imported to serve from the model cache.
+#
+# Usage:
+#   python benchmarks/bench_api_startup.py --repeat 3
+#   python benchmarks/bench_api_startup.py --model decision_tree --set serving.engine=compiled --output startup.json
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from bench_api_load import free_port, prepare_app, server_env
+from common import project_root
+
+HEAVY_PACKAGES = ("mlflow", "pandas", "sqlalchemy", "sklearn", "pyarrow", "fastapi", "numpy")
+MODES = {"foreground": False, "background": True}
+PREDICT_BODY = json.dumps({"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2}).encode()
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Cumulative import time in ms of each module imported, from -X importtime output."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        if cumulative.strip().isdigit():
+            packages.setdefault(name, int(cumulative) / 1000)
+    return packages
+
+
+def time_import(env: dict) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.api.app"],
+                            cwd=project_root, env=env, capture_output=True, text=True, check=True)
+    wall_s = time.perf_counter() - start
+    packages = parse_importtime(result.stderr)
+    return {"wall_s": wall_s, "app_ms": packages.get("src.api.app"),
+            "heavy_ms": {name: packages[name] for name in HEAVY_PACKAGES if name in packages}}
+
+
+def _get(url: str, data: bytes = None) -> bool:
+    headers = {"Content-Type": "application/json"} if data else {}
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data, headers), timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def time_first_prediction(workdir: str, env: dict, timeout_s: float = 120) -> dict:
+    """Starts uvicorn and times the first successful /healthz, /readyz and /predict after the spawn."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, f"server-{port}.log")
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-m", "uvicorn", "--factory", "src.api.app:create_app",
+             "--host", "127.0.0.1", "--port", str(port), "--no-access-log"],
+            cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    timings = {}
+    try:
+        for name, url, data in (("healthz_s", f"{base}/healthz", None), ("readyz_s", f"{base}/readyz", None),
+                                ("first_prediction_s", f"{base}/predict", PREDICT_BODY)):
+            while not _get(url, data):
+                if server.poll() is not None or time.perf_counter() - start > timeout_s:
+                    raise RuntimeError(f"Server did not serve {url}; see {log_path}")
+                time.sleep(0.005)
+            timings[name] = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    with open(log_path) as f:
+        packages = parse_importtime(f.read())
+    timings["imported"] = [name for name in HEAVY_PACKAGES if name in packages]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest is reported")
+    parser.add_argument("--model", default="random_forest", help="model family of the stand-in model")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="config override, e.g. serving.engine=compiled (repeatable)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_api_startup_")
+    results = {}
+    try:
+        config_path = prepare_app(workdir, args.model, args.overrides)
+        env = server_env(workdir, config_path)
+        imports = [time_import(env) for _ in range(args.repeat)]
+        results["import"] = min(imports, key=lambda r: r["wall_s"])
+        for mode, background in MODES.items():
+            mode_dir = os.path.join(workdir, mode)
+            os.makedirs(mode_dir)
+            mode_config = prepare_app(mode_dir, args.model,
+                                      args.overrides + [f"serving.startup.background_init={str(background).lower()}"])
+            mode_env = server_env(mode_dir, mode_config)
+            runs = [time_first_prediction(workdir, mode_env) for _ in range(args.repeat)]
+            results[mode] = min(runs, key=lambda r: r["first_prediction_s"])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    imported = results["import"]
+    print(f"import src.api.app: {imported['wall_s'] * 1000:.0f} ms wall (interpreter included), "
+          f"{imported['app_ms'] or 0:.0f} ms in the import")
+    print("  heavy packages imported: " + (", ".join(
+        f"{name} {ms:.0f} ms" for name, ms in imported["heavy_ms"].items()) or "none"))
+    print(f"\n{'startup':<12}{'/healthz ms':>13}{'/readyz ms':>12}{'1st predict ms':>16}  imported while serving")
+    for mode in MODES:
+        r = results[mode]
+        print(f"{mode:<12}{r['healthz_s'] * 1000:>13.0f}{r['readyz_s'] * 1000:>12.0f}"
+              f"{r['first_prediction_s'] * 1000:>16.0f}  {', '.join(r['imported'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
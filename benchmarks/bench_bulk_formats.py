@@ -0,0 +1,135 @@
+# This script is developed to compare the wire formats for bulk scoring.
+# It starts the API like bench_api_load.py and sends the same rows as JSON to /predict/batch and as
+# Arrow IPC, .npy and raw float32 bodies to /predict/bulk, reporting request/response bytes and
+# server CPU time (from /proc, so client-side encoding is excluded) per 100k rows.
+#
+# Usage:
+#   python benchmarks/bench_bulk_formats.py --rows 100000 --batch-rows 10000
+#   python benchmarks/bench_bulk_formats.py --set serving.engine=compiled --output formats.json
+
+import argparse
+import http.client
+import io
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from bench_api_load import free_port, prepare_app, process_stats, start_server
+from src.api import bulk_formats
+from src.feature_transform import RAW_COLUMNS
+
+# Observed ranges of the Iris measurements, used to draw valid rows
+FEATURE_RANGES = [(4.3, 7.9), (2.0, 4.4), (1.0, 6.9), (0.1, 2.5)]
+
+
+def json_rows(batch: np.ndarray) -> bytes:
+    return json.dumps([dict(zip(RAW_COLUMNS, row)) for row in batch.tolist()]).encode()
+
+
+def json_columns(batch: np.ndarray) -> bytes:
+    return json.dumps({col: batch[:, i].tolist() for i, col in enumerate(RAW_COLUMNS)}).encode()
+
+
+def arrow_stream(batch: np.ndarray) -> bytes:
+    table = pa.table({col: batch[:, i] for i, col in enumerate(RAW_COLUMNS)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def npy(batch: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, batch)
+    return buffer.getvalue()
+
+
+def raw_float32(batch: np.ndarray) -> bytes:
+    return batch.astype("<f4").tobytes()
+
+
+# name: (path, request encoder, Content-Type, Accept)
+FORMATS = {
+    "json rows": ("/predict/batch", json_rows, bulk_formats.JSON, bulk_formats.JSON),
+    "json columns": ("/predict/batch", json_columns, bulk_formats.JSON, bulk_formats.JSON),
+    "arrow": ("/predict/bulk", arrow_stream, bulk_formats.ARROW_STREAM, bulk_formats.ARROW_STREAM),
+    "npy (float64)": ("/predict/bulk", npy, bulk_formats.NPY, bulk_formats.NPY),
+    "float32 -> packed": ("/predict/bulk", raw_float32, bulk_formats.RAW_FLOAT32, bulk_formats.RAW_FLOAT32),
+    "float32 -> json": ("/predict/bulk", raw_float32, bulk_formats.RAW_FLOAT32, bulk_formats.JSON),
+}
+
+
+def run_format(port: int, server_pid: int, path: str, bodies: list, content_type: str, accept: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    headers = {"Content-Type": content_type, "Accept": accept}
+    # One untimed request, so lazy imports and first-call costs are not counted
+    conn.request("POST", path, bodies[0], headers)
+    conn.getresponse().read()
+
+    request_bytes = response_bytes = 0
+    before = process_stats(server_pid)["cpu_s"]
+    start = time.perf_counter()
+    for body in bodies:
+        conn.request("POST", path, body, headers)
+        response = conn.getresponse()
+        content = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{path} returned {response.status}: {content[:200]}")
+        request_bytes += len(body)
+        response_bytes += len(content)
+    wall_s = time.perf_counter() - start
+    cpu_s = process_stats(server_pid)["cpu_s"] - before
+    conn.close()
+    return {"request_bytes": request_bytes, "response_bytes": response_bytes, "server_cpu_s": cpu_s, "wall_s": wall_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows sent in each format")
+    parser.add_argument("--batch-rows", type=int, default=10_000, help="rows per request")
+    parser.add_argument("--model", default="random_forest", help="model family of the stand-in model")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="config override, e.g. serving.engine=compiled (repeatable)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    low, high = np.array(FEATURE_RANGES).T
+    rows = np.round(rng.uniform(low, high, size=(args.rows, len(RAW_COLUMNS))), 1)
+    batches = np.array_split(rows, max(1, args.rows // args.batch_rows))
+
+    workdir = tempfile.mkdtemp(prefix="bench_bulk_formats_")
+    config_path = prepare_app(workdir, args.model, args.overrides)
+    port = free_port()
+    server = start_server(workdir, config_path, port, workers=1)
+    results = {}
+    try:
+        for name, (path, encoder, content_type, accept) in FORMATS.items():
+            bodies = [encoder(batch) for batch in batches]
+            results[name] = run_format(port, server.pid, path, bodies, content_type, accept)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    per = 100_000 / args.rows
+    baseline_cpu = results["json rows"]["server_cpu_s"]
+    print(f"{args.rows} rows in requests of {args.batch_rows}; figures per 100k rows")
+    print(f"{'format':<20}{'request KB':>12}{'response KB':>13}{'server CPU ms':>15}{'vs json rows':>14}{'rows/s':>12}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['request_bytes'] * per / 1024:>12.0f}{r['response_bytes'] * per / 1024:>13.0f}"
+              f"{r['server_cpu_s'] * per * 1000:>15.0f}{baseline_cpu / max(r['server_cpu_s'], 1e-9):>13.1f}x"
+              f"{args.rows / r['wall_s']:>12.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
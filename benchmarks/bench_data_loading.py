@@ -0,0 +1,89 @@
+# This script is developed to compare load time and memory of the processed dataset in CSV, Parquet and Arrow.
+# It writes a scaled-up synthetic dataset with the processed Iris schema, then loads it with
+# data_loader.load_data in fresh processes, with all columns and with a two-column projection.
+#
+# Usage: python benchmarks/bench_data_loading.py [--rows 2000000]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import project_root
+from src.preprocess import save_columnar
+
+FEATURES = ["sepal_length", "sepal_width", "petal_length", "petal_width", "Petal_ratio", "Sepal_area", "Petal_area"]
+
+# Runs in a fresh interpreter; the peak-RSS counter is reset right before the load (Linux only)
+LOAD_SNIPPET = """
+import json, sys, time
+sys.path[:0] = [{root!r}, {src!r}]
+from data_loader import load_data
+
+def status_kb(field):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field))
+
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+baseline = status_kb("VmRSS:")
+start = time.perf_counter()
+df = load_data({{"data": {{"processed": {path!r}}}}}, processed=True, columns={columns!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "load_s": elapsed,
+    "peak_rss_mb": (status_kb("VmHWM:") - baseline) / 1024,
+    "rss_mb": (status_kb("VmRSS:") - baseline) / 1024,
+    "shape": list(df.shape),
+}}))
+"""
+
+
+def write_dataset(workdir: str, n_rows: int) -> dict:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n_rows, len(FEATURES))), columns=FEATURES)
+    df["target"] = rng.integers(0, 3, size=n_rows)
+
+    csv_path = os.path.join(workdir, "synthetic.csv")
+    df.to_csv(csv_path, index=False)
+    save_columnar(df, workdir, "synthetic")
+    return {
+        "csv": csv_path,
+        "parquet": os.path.join(workdir, "synthetic.parquet"),
+        "arrow": os.path.join(workdir, "synthetic.arrow"),
+    }
+
+
+def time_load(path: str, columns) -> dict:
+    snippet = LOAD_SNIPPET.format(root=project_root, src=os.path.join(project_root, "src"), path=path, columns=columns)
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    paths = write_dataset(workdir, args.rows)
+
+    print(f"{args.rows:,} rows")
+    print(f"{'format':<10}{'columns':<12}{'size MB':>9}{'load s':>9}{'peak RSS MB':>13}{'RSS MB':>9}")
+    for fmt, path in paths.items():
+        size_mb = os.path.getsize(path) / 2**20
+        for label, columns in (("all", None), ("2 columns", ["petal_length", "target"])):
+            runs = [time_load(path, columns) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["load_s"])
+            print(f"{fmt:<10}{label:<12}{size_mb:>9.1f}{best['load_s']:>9.3f}"
+                  f"{best['peak_rss_mb']:>13.1f}{best['rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# This script is developed to check and benchmark the compiled inference engine (src/api/engine.py).
+# It fits each supported model family on the processed dataset, verifies that the compiled model
+# predicts exactly what model.predict does, and compares per-row and batch latency.
+#
+# Usage: python benchmarks/bench_inference_engine.py [--rows 2000]
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import load_processed, read_repo_config
+from src.api.engine import compile_estimator
+from src.model_builder import get_model
+
+SUPPORTED_MODELS = ["logistic_regression", "decision_tree", "random_forest"]
+
+
+def median_ns(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000, help="single-row calls to time per model")
+    parser.add_argument("--batch", type=int, default=65536, help="synthetic rows for the batch timing")
+    args = parser.parse_args()
+
+    config = read_repo_config()
+    target_column = config["model"]["target_column"]
+    df = load_processed(config)
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+    columns = list(X.columns)
+
+    rng = np.random.default_rng(0)
+    synthetic = rng.normal(size=(args.batch, X.shape[1])) * X.values.std(axis=0) + X.values.mean(axis=0)
+
+    failed = False
+    print(f"{'model':<22}{'parity':>10}{'sklearn us/row':>16}{'compiled us/row':>17}{'speedup':>9}{'batch Mrows/s':>15}")
+    for model_name in SUPPORTED_MODELS:
+        estimator = get_model(model_name, config["models"][model_name]["params"]).fit(X, y)
+        compiled = compile_estimator(estimator, columns)
+
+        # Parity on the processed dataset and on synthetic rows around it
+        mismatches = int((compiled.predict(X.values) != estimator.predict(X)).sum())
+        mismatches += int((compiled.predict(synthetic) != estimator.predict(pd.DataFrame(synthetic, columns=columns))).sum())
+        failed |= mismatches > 0
+
+        rows = X.values[rng.integers(0, len(X), size=args.rows)]
+        frames = [pd.DataFrame(row[None, :], columns=columns) for row in rows]
+        sklearn_ns = median_ns(lambda: [estimator.predict(f) for f in frames], 3) / args.rows
+        compiled_ns = median_ns(lambda: [compiled.predict(r) for r in rows], 3) / args.rows
+        batch_ns = median_ns(lambda: compiled.predict(synthetic), 3)
+
+        print(
+            f"{model_name:<22}{'OK' if mismatches == 0 else f'{mismatches} diff':>10}"
+            f"{sklearn_ns / 1000:>16.1f}{compiled_ns / 1000:>17.1f}{sklearn_ns / compiled_ns:>8.1f}x"
+            f"{args.batch / batch_ns * 1000:>15.2f}"
+        )
+
+    if failed:
+        sys.exit("Compiled predictions differ from model.predict.")
+
+
+if __name__ == "__main__":
+    main()
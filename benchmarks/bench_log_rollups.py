@@ -0,0 +1,170 @@
+# This script is developed to compare monitoring queries on the raw prediction_logs table with the same
+# queries on the rollup tables (src/app_logging.py). It fills a temp SQLite log database with synthetic
+# rows spread over the last days (10M by default), times the backfill compaction, an incremental
+# compaction of one new minute of traffic and the retention prune, then runs dashboard-style queries
+# both ways, checks that they agree and reports the speedup.
+#
+# Usage:
+#   python benchmarks/bench_log_rollups.py
+#   python benchmarks/bench_log_rollups.py --rows 1000000 --days 3 --repeat 5
+
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import common  # noqa: F401  (import paths)
+
+# Dashboard panels: (name, query on prediction_logs, query on the rollups). Both return the same rows.
+QUERIES = [
+    (
+        "requests and error rate per hour and version, last 24h",
+        """SELECT strftime('%Y-%m-%d %H:00:00', timestamp) AS bucket, coalesce(model_version, '') AS version,
+                  count(*) AS requests, count(error) * 1.0 / count(*) AS error_rate
+           FROM prediction_logs WHERE timestamp >= :since_day GROUP BY 1, 2 ORDER BY 1, 2""",
+        """SELECT strftime('%Y-%m-%d %H:00:00', bucket_start) AS bucket, model_version AS version,
+                  requests, errors * 1.0 / requests AS error_rate
+           FROM prediction_rollups WHERE resolution = 'hour' AND bucket_start >= :since_day ORDER BY 1, 2""",
+    ),
+    (
+        "predicted class share per version, last 7 days",
+        """SELECT coalesce(model_version, '') AS version, prediction, count(*) AS predictions
+           FROM prediction_logs WHERE timestamp >= :since_week AND error IS NULL GROUP BY 1, 2 ORDER BY 1, 2""",
+        """SELECT model_version AS version, prediction, sum(count) AS predictions
+           FROM prediction_class_rollups WHERE resolution = 'hour' AND bucket_start >= :since_week
+           GROUP BY 1, 2 ORDER BY 1, 2""",
+    ),
+    (
+        "petal_length mean and variance per hour, last 24h",
+        """SELECT strftime('%Y-%m-%d %H:00:00', timestamp) AS bucket,
+                  avg(petal_length) AS mean, avg(petal_length * petal_length) - avg(petal_length) * avg(petal_length) AS variance
+           FROM prediction_logs WHERE timestamp >= :since_day AND error IS NULL GROUP BY 1 ORDER BY 1""",
+        """SELECT strftime('%Y-%m-%d %H:00:00', bucket_start) AS bucket,
+                  sum(petal_length_sum) / sum(requests - errors) AS mean,
+                  sum(petal_length_sumsq) / sum(requests - errors)
+                    - (sum(petal_length_sum) / sum(requests - errors)) * (sum(petal_length_sum) / sum(requests - errors)) AS variance
+           FROM prediction_rollups WHERE resolution = 'hour' AND bucket_start >= :since_day GROUP BY 1 ORDER BY 1""",
+    ),
+    (
+        "requests per minute, last hour",
+        """SELECT strftime('%Y-%m-%d %H:%M:00', timestamp) AS bucket, count(*) AS requests
+           FROM prediction_logs WHERE timestamp >= :since_hour GROUP BY 1 ORDER BY 1""",
+        """SELECT strftime('%Y-%m-%d %H:%M:00', bucket_start) AS bucket, sum(requests) AS requests
+           FROM prediction_rollups WHERE resolution = 'minute' AND bucket_start >= :since_hour GROUP BY 1 ORDER BY 1""",
+    ),
+]
+
+
+def fill(engine, rows: int, start: datetime, end: datetime, chunk: int = 1_000_000):
+    """
+    Inserts `rows` synthetic log rows evenly spread over [start, end) with SQL alone: 1% errors, and
+    version "1" then "2" with a 10% canary "3". Timestamps use the text format SQLAlchemy stores.
+    The error draw is derived from the row number, since SQLite may evaluate random() once per use.
+    """
+    span_s = (end - start).total_seconds()
+    statement = """
+        WITH RECURSIVE seq(x) AS (SELECT :offset UNION ALL SELECT x + 1 FROM seq WHERE x < :offset + :count - 1)
+        INSERT INTO prediction_logs
+            (timestamp, sepal_length, sepal_width, petal_length, petal_width, prediction, model_version, error)
+        SELECT strftime('%Y-%m-%d %H:%M:%S', :start, '+' || CAST(x * :span_s / :rows AS INTEGER) || ' seconds')
+                   || '.000000',
+               4.3 + (abs(random()) % 3600) / 1000.0, 2.0 + (abs(random()) % 2400) / 1000.0,
+               1.0 + (abs(random()) % 5900) / 1000.0, 0.1 + (abs(random()) % 2400) / 1000.0,
+               CASE WHEN r = 0 THEN NULL ELSE CAST(r % 3 AS TEXT) END,
+               CASE WHEN x % 10 = 0 THEN '3' WHEN x < :rows / 2 THEN '1' ELSE '2' END,
+               CASE WHEN r = 0 THEN 'Input validation failed' END
+        FROM (SELECT x, (x * 2654435761) % 100 AS r FROM seq)
+    """
+    from sqlalchemy import text
+
+    for offset in range(0, rows, chunk):
+        with engine.begin() as conn:
+            conn.execute(text(statement), {"offset": offset, "count": min(chunk, rows - offset), "rows": rows,
+                                           "start": start.strftime("%Y-%m-%d %H:%M:%S"), "span_s": span_s})
+        print(f"  {min(offset + chunk, rows):,} rows", flush=True)
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def same(raw: list, rollup: list) -> bool:
+    if len(raw) != len(rollup):
+        return False
+    return all(
+        a == b or (isinstance(a, float) and math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-9))
+        for raw_row, rollup_row in zip(raw, rollup) for a, b in zip(raw_row, rollup_row)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000, help="synthetic prediction_logs rows")
+    parser.add_argument("--days", type=float, default=7, help="the rows are spread over this many days up to now")
+    parser.add_argument("--new-rows", type=int, default=60_000, help="rows in the minute of traffic compacted incrementally")
+    parser.add_argument("--retention-days", type=float, default=6, help="prune raw rows older than this at the end")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; the fastest is reported")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_log_rollups_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'logs.db')}"
+    from sqlalchemy import text
+
+    import app_logging
+
+    try:
+        app_logging.configure_storage("sqlite")
+        app_logging.init_db()
+        app_logging.init_rollups()
+        engine = app_logging.engine
+
+        # Leave the last two minutes empty for the incremental compaction
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        print(f"Filling {tmp} with {args.rows:,} rows over {args.days} days")
+        _, fill_s = timed(fill, engine, args.rows, now - timedelta(days=args.days), now - timedelta(minutes=2))
+
+        rolled_up, backfill_s = timed(app_logging.compact_rollups, grace_s=0)
+        minute = app_logging.rolled_up_until()
+        fill(engine, args.new_rows, minute, minute + timedelta(minutes=1), chunk=args.new_rows)
+        incremental, incremental_s = timed(app_logging.compact_rollups, grace_s=0)
+
+        # Panels on hour buckets start on the hour, like a dashboard time range snapped to the interval
+        hour = now.replace(minute=0)
+        params = {
+            "since_hour": now - timedelta(hours=1),
+            "since_day": hour - timedelta(days=1),
+            "since_week": hour - timedelta(days=7),
+        }
+        with engine.connect() as conn:
+            rollup_rows = conn.execute(text("SELECT count(*) FROM prediction_rollups")).scalar()
+            results = []
+            for name, raw_sql, rollup_sql in QUERIES:
+                timings = {}
+                for label, sql in (("raw", raw_sql), ("rollup", rollup_sql)):
+                    runs = [timed(lambda: conn.execute(text(sql), params).fetchall()) for _ in range(args.repeat)]
+                    timings[label] = (runs[0][0], min(seconds for _, seconds in runs))
+                results.append((name, timings["raw"][1], timings["rollup"][1], same(timings["raw"][0], timings["rollup"][0])))
+
+        pruned, prune_s = timed(app_logging.prune_logs, args.retention_days)
+    finally:
+        app_logging.close_storage()
+        db_mb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 2**20
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\nfill: {fill_s:.1f}s ({db_mb:.0f} MB database)")
+    print(f"backfill compaction: {rolled_up:,} rows in {backfill_s:.2f}s ({rolled_up / backfill_s:,.0f} rows/s), "
+          f"{rollup_rows:,} rollup rows")
+    print(f"incremental compaction: {incremental:,} new rows in {incremental_s * 1000:.0f} ms")
+    print(f"prune older than {args.retention_days} days: {pruned:,} rows in {prune_s:.2f}s")
+    print(f"\n{'query':<56}{'raw ms':>10}{'rollup ms':>11}{'speedup':>9}  same result")
+    for name, raw_s, rollup_s, matches in results:
+        print(f"{name:<56}{raw_s * 1000:>10.1f}{rollup_s * 1000:>11.2f}{raw_s / rollup_s:>8.0f}x  {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# This script is developed to compare write throughput of the prediction log storage backends (src/log_storage.py).
+# Each backend writes the same synthetic rows in batches, like the background log writer, and with one row
+# per write, like synchronous logging. Everything runs in a temp dir; Postgres is only included when
+# BENCH_POSTGRES_URL points at a database the benchmark may write to.
+#
+# Usage: python benchmarks/bench_log_storage.py [--rows 50000] [--batch-size 500]
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import common  # noqa: F401  (import paths)
+from app_logging import PredictionLog, _log_record
+from log_storage import create_log_engine, create_storage
+from src.feature_transform import RAW_COLUMNS
+
+
+class OrmStorage:
+    """The previous write path: default engine settings and ORM bulk_insert_mappings."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def init(self):
+        PredictionLog.__table__.create(self.engine, checkfirst=True)
+
+    def write(self, records: list):
+        session = self.Session()
+        try:
+            session.bulk_insert_mappings(PredictionLog, records)
+            session.commit()
+        finally:
+            session.close()
+
+    def close(self):
+        self.engine.dispose()
+
+
+def make_records(n_rows: int) -> list:
+    rng = np.random.default_rng(0)
+    values = rng.normal(loc=4.0, scale=1.5, size=(n_rows, len(RAW_COLUMNS)))
+    return [
+        _log_record(dict(zip(RAW_COLUMNS, map(float, row))), str(i % 3), "7")
+        for i, row in enumerate(values)
+    ]
+
+
+def backends(tmp: str) -> list:
+    """(label, factory) pairs; each factory builds a fresh storage writing into `tmp`."""
+    table = PredictionLog.__table__
+    sqlite_url = lambda name: f"sqlite:///{os.path.join(tmp, name)}.db"  # noqa: E731
+    entries = [
+        ("sqlite ORM (previous)", lambda tag: OrmStorage(sqlite_url(f"orm-{tag}"))),
+        ("sqlite tuned", lambda tag: create_storage("sqlite", create_log_engine(sqlite_url(f"tuned-{tag}")), table)),
+        ("segments jsonl", lambda tag: create_storage(
+            "segments", None, table, directory=os.path.join(tmp, f"jsonl-{tag}"), segment_format="jsonl")),
+        ("segments parquet", lambda tag: create_storage(
+            "segments", None, table, directory=os.path.join(tmp, f"parquet-{tag}"), segment_format="parquet")),
+    ]
+    postgres_url = os.getenv("BENCH_POSTGRES_URL")
+    if postgres_url:
+        def postgres(tag):
+            storage = create_storage("postgres", create_log_engine(postgres_url), table)
+            storage.init()
+            with storage.engine.begin() as conn:
+                conn.exec_driver_sql(f"TRUNCATE {table.name}")
+            return storage
+        entries.append(("postgres COPY", postgres))
+    return entries
+
+
+def run(storage, records: list, batch_size: int) -> float:
+    """Returns rows per second for writing `records` in batches of `batch_size`."""
+    storage.init()
+    start = time.perf_counter()
+    for i in range(0, len(records), batch_size):
+        storage.write(records[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return len(records) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000, help="rows written in batches")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per write, as in serving.log_writer")
+    parser.add_argument("--single-rows", type=int, default=2000, help="rows written one per transaction")
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    tmp = tempfile.mkdtemp(prefix="bench_log_storage_")
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} writing to {tmp}"
+          f"{'' if os.getenv('BENCH_POSTGRES_URL') else ' (set BENCH_POSTGRES_URL to include Postgres)'}")
+
+    results = []
+    for label, factory in backends(tmp):
+        batched = run(factory("batched"), records, args.batch_size)
+        single = run(factory("single"), records[:args.single_rows], 1)
+        results.append((label, batched, single))
+
+    baseline_batched, baseline_single = results[0][1], results[0][2]
+    print(f"{'backend':<24}{f'rows/s (batch {args.batch_size})':>22}{'speedup':>9}{'rows/s (batch 1)':>18}{'speedup':>9}")
+    for label, batched, single in results:
+        print(f"{label:<24}{batched:>22.0f}{batched / baseline_batched:>8.1f}x"
+              f"{single:>18.0f}{single / baseline_single:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
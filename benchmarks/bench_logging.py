@@ -0,0 +1,103 @@
+# This script is developed to compare /predict throughput across the logging modes in src/api/log_config.py.
+# It drives the same path as the /predict route (predict() in the threadpool, many requests in flight)
+# with a stand-in model, once per mode, writing logs to a temp dir with console output sent to a file.
+#
+# Usage: python benchmarks/bench_logging.py [--requests 20000] [--concurrency 32] [--engine compiled]
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from common import load_processed, read_repo_config
+from src.api.engine import compile_estimator
+from src.api.log_config import configure_logging, stop_logging
+from src.api.predict import predict, raw_columns
+from src.feature_transform import FEATURE_COLUMNS, FeatureTransform
+from src.model_builder import get_model
+
+# (label, mode, sample rate for src.api.predict)
+SCENARIOS = [
+    ("legacy", "legacy", None),
+    ("queue, 100% sampled", "queue", 1.0),
+    ("queue, 1% sampled", "queue", 0.01),
+    ("disabled", "disabled", None),
+]
+
+
+async def drive(model, transform, payloads: list, concurrency: int) -> float:
+    """Sends every payload through predict() in the threadpool, like the /predict route; returns seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(payload):
+        async with semaphore:
+            return await run_in_threadpool(predict, model, payload, transform)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(p) for p in payloads))
+    return time.perf_counter() - start
+
+
+def count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled",
+                        help="compiled keeps model time small, so logging cost is easier to see")
+    args = parser.parse_args()
+
+    config = read_repo_config()
+    target_column = config["model"]["target_column"]
+    df = load_processed(config)
+    X = df[FEATURE_COLUMNS]
+    estimator = get_model("decision_tree", config["models"]["decision_tree"]["params"]).fit(X, df[target_column])
+    model = compile_estimator(estimator, FEATURE_COLUMNS) if args.engine == "compiled" else estimator
+    # The processed features are already scaled, so the stand-in transform only engineers columns
+    transform = FeatureTransform(np.zeros(len(FEATURE_COLUMNS)), np.ones(len(FEATURE_COLUMNS)))
+
+    rng = np.random.default_rng(0)
+    rows = df[raw_columns].to_numpy()[rng.integers(0, len(df), size=args.requests)]
+    payloads = [dict(zip(raw_columns, map(float, row))) for row in rows]
+
+    tmp = tempfile.mkdtemp(prefix="bench_logging_")
+    stderr = sys.stderr
+    results = []
+    for label, mode, rate in SCENARIOS:
+        log_file = os.path.join(tmp, f"{mode}-{rate}.log")
+        console_file = os.path.join(tmp, f"{mode}-{rate}.console")
+        # Console handlers bind to sys.stderr when created, so point it at a file for the run
+        with open(console_file, "w") as console:
+            sys.stderr = console
+            try:
+                configure_logging(mode, log_file=log_file,
+                                  sample_rates={"src.api.predict": rate} if rate is not None else None)
+                asyncio.run(drive(model, transform, payloads[:200], args.concurrency))  # warmup
+                seconds = asyncio.run(drive(model, transform, payloads, args.concurrency))
+                stop_logging()
+            finally:
+                sys.stderr = stderr
+        results.append((label, args.requests / seconds, count_lines(log_file)))
+
+    configure_logging("disabled")
+    baseline = results[0][1]
+    print(f"{args.requests} requests, concurrency {args.concurrency}, engine {args.engine}")
+    print(f"{'logging':<22}{'req/s':>10}{'vs legacy':>11}{'log lines':>11}")
+    for label, rps, lines in results:
+        print(f"{label:<22}{rps:>10.0f}{rps / baseline:>10.2f}x{lines:>11}")
+    print(f"Logs written to {tmp}")
+
+
+if __name__ == "__main__":
+    main()
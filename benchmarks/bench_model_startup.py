@@ -0,0 +1,85 @@
+# This script is developed to measure model startup time with and without the local artifact cache.
+# It registers a stand-in model in a throwaway MLflow file store, then loads it in fresh processes:
+# straight from MLflow (pyfunc), with an empty cache (cold) and with a populated cache (warm).
+#
+# Usage: python benchmarks/bench_model_startup.py [--repeat 3]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import load_processed, project_root, read_repo_config
+
+REGISTRY_NAME = "iris_startup_benchmark"
+
+# Runs in a fresh interpreter so import and deserialization costs are included
+LOAD_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+sys.path[:0] = [{root!r}, {src!r}]
+from src.api.predict import load_production_model
+imported = time.perf_counter()
+load_production_model({name!r}, engine={engine!r}, cache_dir={cache_dir!r}, registry_ttl_s={ttl!r})
+done = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "load_s": done - imported, "total_s": done - start}}))
+"""
+
+
+def register_model(tracking_uri: str):
+    import mlflow
+    import mlflow.sklearn
+    from mlflow.tracking import MlflowClient
+    from sklearn.linear_model import LogisticRegression
+
+    config = read_repo_config()
+    df = load_processed(config)
+    target_column = config["model"]["target_column"]
+    model = LogisticRegression(max_iter=200).fit(df.drop(columns=[target_column]), df[target_column])
+
+    mlflow.set_tracking_uri(tracking_uri)
+    with mlflow.start_run() as run:
+        mlflow.sklearn.log_model(model, "model")
+    result = mlflow.register_model(f"runs:/{run.info.run_id}/model", REGISTRY_NAME)
+    MlflowClient().transition_model_version_stage(REGISTRY_NAME, result.version, "Production")
+
+
+def time_load(tracking_uri: str, engine: str, cache_dir, ttl: float) -> dict:
+    snippet = LOAD_SNIPPET.format(
+        root=project_root, src=os.path.join(project_root, "src"),
+        name=REGISTRY_NAME, engine=engine, cache_dir=cache_dir, ttl=ttl,
+    )
+    env = dict(os.environ, MLFLOW_TRACKING_URI=tracking_uri)
+    out = subprocess.run([sys.executable, "-c", snippet], env=env, cwd=project_root,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", default="pyfunc", choices=["pyfunc", "compiled"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    tracking_uri = f"file:{os.path.join(workdir, 'mlruns')}"
+    register_model(tracking_uri)
+
+    scenarios = {}
+    for i in range(args.repeat):
+        cache_dir = os.path.join(workdir, f"cache_{i}")
+        scenarios.setdefault("mlflow (no cache)", []).append(time_load(tracking_uri, args.engine, None, 0))
+        scenarios.setdefault("cold cache", []).append(time_load(tracking_uri, args.engine, cache_dir, 0))
+        scenarios.setdefault("warm cache", []).append(time_load(tracking_uri, args.engine, cache_dir, 0))
+        scenarios.setdefault("warm cache, registry skipped", []).append(time_load(tracking_uri, args.engine, cache_dir, 3600))
+
+    print(f"{'scenario':<32}{'import s':>10}{'load s':>10}{'total s':>10}")
+    for name, runs in scenarios.items():
+        best = min(runs, key=lambda r: r["total_s"])
+        print(f"{name:<32}{best['import_s']:>10.3f}{best['load_s']:>10.3f}{best['total_s']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
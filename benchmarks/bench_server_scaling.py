@@ -0,0 +1,88 @@
+# This script is developed to measure how the API scales with worker processes.
+# For each worker count it load tests plain `uvicorn --workers N` and the preforking launcher
+# (src/api/server.py), and reports throughput, p99 latency and memory: total RSS, total PSS (shared
+# pages split between the processes) and the private memory each worker adds.
+#
+# Usage:
+#   python benchmarks/bench_server_scaling.py --workers 1 2 4 --duration-s 10
+#   python benchmarks/bench_server_scaling.py --set serving.engine=compiled --output scaling.json
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from bench_api_load import free_port, parse_mix, prepare_app, run_load, start_server
+
+MODES = {"uvicorn": False, "launcher": True}
+
+
+def run_mode(args, mix: dict, mode: str, workers: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_server_scaling_")
+    config_path = prepare_app(workdir, args.model, args.overrides)
+    port = free_port()
+    server = start_server(workdir, config_path, port, workers, launcher=MODES[mode])
+    try:
+        results = run_load(port, server.pid, args, mix)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    worker_stats = [w for w in results["workers"] if w["role"] == "worker"] or results["workers"]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "rps": results["summary"]["rps"],
+        "p99_ms": results["summary"].get("p99_ms"),
+        "errors": results["summary"]["errors"],
+        # Every process of the server, including the supervisor
+        "total_rss_mb": sum(w["rss_mb"] for w in results["workers"]),
+        "total_pss_mb": sum(w["pss_mb"] or 0 for w in results["workers"]),
+        "rss_per_worker_mb": sum(w["rss_mb"] for w in worker_stats) / len(worker_stats),
+        "private_per_worker_mb": sum(w["uss_mb"] or 0 for w in worker_stats) / len(worker_stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to test")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--concurrency", type=int, default=32, help="keep-alive connections sending requests")
+    parser.add_argument("--duration-s", type=float, default=10.0, help="measured duration per run")
+    parser.add_argument("--warmup-s", type=float, default=2.0, help="load before measuring starts")
+    parser.add_argument("--mix", default="valid=90,batch=10", help="request kinds and weights, as in bench_api_load.py")
+    parser.add_argument("--batch-rows", type=int, default=32, help="rows per /predict/batch request")
+    parser.add_argument("--model", default="random_forest", help="model family from the repo config")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config value for the API, e.g. serving.engine=compiled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    rows = []
+    for workers in args.workers:
+        for mode in args.modes:
+            rows.append(run_mode(args, mix, mode, workers))
+            row = rows[-1]
+            print(f"{mode:<10}{workers:>3} workers: {row['rps']:>7.0f} req/s, p99 {row['p99_ms']:.1f} ms, "
+                  f"PSS {row['total_pss_mb']:.0f} MB", flush=True)
+
+    print(f"\n{os.cpu_count()} CPUs available; model {args.model}, concurrency {args.concurrency}")
+    print(f"{'mode':<10}{'workers':>8}{'req/s':>9}{'p99 ms':>9}{'total RSS':>11}{'total PSS':>11}"
+          f"{'RSS/worker':>12}{'private/worker':>16}")
+    for row in rows:
+        print(f"{row['mode']:<10}{row['workers']:>8}{row['rps']:>9.0f}{row['p99_ms']:>9.1f}"
+              f"{row['total_rss_mb']:>10.0f}M{row['total_pss_mb']:>10.0f}M"
+              f"{row['rss_per_worker_mb']:>11.0f}M{row['private_per_worker_mb']:>15.0f}M")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "cpu_count": os.cpu_count(), "results": rows}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# Shared helpers for the benchmark scripts: import paths and dataset loading.
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from src.utils import load_config  # noqa: E402
+
+
+def read_repo_config() -> dict:
+    return load_config(os.path.join(project_root, "src/config/model_config.yaml"))
+
+
+def load_processed(config: dict) -> pd.DataFrame:
+    """Loads the processed dataset, regenerating it in a temp dir if DVC outputs are missing."""
+    path = os.path.join(project_root, config["data"]["processed"])
+    if not os.path.exists(path):
+        from src.preprocess import get_data, preprocess_data
+        tmp = tempfile.mkdtemp()
+        get_data(os.path.join(tmp, "raw"))
+        preprocess_data(os.path.join(tmp, "raw", "iris_raw.csv"), os.path.join(tmp, "processed"))
+        path = os.path.join(tmp, "processed", "iris_cleaned.csv")
+    return pd.read_csv(path)
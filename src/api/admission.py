@@ -0,0 +1,201 @@
+# This script is developed to keep /predict latency bounded when traffic exceeds what the API can serve.
+# An ASGI middleware admits at most `limit` prediction requests at a time and queues a bounded number
+# of others; the limit adapts to the observed latency (additive increase, multiplicative decrease).
+# Requests beyond the queue, or waiting longer than allowed, get 503 with Retry-After instead of piling
+# up in the threadpool, and a client deadline header drops requests that expired before the model ran.
+
+import asyncio
+import collections
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.responses import Response
+
+from src.api.instrumentation import BUCKETS
+
+QUEUE_FULL, QUEUE_TIMEOUT, DEADLINE = "queue_full", "queue_timeout", "deadline"
+OVERLOADED_BODY = b'{"detail":"Server overloaded, retry later."}'
+DEADLINE_BODY = b'{"detail":"Request deadline exceeded before the model ran."}'
+
+ADMITTED = Counter(
+    "admission_admitted_total",
+    "Prediction requests admitted by the admission controller."
+)
+SHED = Counter(
+    "admission_shed_total",
+    "Prediction requests answered with 503 by the admission controller, by reason.",
+    ["reason"]
+)
+QUEUE_TIME = Histogram(
+    "admission_queue_seconds",
+    "Time prediction requests waited for admission, shed requests included.",
+    buckets=BUCKETS + (2.5, 5.0)
+)
+LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive limit on concurrent prediction requests.",
+    multiprocess_mode="liveall"
+)
+IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Prediction requests currently admitted.",
+    multiprocess_mode="livesum"
+)
+
+
+class AdmissionController:
+    """
+    AIMD concurrency limit for the prediction routes. Latency is averaged over windows of one limit's
+    worth of completed requests (at least `min_window`), roughly one round trip. In windows where the
+    limit was reached, a mean slower than `target_latency_ms` multiplies the limit by `decrease_factor`
+    and a faster one adds `increase`; when it was not reached, the limit is not what made requests slow. Requests over the limit wait in a FIFO queue for up to
+    `max_queue_wait_ms`; it holds at most `max_queue`, and no more than the limit is expected to work
+    through in that time at the last window's latency, so hopeless requests are shed at once.
+    All methods run on the event loop.
+    """
+
+    def __init__(self, paths: list = None, initial_limit: int = 16, min_limit: int = 1, max_limit: int = 256,
+                 target_latency_ms: float = 100, increase: float = 1.0, decrease_factor: float = 0.7,
+                 min_window: int = 10, max_queue: int = 64, max_queue_wait_ms: float = 100, retry_after_s: int = 1,
+                 deadline_header: str = "X-Request-Timeout-Ms"):
+        self.paths = set(paths or ["/predict", "/predict/batch", "/predict/bulk"])
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency_ms / 1000.0
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.min_window = min_window
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait_ms / 1000.0
+        self.retry_after = str(retry_after_s)
+        self.deadline_header = deadline_header.lower().encode("latin-1")
+        self.in_flight = 0
+        self._waiters = collections.deque()
+        self._window_count = 0
+        self._window_latency = 0.0
+        self._window_saturated = False
+        self._mean_latency = None
+        LIMIT.set(self.limit)
+
+    def deadline(self, scope: dict, arrival: float):
+        """Monotonic deadline from the client's header (milliseconds it will wait), or None."""
+        for name, value in scope["headers"]:
+            if name == self.deadline_header:
+                try:
+                    return arrival + float(value) / 1000.0
+                except ValueError:
+                    return None
+        return None
+
+    def queue_bound(self) -> int:
+        if self._mean_latency is None:
+            return self.max_queue
+        return min(self.max_queue, int(self.limit * self.max_queue_wait / self._mean_latency))
+
+    async def acquire(self, deadline: float = None):
+        """
+        Waits for a slot; returns None once admitted, or the reason the request is shed: QUEUE_TIMEOUT
+        after max_queue_wait, DEADLINE if the client's deadline came first.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+        if deadline is not None and deadline <= time.monotonic():
+            return DEADLINE
+        if len(self._waiters) >= self.queue_bound():
+            return QUEUE_FULL
+
+        timeout, expired = self.max_queue_wait, QUEUE_TIMEOUT
+        if deadline is not None and deadline - time.monotonic() <= timeout:
+            # The client gives up first (or already has): running out of time is its deadline
+            timeout, expired = deadline - time.monotonic(), DEADLINE
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as the wait ran out: pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            return expired
+        return None
+
+    def release(self, latency: float = None):
+        """Frees a slot, adjusting the limit to the latency of the request that held it."""
+        if latency is not None:
+            self._adjust(latency)
+        self.in_flight -= 1
+        # Slots are handed over directly, so a newly arriving request cannot overtake the queue
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adjust(self, latency: float):
+        self._window_count += 1
+        self._window_latency += latency
+        self._window_saturated |= self.in_flight >= int(self.limit)
+        if self._window_count < max(int(self.limit), self.min_window):
+            return
+        self._mean_latency = self._window_latency / self._window_count
+        if self._window_saturated:
+            if self._mean_latency > self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            else:
+                self.limit = min(self.max_limit, self.limit + self.increase)
+        self._window_count, self._window_latency, self._window_saturated = 0, 0.0, False
+        LIMIT.set(self.limit)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the AdmissionController returned by `controller()` to its paths.
+    Requests pass straight through while it returns None (admission control disabled, or the
+    API still starting, in which case the routes answer 503 themselves).
+    """
+
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller()
+        if controller is None or scope["type"] != "http" or scope["path"] not in controller.paths:
+            await self.app(scope, receive, send)
+            return
+
+        arrival = time.monotonic()
+        deadline = controller.deadline(scope, arrival)
+        reason = await controller.acquire(deadline)
+        admitted_at = time.monotonic()
+        QUEUE_TIME.observe(admitted_at - arrival)
+        if reason is None and deadline is not None and admitted_at >= deadline:
+            # The client has given up on this one; do not spend model time on it
+            controller.release()
+            reason = DEADLINE
+        if reason is not None:
+            SHED.labels(reason).inc()
+            await self._shed(controller, reason, scope, receive, send)
+            return
+
+        ADMITTED.inc()
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            IN_FLIGHT.dec()
+            controller.release(time.monotonic() - admitted_at)
+
+    @staticmethod
+    async def _shed(controller, reason: str, scope, receive, send):
+        # Kept as cheap as possible: under overload most requests end here
+        if reason == DEADLINE:
+            response = Response(DEADLINE_BODY, status_code=503, media_type="application/json")
+        else:
+            response = Response(OVERLOADED_BODY, status_code=503, media_type="application/json",
+                                headers={"Retry-After": controller.retry_after})
+        await response(scope, receive, send)
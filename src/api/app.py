@@ -1,61 +1,567 @@
 # This script is developed to provide an API for the Iris Classifier model.
 # It includes endpoints for making predictions and handling input validation.
 # The API uses FastAPI and integrates with MLflow for model management.
+# Importing it loads nothing heavy: create_app() reads the config and initializes the log database and
+# the model in the lifespan startup, optionally in the background while /healthz already answers, and
+# MLflow, pandas and SQLAlchemy are only imported there, when they are needed.
 
-from fastapi import FastAPI, HTTPException, Request, status
+import hmac
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Union
+
+import numpy as np
+from fastapi import APIRouter, Body, Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError
 
-from src.api.predict import load_production_model, predict
+from src.api import bulk_formats
+from src.api.admission import AdmissionController, AdmissionMiddleware
+from src.api.batching import MicroBatcher
+from src.api.cache import PredictionCache
+from src.api.drift_monitor import DriftMonitor
+from src.api.instrumentation import observe_since
+from src.api.log_config import configure_logging, stop_logging
+from src.api.model_manager import ModelManager, manager_options
+from src.api.model_pool import PRIMARY, ModelPool, pool_enabled
+from src.api.predict import predict, predict_batch, raw_columns
+from src.api.profiler import collapsed, sample_stacks
 from src.utils import load_config
 from prometheus_fastapi_instrumentator import Instrumentator
-from app_logging import log_prediction, init_db, log_error
 
-app = FastAPI(title="Iris Classifier API")
-init_db()
-Instrumentator().instrument(app).expose(app)
-config = load_config("src/config/model_config.yaml")
-model_name = config["model"]["registry_name"]
-model = load_production_model(model_name)
+logger = logging.getLogger(__name__)
+
+# MODEL_CONFIG_PATH points the API at another config, e.g. for load tests
+DEFAULT_CONFIG_PATH = "src/config/model_config.yaml"
+
+# Under the multi-process launcher (src/api/server.py) the model was preloaded before this worker
+# was forked, and model updates are rolled out by the launcher restarting workers one at a time
+launcher_pid = int(os.getenv("SERVING_LAUNCHER_PID", "0")) or None
+
+# Set by _initialize() during startup. Routes that use them depend on require_ready, so they answer
+# 503 until it has finished. There is one app per process (uvicorn and launcher workers are processes).
+models = batcher = drift_monitor = prediction_cache = pool = admission = None
+bulk_max_rows, bulk_bounds = 1_000_000, None
+# Bound from app_logging by _initialize(), so SQLAlchemy is not imported with this module
+log_prediction = log_error = log_predictions = log_errors = log_prediction_array = None
+
+_ready = threading.Event()
+_startup_error = None
+
+router = APIRouter()
+
+def _initialize(config: dict):
+    """Connects the prediction log storage, loads and warms the model and starts the optional features."""
+    global models, batcher, drift_monitor, prediction_cache, pool, admission, bulk_max_rows, bulk_bounds
+    global log_prediction, log_error, log_predictions, log_errors, log_prediction_array
+    from app_logging import (
+        configure_storage, init_db, log_error, log_errors, log_prediction, log_prediction_array, log_predictions,
+        start_log_writer, start_rollup_compactor,
+    )
+
+    model_name = config["model"]["registry_name"]
+    serving_config = config.get("serving", {})
+
+    # Prediction log storage: sqlite, postgres or segments (LOG_STORAGE overrides the config)
+    configure_storage(**serving_config.get("log_storage", {}))
+    init_db()
+
+    drift_config = serving_config.get("drift", {})
+    models = ModelManager(model_name, **manager_options(serving_config))
+
+    # Optional background watcher that hot reloads new Production versions
+    hot_reload_config = serving_config.get("hot_reload", {})
+    if hot_reload_config.get("enabled", False) and launcher_pid is None:
+        models.start_watcher(hot_reload_config.get("poll_interval_s", 60))
+
+    # Optional micro-batching of concurrent /predict calls
+    batching_config = serving_config.get("batching", {})
+    if batching_config.get("enabled", False):
+        batcher = MicroBatcher(
+            models,
+            window_ms=batching_config.get("window_ms", 2),
+            max_batch_size=batching_config.get("max_batch_size", 64),
+        )
+
+    # Optional drift statistics against the reference saved at training time
+    if drift_config.get("enabled", False):
+        drift_monitor = DriftMonitor(refresh_interval_s=drift_config.get("refresh_interval_s", 5))
+
+    # Optional cache of predictions for repeated feature vectors
+    cache_config = dict(serving_config.get("prediction_cache", {}))
+    if cache_config.pop("enabled", False):
+        prediction_cache = PredictionCache(**cache_config)
+
+    # Optional canary and shadow versions served next to Production
+    pool_config = serving_config.get("pool", {})
+    if pool_enabled(pool_config):
+        pool_load_options = manager_options(serving_config)
+        # Pool members are pinned versions: no drift reference and no registry lookups after loading
+        pool_load_options.pop("drift_reference")
+        pool_load_options.pop("registry_ttl_s")
+        pool = ModelPool(models, **pool_config, **pool_load_options)
+
+    # Optional adaptive limit on concurrent predictions, shedding the excess with 503
+    admission_config = dict(serving_config.get("admission", {}))
+    if admission_config.pop("enabled", False):
+        admission = AdmissionController(**admission_config)
+
+    # Binary bulk scoring on /predict/bulk
+    bulk_config = serving_config.get("bulk", {})
+    bulk_max_rows = bulk_config.get("max_rows", 1_000_000)
+    bulk_bounds = bulk_config.get("feature_bounds")
+
+    # Optional background writer for prediction logs
+    log_writer_config = dict(serving_config.get("log_writer", {}))
+    if log_writer_config.pop("enabled", False):
+        start_log_writer(**log_writer_config)
+
+    # Optional per-minute/per-hour rollups of the prediction logs, and pruning of old raw rows
+    rollup_config = dict(serving_config.get("rollups", {}))
+    if rollup_config.pop("enabled", False):
+        start_rollup_compactor(**rollup_config)
+
+def _initialize_in_thread(config: dict):
+    global _startup_error
+    try:
+        _initialize(config)
+    except Exception as e:
+        logger.exception("API startup failed")
+        _startup_error = f"{type(e).__name__}: {e}"
+        return
+    _ready.set()
+    logger.info("API ready: serving '%s' version %s", models.model_name, models.current.version)
+
+async def _shutdown():
+    from app_logging import close_storage, stop_log_writer, stop_rollup_compactor
+
+    if models is not None:
+        models.stop_watcher()
+    if batcher is not None:
+        await batcher.close()
+    if pool is not None:
+        await run_in_threadpool(pool.close)
+    # Flush queued log rows after the last predictions have been made
+    await run_in_threadpool(stop_log_writer)
+    await run_in_threadpool(stop_rollup_compactor)
+    await run_in_threadpool(close_storage)
+    stop_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    config = load_config(app.state.config_path)
+    serving_config = config.get("serving", {})
+    app.state.allow_unauthenticated_admin = serving_config.get("admin", {}).get("allow_unauthenticated", False)
+
+    # Request logging: legacy, queue (JSON written by a background thread, sampled) or disabled
+    logging_config = serving_config.get("logging", {})
+    configure_logging(
+        mode=logging_config.get("mode", "legacy"),
+        log_file=logging_config.get("file", "logs/prediction.log"),
+        sample_rates=logging_config.get("sample_rates"),
+    )
+
+    # In the background, the server accepts connections (and answers /healthz) while the model loads.
+    # Launcher workers start from the preloaded model and the launcher waits for startup to complete,
+    # so they initialize in the foreground.
+    background = serving_config.get("startup", {}).get("background_init", False) and launcher_pid is None
+    startup = threading.Thread(target=_initialize_in_thread, args=(config,), name="api-startup", daemon=True)
+    startup.start()
+    if not background:
+        await run_in_threadpool(startup.join)
+        if _startup_error is not None:
+            raise RuntimeError(f"API startup failed: {_startup_error}")
+    yield
+    # A shutdown during a background startup waits for it, so everything it started is stopped
+    await run_in_threadpool(startup.join)
+    await _shutdown()
+
+async def require_ready():
+    """Routes that use the model or the log storage answer 503 until startup has finished."""
+    if not _ready.is_set():
+        detail = "API startup failed." if _startup_error is not None else "The model is still loading."
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": "1"})
 
 class IrisFeatures(BaseModel):
-    sepal_length: float
-    sepal_width: float
-    petal_length: float
-    petal_width: float
+    # NaN and infinity are valid JSON floats for the parser but not measurements; reject them per row
+    sepal_length: float = Field(allow_inf_nan=False)
+    sepal_width: float = Field(allow_inf_nan=False)
+    petal_length: float = Field(allow_inf_nan=False)
+    petal_width: float = Field(allow_inf_nan=False)
+
+def require_admin(request: Request, x_admin_token: str = Header(None)):
+    """
+    Admin endpoints require the X-Admin-Token header to match ADMIN_TOKEN. Without ADMIN_TOKEN they
+    are closed, unless serving.admin.allow_unauthenticated opts in (e.g. for local development).
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        if getattr(request.app.state, "allow_unauthenticated_admin", False):
+            return
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them.")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required.")
 
-@app.get("/")
+@router.get("/")
 def read_root():
     return {"message": "Welcome to the Iris Classifier API!"}
 
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is serving. Fails only when startup failed, so the container gets restarted."""
+    if _startup_error is not None:
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            content={"status": "failed", "detail": _startup_error})
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness: the model is loaded and warmed, and the prediction log storage can be reached."""
+    if not _ready.is_set():
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content={"status": "failed" if _startup_error is not None else "starting"})
+    from app_logging import ping_storage
+
+    try:
+        await run_in_threadpool(ping_storage)
+    except Exception as e:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content={"status": "log storage unavailable", "detail": str(e)})
+    return {"status": "ready", "model_version": models.current.version}
+
+@router.post("/admin/reload", dependencies=[Depends(require_admin), Depends(require_ready)])
+async def reload_model(force: bool = False):
+    """
+    Loads and warms the current Production version off the request path, then swaps it in.
+    Under the multi-process launcher this asks the launcher for a rolling restart instead,
+    so that every worker moves to the new version.
+    """
+    previous = models.current.version
+    if launcher_pid is not None:
+        os.kill(launcher_pid, signal.SIGHUP)
+        return {"reloaded": "rolling restart requested", "previous_version": previous, "version": previous}
+    try:
+        swapped = await run_in_threadpool(models.reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+    return {"reloaded": swapped, "previous_version": previous, "version": models.current.version}
+
+_profile_lock = threading.Lock()
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, interval_ms: float = 5.0, include_idle: bool = False):
+    """
+    Samples the stacks of all threads for `seconds` while traffic keeps flowing, and returns
+    collapsed stacks for flamegraph.pl or speedscope. One profile runs at a time.
+    """
+    if not 0 < seconds <= 120 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 120] and interval_ms in [1, 1000].")
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running.")
+    try:
+        stacks = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0, include_idle)
+    finally:
+        _profile_lock.release()
+    return collapsed(stacks)
+
 # --- NEW EXCEPTION HANDLER ---
-@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Extract details from the exception
     error_detail = exc.errors()
-    # Log the error using your log_error function
-    log_error(
-        data={"input_data": exc.body},
-        error_message=f"Validation Error: {error_detail}",
-        version=model_name
-    )
+    # Log the error using your log_error function (the log storage exists once startup has finished)
+    if _ready.is_set():
+        await run_in_threadpool(
+            log_error, {"input_data": exc.body}, f"Validation Error: {error_detail}", models.current.version
+        )
     # Return a 422 HTTP response to the client
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": error_detail},
+        content={"detail": _json_safe(jsonable_encoder(error_detail))},
     )
 
-@app.post("/predict")
-def make_prediction(features: IrisFeatures):
-    input_data = features.model_dump()
-    
+def _json_safe(value):
+    """Replaces NaN and infinity (echoed back in validation errors) with strings, which JSON can carry."""
+    if isinstance(value, float) and not np.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+def _validate_features(payload) -> dict:
+    """Validates a /predict body, raising the same 422 error FastAPI would for an IrisFeatures parameter."""
     try:
-        prediction = predict(model, input_data)
-        log_prediction(input_data, str(prediction), model_name)
+        return IrisFeatures.model_validate(payload).model_dump()
+    except ValidationError as e:
+        errors = [dict(error, loc=("body", *error["loc"])) for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=payload)
+
+async def _cache_call(function, *args):
+    """
+    Runs a prediction cache lookup or store. The local LRU is in memory and runs inline; with the
+    shared SQLite backend it may wait on a locked database, so it runs in the threadpool instead.
+    """
+    if prediction_cache.shared is None:
+        return function(*args)
+    return await run_in_threadpool(function, *args)
+
+def _route() -> tuple:
+    """(serving model, role) for a request: the pool's choice, or Production when there is no pool."""
+    return pool.route() if pool is not None else (models.current, PRIMARY)
+
+def _predict_batch(serving, role: str, raw: np.ndarray) -> np.ndarray:
+    if pool is not None:
+        return pool.predict_batch(serving, role, raw)
+    return predict_batch(serving.model, raw, serving.transform, serving.version)
+
+# The body is validated in the handler so validation gets its own stage timing;
+# the documented request schema is still IrisFeatures
+@router.post("/predict", dependencies=[Depends(require_ready)], openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": IrisFeatures.model_json_schema()}}}
+})
+async def make_prediction(payload: Any = Body(...)):
+    serving, role = _route()
+    version = serving.version
+    start = time.perf_counter_ns()
+    input_data = _validate_features(payload)
+    start = observe_since("validation", version, start)
+
+    try:
+        prediction = None
+        if prediction_cache is not None:
+            prediction = await _cache_call(prediction_cache.get, input_data, version)
+            start = observe_since("cache_lookup", version, start)
+
+        if prediction is None:
+            if batcher is not None and role == PRIMARY:
+                prediction, version = await batcher.submit(input_data)
+            elif pool is not None:
+                prediction = await run_in_threadpool(pool.predict, serving, role, input_data)
+            else:
+                prediction = await run_in_threadpool(predict, serving.model, input_data, serving.transform, version)
+            # Includes the threadpool hop or micro-batch wait around the model stages
+            start = observe_since("predict", version, start)
+            if prediction_cache is not None:
+                await _cache_call(prediction_cache.set, input_data, version, int(prediction))
+
+        if pool is not None:
+            pool.compare(serving, role, [[input_data[col] for col in raw_columns]], [prediction])
+        # Drift is tracked for Production only
+        if drift_monitor is not None and role == PRIMARY:
+            drift_monitor.observe(serving, input_data, prediction)
+            start = observe_since("drift", version, start)
+        await run_in_threadpool(log_prediction, input_data, str(prediction), version)
+        observe_since("log_write", version, start)
         return {"prediction": int(prediction)}
     
     except Exception as e:
         # This block will now only catch other, unexpected server errors (500s)
-        log_error(input_data, str(e), model_name)
-        raise HTTPException(status_code=500, detail="Prediction failed.")
\ No newline at end of file
+        await run_in_threadpool(log_error, input_data, str(e), version)
+        raise HTTPException(status_code=500, detail="Prediction failed.")
+
+def _batch_rows(payload) -> list:
+    """Normalizes a batch payload (list of rows or dict of columns) into a list of rows."""
+    if isinstance(payload, list):
+        return payload
+
+    lengths = {len(values) for values in payload.values()}
+    if len(lengths) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="All columns in a columnar batch must have the same length."
+        )
+    n_rows = lengths.pop() if lengths else 0
+    return [{name: values[i] for name, values in payload.items()} for i in range(n_rows)]
+
+@router.post("/predict/batch", dependencies=[Depends(require_ready)])
+def make_batch_prediction(
+    payload: Union[List[Any], Dict[str, List[Any]]] = Body(...)
+):
+    """
+    Scores a batch of rows with a single model call.
+    Accepts either a JSON array of rows or a columnar object of equal-length lists.
+    Rows that fail validation are reported in `errors` and do not abort the rest of the batch.
+    """
+    rows = _batch_rows(payload)
+    serving, role = _route()
+    start = time.perf_counter_ns()
+
+    valid_index, valid_rows = [], []
+    error_index, error_rows, error_messages = [], [], []
+    for i, row in enumerate(rows):
+        try:
+            valid_rows.append(IrisFeatures.model_validate(row).model_dump())
+            valid_index.append(i)
+        except ValidationError as e:
+            error_index.append(i)
+            error_rows.append({"input_data": row})
+            error_messages.append(f"Validation Error: {e.errors(include_url=False)}")
+
+    start = observe_since("validation", serving.version, start)
+
+    predictions = [None] * len(rows)
+    if valid_rows:
+        raw = np.array([[r[col] for col in raw_columns] for r in valid_rows], dtype=np.float64)
+        try:
+            batch_predictions = _predict_batch(serving, role, raw)
+        except Exception as e:
+            log_errors(valid_rows, [str(e)] * len(valid_rows), serving.version)
+            raise HTTPException(status_code=500, detail="Prediction failed.")
+        start = time.perf_counter_ns()
+
+        for i, prediction in zip(valid_index, batch_predictions):
+            predictions[i] = int(prediction)
+        if pool is not None:
+            pool.compare(serving, role, raw, batch_predictions)
+        if drift_monitor is not None and role == PRIMARY:
+            drift_monitor.observe_batch(serving, raw, batch_predictions)
+            start = observe_since("drift", serving.version, start)
+        log_predictions(valid_rows, [str(p) for p in batch_predictions], serving.version)
+
+    if error_rows:
+        log_errors(error_rows, error_messages, serving.version)
+    observe_since("log_write", serving.version, start)
+
+    return {
+        "predictions": predictions,
+        "errors": [
+            {"index": i, "detail": message}
+            for i, message in zip(error_index, error_messages)
+        ],
+    }
+
+def _score_bulk(raw: np.ndarray, response_type: str):
+    """Validates, scores and logs a decoded bulk body; returns (body, headers)."""
+    serving, role = _route()
+    version = serving.version
+    start = time.perf_counter_ns()
+    valid = bulk_formats.valid_rows(raw, bulk_bounds)
+    invalid_index = np.flatnonzero(~valid)
+    start = observe_since("validation", version, start)
+
+    predictions = np.full(len(raw), bulk_formats.INVALID, dtype=np.int64)
+    if len(invalid_index) < len(raw):
+        valid_raw = raw[valid]
+        try:
+            batch_predictions = _predict_batch(serving, role, valid_raw)
+        except Exception as e:
+            log_error({"rows": len(valid_raw)}, str(e), version)
+            raise HTTPException(status_code=500, detail="Prediction failed.")
+        start = time.perf_counter_ns()
+        predictions[valid] = batch_predictions
+        if pool is not None:
+            pool.compare(serving, role, valid_raw, batch_predictions)
+        if drift_monitor is not None and role == PRIMARY:
+            drift_monitor.observe_batch(serving, valid_raw, batch_predictions)
+            start = observe_since("drift", version, start)
+        log_prediction_array(valid_raw, batch_predictions, version)
+
+    # Only rejected rows are turned into Python objects
+    messages = [bulk_formats.describe_invalid(raw[i], bulk_bounds) for i in invalid_index]
+    if messages:
+        log_errors([dict(zip(raw_columns, raw[i].tolist())) for i in invalid_index], messages, version)
+    start = observe_since("log_write", version, start)
+
+    headers = {"X-Model-Version": str(version), "X-Invalid-Rows": str(len(invalid_index))}
+    if response_type == bulk_formats.JSON:
+        body = json.dumps({
+            "predictions": [None if p == bulk_formats.INVALID else p for p in predictions.tolist()],
+            "errors": [{"index": int(i), "detail": m} for i, m in zip(invalid_index, messages)],
+        }, separators=(",", ":")).encode()
+    else:
+        body = bulk_formats.encode(predictions, valid, response_type)
+        headers["X-Prediction-Dtype"] = bulk_formats.packed_dtype(predictions).str
+    observe_since("encode", version, start)
+    return body, headers
+
+async def _read_bulk_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Reads a bulk body of at most `max_bytes`, answering 413 without reading it when Content-Length is
+    larger, and as soon as a chunked body grows past the limit.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"At most {bulk_max_rows} rows ({max_bytes} bytes) per request."
+    )
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    parts, size = [], 0
+    async for part in request.stream():
+        size += len(part)
+        if size > max_bytes:
+            raise too_large
+        parts.append(part)
+    return b"".join(parts)
+
+@router.post("/predict/bulk", dependencies=[Depends(require_ready)], openapi_extra={
+    "requestBody": {"required": True, "content": {
+        content_type: {"schema": {"type": "string", "format": "binary"}} for content_type in bulk_formats.INPUT_TYPES
+    }}
+})
+async def make_bulk_prediction(request: Request):
+    """
+    Scores a binary body of raw features: an Arrow IPC stream or file with the four feature
+    columns, a NumPy .npy (n, 4) array, or raw little-endian float32 rows (application/octet-stream).
+    The Accept header selects JSON, Arrow, .npy or packed integer predictions; by default the
+    response uses the request format. Rows with non-finite or out-of-bounds features are
+    rejected individually (null in Arrow, -1 otherwise) and counted in X-Invalid-Rows.
+    """
+    content_type = bulk_formats.media_type(request.headers.get("content-type"))
+    if content_type not in bulk_formats.INPUT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of {list(bulk_formats.INPUT_TYPES)}; send JSON to /predict/batch."
+        )
+    response_type = bulk_formats.negotiate(request.headers.get("accept"), content_type)
+    if response_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Accept must allow one of {list(bulk_formats.OUTPUT_TYPES)}."
+        )
+
+    body = await _read_bulk_body(request, bulk_formats.max_body_bytes(bulk_max_rows, content_type))
+    try:
+        raw = await run_in_threadpool(bulk_formats.decode, body, content_type)
+    except bulk_formats.BulkFormatError as e:
+        await run_in_threadpool(
+            log_error, {"content_type": content_type, "bytes": len(body)}, f"Validation Error: {e}",
+            models.current.version
+        )
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if len(raw) > bulk_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {bulk_max_rows} rows per request."
+        )
+
+    content, headers = await run_in_threadpool(_score_bulk, raw, response_type)
+    return Response(content=content, media_type=response_type, headers=headers)
+
+def create_app(config_path: str = None) -> FastAPI:
+    """
+    Builds the API for the config at `config_path` (default: MODEL_CONFIG_PATH, then the repo config).
+    Nothing is loaded until the lifespan startup; with serving.startup.background_init, /readyz
+    reports when the model and log storage are ready. Serve it with
+    `uvicorn --factory src.api.app:create_app`, or the module-level `app`.
+    """
+    app = FastAPI(title="Iris Classifier API", lifespan=lifespan)
+    app.state.config_path = config_path or os.getenv("MODEL_CONFIG_PATH", DEFAULT_CONFIG_PATH)
+    Instrumentator().instrument(app).expose(app)
+    # Outermost, so shed requests skip the other middleware (they are counted in admission_shed_total)
+    app.add_middleware(AdmissionMiddleware, controller=lambda: admission)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.include_router(router)
+    return app
+
+app = create_app()
@@ -0,0 +1,132 @@
+# This script is developed to micro-batch concurrent prediction requests.
+# Requests that arrive within a short window are grouped into one vectorized model call,
+# and each caller gets its own result back. Batch size and queue wait are exported to Prometheus.
+
+import asyncio
+import logging
+import time
+
+import numpy as np
+from prometheus_client import Histogram
+
+from src.api.predict import predict_batch, raw_columns
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    "prediction_batch_size",
+    "Number of requests grouped into one micro-batched model call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+QUEUE_WAIT = Histogram(
+    "prediction_batch_queue_wait_seconds",
+    "Time a request spent waiting in the micro-batch queue before model execution.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+class MicroBatcher:
+    """
+    Collects single-row requests for up to `window_ms` (or until `max_batch_size` rows)
+    and scores them with one predict_batch call on a worker thread.
+    `models` is a ModelManager; each batch runs on the model that is current when it starts.
+    """
+
+    def __init__(self, models, window_ms: float = 2.0, max_batch_size: int = 64):
+        self.models = models
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._worker = None
+
+    def _ensure_started(self):
+        # The queue and worker task must be created inside the running event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, input_data: dict):
+        """Queues one row of raw features and waits for (prediction, model version)."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        row = [input_data[col] for col in raw_columns]
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        # Block for the first request, then fill the batch until the window closes
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            BATCH_SIZE.observe(len(batch))
+            for _, _, enqueued in batch:
+                QUEUE_WAIT.observe(started - enqueued)
+
+            raw = np.array([row for row, _, _ in batch], dtype=np.float64)
+            serving = self.models.current
+            try:
+                predictions = await loop.run_in_executor(
+                    None, predict_batch, serving.model, raw, serving.transform, serving.version
+                )
+            except asyncio.CancelledError:
+                _shut_down(batch)
+                raise
+            except Exception:
+                logger.exception("Micro-batch of %d rows failed; scoring its rows one by one", len(batch))
+                await self._score_rows(batch, serving)
+                continue
+
+            for (_, future, _), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result((prediction, serving.version))
+
+    async def _score_rows(self, batch: list, serving):
+        """Scores the rows of a failed batch separately, so only the requests whose row fails get the error."""
+        loop = asyncio.get_running_loop()
+        for i, (row, future, _) in enumerate(batch):
+            raw = np.array([row], dtype=np.float64)
+            try:
+                prediction = await loop.run_in_executor(
+                    None, predict_batch, serving.model, raw, serving.transform, serving.version
+                )
+            except asyncio.CancelledError:
+                _shut_down(batch[i:])
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result((prediction[0], serving.version))
+
+    async def close(self):
+        """Stops the worker task; requests still queued are failed."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _shut_down([self._queue.get_nowait()])
+
+
+def _shut_down(batch: list):
+    for _, future, _ in batch:
+        if not future.done():
+            future.set_exception(RuntimeError("Micro-batcher shut down."))
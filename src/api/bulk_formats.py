@@ -0,0 +1,175 @@
+# This script is developed to decode and encode the binary bodies of /predict/bulk.
+# Requests (Arrow IPC, NumPy .npy or raw little-endian float32 rows) are read straight into an (n, 4)
+# array in RAW_COLUMNS order and checked with vectorized masks; responses are packed ints, .npy, Arrow or JSON.
+
+import io
+
+import numpy as np
+
+from src.feature_transform import RAW_COLUMNS
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+NPY = "application/x-npy"
+RAW_FLOAT32 = "application/octet-stream"
+JSON = "application/json"
+
+INPUT_TYPES = (ARROW_STREAM, ARROW_FILE, NPY, RAW_FLOAT32)
+# For RAW_FLOAT32, the response is the packed prediction array (dtype in the X-Prediction-Dtype header)
+OUTPUT_TYPES = (JSON, ARROW_STREAM, ARROW_FILE, NPY, RAW_FLOAT32)
+
+# Prediction of a rejected row in packed and .npy responses; Arrow responses use null instead
+INVALID = -1
+
+# Most bytes a row takes per input format (float64 features, plus Arrow validity bits), and the
+# allowance for headers, schemas and batch framing; bodies beyond that hold too many rows
+ROW_BYTES = {ARROW_STREAM: 40, ARROW_FILE: 40, NPY: 8 * len(RAW_COLUMNS), RAW_FLOAT32: 4 * len(RAW_COLUMNS)}
+OVERHEAD_BYTES = 1 << 20
+
+
+class BulkFormatError(ValueError):
+    """The body cannot be read as an (n, 4) array of raw features."""
+
+
+def media_type(header: str) -> str:
+    """The media type of a Content-Type or Accept entry, without parameters."""
+    return (header or "").split(";", 1)[0].strip().lower()
+
+
+def negotiate(accept: str, request_type: str):
+    """
+    Picks the response type for an Accept header, preferring higher q values.
+    A missing Accept or */* answers in the format of the request; returns None if nothing matches.
+    """
+    if not accept:
+        return request_type
+    ranges = []
+    for position, entry in enumerate(accept.split(",")):
+        params = entry.split(";")
+        q = 1.0
+        for param in params[1:]:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((-q, position, media_type(entry)))
+    for negative_q, _, candidate in sorted(ranges):
+        if negative_q == 0:
+            break
+        if candidate in ("*/*", "application/*"):
+            return request_type
+        if candidate in OUTPUT_TYPES:
+            return candidate
+    return None
+
+
+def _read_arrow(body: bytes, content_type: str) -> np.ndarray:
+    import pyarrow as pa
+
+    try:
+        source = pa.py_buffer(body)
+        reader = pa.ipc.open_stream(source) if content_type == ARROW_STREAM else pa.ipc.open_file(source)
+        table = reader.read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise BulkFormatError(f"Body is not a valid Arrow IPC {content_type.rsplit('.', 1)[-1]}: {e}")
+
+    missing = [col for col in RAW_COLUMNS if col not in table.column_names]
+    if missing:
+        raise BulkFormatError(f"Arrow table is missing columns: {missing}")
+    raw = np.empty((table.num_rows, len(RAW_COLUMNS)), dtype=np.float64)
+    for i, col in enumerate(RAW_COLUMNS):
+        try:
+            column = table.column(col).cast(pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise BulkFormatError(f"Column {col} is not numeric: {e}")
+        # Nulls come out as NaN and are rejected with the other non-finite values
+        raw[:, i] = column.to_numpy()
+    return raw
+
+
+def _read_npy(body: bytes) -> np.ndarray:
+    try:
+        array = np.load(io.BytesIO(body), allow_pickle=False)
+    except (ValueError, OSError, EOFError) as e:
+        raise BulkFormatError(f"Body is not a valid .npy array: {e}")
+    if array.ndim != 2 or array.shape[1] != len(RAW_COLUMNS) or array.dtype.kind not in "fiu":
+        raise BulkFormatError(
+            f"Expected a numeric (n, {len(RAW_COLUMNS)}) array, got {array.dtype} with shape {array.shape}"
+        )
+    return array.astype(np.float64, copy=False)
+
+
+def _read_raw_float32(body: bytes) -> np.ndarray:
+    row_bytes = 4 * len(RAW_COLUMNS)
+    if len(body) % row_bytes:
+        raise BulkFormatError(f"Body length {len(body)} is not a multiple of {row_bytes} bytes (rows of 4 float32)")
+    return np.frombuffer(body, dtype="<f4").reshape(-1, len(RAW_COLUMNS)).astype(np.float64)
+
+
+def max_body_bytes(max_rows: int, content_type: str) -> int:
+    """Largest body of `content_type` that can hold `max_rows` rows."""
+    return max_rows * ROW_BYTES[content_type] + OVERHEAD_BYTES
+
+
+def decode(body: bytes, content_type: str) -> np.ndarray:
+    """Reads a request body of `content_type` into an (n, 4) float64 array in RAW_COLUMNS order."""
+    if content_type in (ARROW_STREAM, ARROW_FILE):
+        return _read_arrow(body, content_type)
+    if content_type == NPY:
+        return _read_npy(body)
+    if content_type == RAW_FLOAT32:
+        return _read_raw_float32(body)
+    raise BulkFormatError(f"Unsupported content type {content_type!r}")
+
+
+def valid_rows(raw: np.ndarray, bounds=None) -> np.ndarray:
+    """Boolean mask of rows whose features are all finite and, with `bounds` (low, high), inside it."""
+    ok = np.isfinite(raw)
+    if bounds is not None:
+        low, high = bounds
+        ok &= (raw >= low) & (raw <= high)
+    return ok.all(axis=1)
+
+
+def describe_invalid(row: np.ndarray, bounds=None) -> str:
+    """Validation message for one rejected row."""
+    problems = []
+    for col, value in zip(RAW_COLUMNS, row.tolist()):
+        if not np.isfinite(value):
+            problems.append(f"{col} is not a finite number")
+        elif bounds is not None and not bounds[0] <= value <= bounds[1]:
+            problems.append(f"{col}={value} is outside [{bounds[0]}, {bounds[1]}]")
+    return "Validation Error: " + "; ".join(problems)
+
+
+def packed_dtype(predictions: np.ndarray) -> np.dtype:
+    """int8 when every label (and INVALID) fits, int32 otherwise; always little-endian."""
+    if predictions.size == 0 or (predictions.min() >= -128 and predictions.max() <= 127):
+        return np.dtype("<i1")
+    return np.dtype("<i4")
+
+
+def encode(predictions: np.ndarray, valid: np.ndarray, response_type: str) -> bytes:
+    """
+    Encodes integer predictions (INVALID where `valid` is False) as `response_type`:
+    a packed array, a .npy file, or an Arrow table with a nullable "prediction" column.
+    """
+    packed = predictions.astype(packed_dtype(predictions), copy=False)
+    if response_type == RAW_FLOAT32:
+        return packed.tobytes()
+    if response_type == NPY:
+        buffer = io.BytesIO()
+        np.save(buffer, packed, allow_pickle=False)
+        return buffer.getvalue()
+    if response_type in (ARROW_STREAM, ARROW_FILE):
+        import pyarrow as pa
+
+        table = pa.table({"prediction": pa.array(packed, mask=~valid)})
+        sink = pa.BufferOutputStream()
+        new_writer = pa.ipc.new_stream if response_type == ARROW_STREAM else pa.ipc.new_file
+        with new_writer(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unsupported response type {response_type!r}")
@@ -0,0 +1,173 @@
+# This script is developed to cache predictions for repeated feature vectors.
+# Keys are the (optionally rounded) four raw features plus the model version, so a model swap
+# invalidates every entry. A local LRU/TTL cache can be backed by a SQLite file shared by workers.
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+from src.api.predict import raw_columns
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = Counter("prediction_cache_hits_total", "Prediction cache hits.", ["layer"])
+CACHE_MISSES = Counter("prediction_cache_misses_total", "Prediction cache misses.", ["layer"])
+CACHE_EVICTIONS = Counter("prediction_cache_evictions_total", "Prediction cache evictions.", ["layer"])
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    layer = "local"
+
+    def __init__(self, max_size: int = 10000, ttl_s: float = 300):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < now:
+                del self._entries[key]
+                CACHE_EVICTIONS.labels(self.layer).inc()
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.layer).inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    Cache shared by every worker on a host, stored in a SQLite file.
+    Stand-in for a networked backend such as Redis; values are stored as text.
+    """
+
+    layer = "shared"
+
+    def __init__(self, path: str, max_size: int = 100000, ttl_s: float = 300, prune_every: int = 256):
+        self.path = path
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prediction_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_prediction_cache_expires ON prediction_cache (expires)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers in other workers proceed during writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM prediction_cache WHERE key = ? AND expires >= ?", (repr(key), time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO prediction_cache (key, value, expires) VALUES (?, ?, ?)",
+            (repr(key), str(value), now + self.ttl_s),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every:
+            return
+
+        # Prune expired rows, then the soonest-expiring rows beyond max_size
+        evicted = conn.execute("DELETE FROM prediction_cache WHERE expires < ?", (now,)).rowcount
+        evicted += conn.execute(
+            "DELETE FROM prediction_cache WHERE key IN (SELECT key FROM prediction_cache "
+            "ORDER BY expires DESC LIMIT -1 OFFSET ?)", (self.max_size,)
+        ).rowcount
+        if evicted > 0:
+            CACHE_EVICTIONS.labels(self.layer).inc(evicted)
+
+    def clear(self):
+        self._connect().execute("DELETE FROM prediction_cache")
+
+
+class PredictionCache:
+    """
+    Two-level prediction cache: a local LRU in front of an optional shared backend.
+    Values read from the shared backend come back as strings and are converted with `value_type`.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_s: float = 300, quantize_decimals: int = None,
+                 shared_path: str = None, value_type=int):
+        self.local = LocalCache(max_size, ttl_s)
+        self.shared = SQLiteCache(shared_path, max_size * 10, ttl_s) if shared_path else None
+        self.quantize_decimals = quantize_decimals
+        self.value_type = value_type
+
+    def key(self, input_data: dict, version: str) -> tuple:
+        values = tuple(float(input_data[col]) for col in raw_columns)
+        if self.quantize_decimals is not None:
+            values = tuple(round(v, self.quantize_decimals) for v in values)
+        return (version,) + values
+
+    def get(self, input_data: dict, version: str):
+        # Entries of every served version (e.g. Production and a canary) live side by side in the
+        # LRU; those of a retired version can no longer hit and age out
+        key = self.key(input_data, version)
+
+        value = self.local.get(key)
+        if value is not None:
+            CACHE_HITS.labels(self.local.layer).inc()
+            return value
+        CACHE_MISSES.labels(self.local.layer).inc()
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except sqlite3.Error as e:
+                logger.warning("Shared prediction cache read failed: %s", e)
+                value = None
+            if value is not None:
+                CACHE_HITS.labels(self.shared.layer).inc()
+                value = self.value_type(value)
+                self.local.set(key, value)
+                return value
+            CACHE_MISSES.labels(self.shared.layer).inc()
+        return None
+
+    def set(self, input_data: dict, version: str, value):
+        key = self.key(input_data, version)
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning("Shared prediction cache write failed: %s", e)
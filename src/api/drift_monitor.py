@@ -0,0 +1,96 @@
+# This script is developed to expose input and prediction drift as Prometheus gauges.
+# Every prediction updates in-process statistics (see src/drift.py) for the model that served it,
+# and PSI/KL scores against that model's training reference are computed when Prometheus scrapes.
+
+import threading
+import time
+
+from prometheus_client import Gauge
+
+from src.api.instrumentation import set_gauge_function
+from src.drift import DriftStats
+from src.feature_transform import RAW_COLUMNS
+
+DRIFT_PSI = Gauge(
+    "prediction_drift_psi",
+    "PSI of served inputs (per feature) and predictions (feature=class) against the training reference.",
+    ["feature"], multiprocess_mode="liveall"
+)
+DRIFT_KL = Gauge(
+    "prediction_drift_kl",
+    "KL divergence of served inputs (per feature) and predictions (feature=class) from the training reference.",
+    ["feature"], multiprocess_mode="liveall"
+)
+# Under the multi-process launcher every worker sees part of the traffic and reports its own
+# series (labelled by pid); series of exited workers are removed
+FEATURE_MEAN = Gauge(
+    "prediction_feature_mean", "Streaming mean of served raw features.", ["feature"], multiprocess_mode="liveall"
+)
+FEATURE_STD = Gauge(
+    "prediction_feature_std", "Streaming standard deviation of served raw features.", ["feature"],
+    multiprocess_mode="liveall"
+)
+DRIFT_OBSERVATIONS = Gauge(
+    "prediction_drift_observations",
+    "Predictions included in the drift statistics since the serving model was loaded.",
+    multiprocess_mode="liveall"
+)
+
+
+class DriftMonitor:
+    """
+    Tracks drift for the model currently being served.
+    Statistics restart when a new model version shows up, since it brings its own reference.
+    Scores are recomputed at most every `refresh_interval_s`, however often Prometheus scrapes.
+    """
+
+    def __init__(self, refresh_interval_s: float = 5.0):
+        self.refresh_interval_s = refresh_interval_s
+        self._version = None
+        self._stats = None
+        self._swap_lock = threading.Lock()
+        self._scores = {}
+        self._scored_at = 0.0
+        self._scores_lock = threading.Lock()
+
+        set_gauge_function(DRIFT_OBSERVATIONS, lambda: self.scores().get("count", 0))
+        for feature in RAW_COLUMNS:
+            self._bind(FEATURE_MEAN, "mean", feature)
+            self._bind(FEATURE_STD, "std", feature)
+        for feature in RAW_COLUMNS + ["class"]:
+            self._bind(DRIFT_PSI, "psi", feature)
+            self._bind(DRIFT_KL, "kl", feature)
+
+    def _bind(self, gauge, key: str, feature: str):
+        set_gauge_function(gauge.labels(feature), lambda: self.scores().get(key, {}).get(feature, float("nan")))
+
+    def _stats_for(self, serving):
+        """Returns the statistics for `serving`, starting new ones when the version changes."""
+        if serving.version == self._version:
+            return self._stats
+        with self._swap_lock:
+            if serving.version != self._version:
+                reference = serving.drift_reference
+                self._stats = DriftStats(reference) if reference is not None else None
+                self._version = serving.version
+                self._scored_at = 0.0
+        return self._stats
+
+    def observe(self, serving, input_data: dict, prediction):
+        stats = self._stats_for(serving)
+        if stats is not None:
+            stats.update([input_data[col] for col in RAW_COLUMNS], prediction)
+
+    def observe_batch(self, serving, raw, predictions):
+        stats = self._stats_for(serving)
+        if stats is not None:
+            stats.update_batch(raw, predictions)
+
+    def scores(self) -> dict:
+        now = time.monotonic()
+        with self._scores_lock:
+            if now - self._scored_at >= self.refresh_interval_s:
+                stats = self._stats
+                self._scores = stats.scores() if stats is not None else {}
+                self._scored_at = now
+            return self._scores
@@ -0,0 +1,150 @@
+# This script is developed to compile a fitted scikit-learn estimator into plain NumPy arrays.
+# It supports LogisticRegression, DecisionTreeClassifier and RandomForestClassifier, and evaluates
+# single rows and batches without pandas, pyfunc schema handling or sklearn input validation.
+
+import numpy as np
+
+
+class CompiledModel:
+    """
+    Base class for compiled estimators.
+    `predict` takes an (n, d) array whose columns follow `input_columns` and returns class labels;
+    like sklearn, it raises ValueError for infinite input, and for NaN unless `allow_nan`.
+    """
+
+    # Estimators whose sklearn predict handles missing values (trees in recent sklearn versions)
+    allow_nan = False
+
+    def __init__(self, classes, column_index=None):
+        self.classes = np.asarray(classes)
+        # Maps the serving column order onto the order the estimator was fitted with
+        self.column_index = None if column_index is None else np.asarray(column_index, dtype=np.intp)
+
+    def _prepare(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # As in sklearn's input validation: NaN scores would argmax to class 0 and NaN splits all go right
+        if not np.isfinite(X).all():
+            if np.isinf(X).any():
+                raise ValueError("Input contains infinity or a value too large for dtype('float32').")
+            if not self.allow_nan:
+                raise ValueError("Input contains NaN.")
+        if self.column_index is not None:
+            X = X[:, self.column_index]
+        return X
+
+    def predict_index(self, X) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[self.predict_index(self._prepare(X))]
+
+
+class CompiledLinearModel(CompiledModel):
+    """Linear classifier: argmax of X @ coef.T + intercept."""
+
+    def __init__(self, coef, intercept, classes, column_index=None):
+        super().__init__(classes, column_index)
+        self.coef_t = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+
+    def predict_index(self, X) -> np.ndarray:
+        scores = X @ self.coef_t + self.intercept
+        if scores.shape[1] == 1:
+            # Binary case: a single decision function, positive means classes[1]
+            return (scores[:, 0] > 0).astype(np.intp)
+        return np.argmax(scores, axis=1)
+
+
+class CompiledForest(CompiledModel):
+    """
+    One or more decision trees flattened into shared node arrays.
+    Leaves point to themselves, so every row can be walked for exactly `depth` steps
+    without masking, and all trees are evaluated together. Where sklearn supports missing
+    values, NaN features follow each split's `missing_go_to_left` as in sklearn.
+    """
+
+    def __init__(self, trees, classes, column_index=None):
+        super().__init__(classes, column_index)
+        self.allow_nan = all(hasattr(tree, "missing_go_to_left") for tree in trees)
+        feature, threshold, left, right, missing_left, proba, roots = [], [], [], [], [], [], []
+        offset = 0
+        self.depth = 0
+        for tree in trees:
+            n_nodes = tree.node_count
+            nodes = np.arange(n_nodes) + offset
+            is_leaf = tree.children_left == -1
+
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            if self.allow_nan:
+                missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+
+            # Leaf values are class counts or fractions depending on the sklearn version
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            proba.append(np.divide(value, totals, out=np.zeros_like(value), where=totals != 0))
+
+            roots.append(offset)
+            offset += n_nodes
+            self.depth = max(self.depth, tree.max_depth)
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.missing_left = np.concatenate(missing_left) if self.allow_nan else None
+        self.proba = np.concatenate(proba)
+        self.roots = np.asarray(roots, dtype=np.intp)
+
+    def leaves(self, X) -> np.ndarray:
+        """Returns the (n_trees, n) leaf node index reached by each row in each tree."""
+        # sklearn trees compare float32 inputs against the split thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])
+        node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        missing = self.allow_nan and np.isnan(X).any()
+        for _ in range(self.depth):
+            values = X[rows, self.feature[node]]
+            go_left = values <= self.threshold[node]
+            if missing:
+                go_left = np.where(np.isnan(values), self.missing_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.proba[self.leaves(self._prepare(X))].mean(axis=0)
+
+    def predict_index(self, X) -> np.ndarray:
+        return np.argmax(self.proba[self.leaves(X)].mean(axis=0), axis=1)
+
+
+def compile_estimator(estimator, input_columns=None) -> CompiledModel:
+    """
+    Lowers a fitted estimator to a CompiledModel.
+    If `input_columns` is given and the estimator was fitted on a DataFrame, serving columns
+    are reordered to match the training order. Raises ValueError for unsupported estimators.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    column_index = None
+    feature_names = getattr(estimator, "feature_names_in_", None)
+    if input_columns is not None and feature_names is not None:
+        missing = [name for name in feature_names if name not in input_columns]
+        if missing:
+            raise ValueError(f"Estimator expects columns not provided at serving time: {missing}")
+        column_index = [list(input_columns).index(name) for name in feature_names]
+
+    if isinstance(estimator, LogisticRegression):
+        return CompiledLinearModel(estimator.coef_, estimator.intercept_, estimator.classes_, column_index)
+    if isinstance(estimator, DecisionTreeClassifier):
+        return CompiledForest([estimator.tree_], estimator.classes_, column_index)
+    if isinstance(estimator, RandomForestClassifier):
+        return CompiledForest([tree.tree_ for tree in estimator.estimators_], estimator.classes_, column_index)
+
+    raise ValueError(f"Estimator '{type(estimator).__name__}' cannot be compiled.")
@@ -0,0 +1,153 @@
+# This script is developed to time individual stages of the prediction path.
+# Spans use perf_counter_ns and are exported as one Prometheus histogram labelled by stage and
+# model version, so a p99 regression can be traced to validation, preprocessing, the model call or logging.
+# Observations go to per-thread bucket counts that are merged at scrape time, so recording a span
+# takes no lock. Under the multi-process launcher (src/api/server.py) metrics must go through
+# prometheus_client's shared files instead, so spans and function gauges switch to that there.
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import Histogram
+from prometheus_client.core import REGISTRY, HistogramMetricFamily
+
+# Set by the launcher before prometheus_client is imported; every worker then writes metric files there
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# How often function gauges are written to the shared files in multi-process mode
+GAUGE_REFRESH_S = 5.0
+
+METRIC_NAME = "prediction_stage_seconds"
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Bucket bounds in nanoseconds, so a span is bucketed without converting it first
+_BOUNDS_NS = [int(b * 1e9) for b in BUCKETS]
+
+
+class StageCollector:
+    """Prometheus collector for stage timings recorded into per-thread counters."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables = []
+        # Counts from threads that have exited; histograms are cumulative, so they are kept
+        self._retired = {}
+
+    def _table(self) -> dict:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append((threading.current_thread(), table))
+        return table
+
+    def observe_ns(self, stage: str, version, duration_ns: int):
+        table = self._table()
+        key = (stage, version)
+        entry = table.get(key)
+        if entry is None:
+            # Bucket counts (the last one is +Inf) followed by the sum in nanoseconds
+            entry = table[key] = [0] * (len(_BOUNDS_NS) + 2)
+        entry[bisect.bisect_left(_BOUNDS_NS, duration_ns)] += 1
+        entry[-1] += duration_ns
+
+    @staticmethod
+    def _add(total: dict, table: dict):
+        for key, entry in list(table.items()):
+            into = total.setdefault(key, [0] * len(entry))
+            for i, value in enumerate(entry):
+                into[i] += value
+
+    def collect(self):
+        with self._lock:
+            alive = []
+            for thread, table in self._tables:
+                if thread.is_alive():
+                    alive.append((thread, table))
+                else:
+                    self._add(self._retired, table)
+            self._tables = alive
+            merged = {}
+            self._add(merged, self._retired)
+        for _, table in alive:
+            self._add(merged, table)
+
+        family = HistogramMetricFamily(
+            METRIC_NAME, "Time spent in each stage of the prediction path.", labels=["stage", "model_version"]
+        )
+        for (stage, version), entry in sorted(merged.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            cumulative, buckets = 0, []
+            for bound, count in zip(list(BUCKETS) + [float("inf")], entry[:-1]):
+                cumulative += count
+                buckets.append((str(bound) if bound != float("inf") else "+Inf", cumulative))
+            family.add_metric([stage, str(version)], buckets, entry[-1] / 1e9)
+        yield family
+
+
+class SharedStageHistogram:
+    """Stage timings as a regular Histogram, whose values the multi-process collector merges across workers."""
+
+    def __init__(self):
+        self._histogram = Histogram(
+            METRIC_NAME, "Time spent in each stage of the prediction path.", ["stage", "model_version"],
+            buckets=BUCKETS,
+        )
+        self._children = {}
+
+    def observe_ns(self, stage: str, version, duration_ns: int):
+        key = (stage, version)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._histogram.labels(stage, str(version))
+        child.observe(duration_ns / 1e9)
+
+
+if MULTIPROCESS:
+    STAGES = SharedStageHistogram()
+else:
+    STAGES = StageCollector()
+    REGISTRY.register(STAGES)
+
+
+def observe_since(stage: str, version, start_ns: int) -> int:
+    """Records the time since `start_ns` for `stage` and returns now, to start the next stage."""
+    now = time.perf_counter_ns()
+    STAGES.observe_ns(stage, version, now - start_ns)
+    return now
+
+
+_bound = []
+_bound_lock = threading.Lock()
+_refresher = None
+
+
+def _refresh_gauges():
+    while True:
+        time.sleep(GAUGE_REFRESH_S)
+        with _bound_lock:
+            bound = list(_bound)
+        for gauge, fn in bound:
+            try:
+                gauge.set(fn())
+            except Exception as e:
+                logging.getLogger(__name__).warning("Gauge refresh failed: %s", e)
+
+
+def set_gauge_function(gauge, fn):
+    """
+    Gauge.set_function, which only reaches the in-process registry; in multi-process mode a
+    background thread writes fn() to the shared files every GAUGE_REFRESH_S instead.
+    """
+    global _refresher
+    if not MULTIPROCESS:
+        gauge.set_function(fn)
+        return
+    with _bound_lock:
+        _bound.append((gauge, fn))
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_gauges, name="gauge-refresher", daemon=True)
+            _refresher.start()
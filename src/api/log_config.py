@@ -0,0 +1,148 @@
+# This script is developed to configure application logging for the API.
+# "legacy" keeps the original synchronous file + console handlers. "queue" hands records to a
+# QueueListener thread that writes JSON lines, with per-logger sampling applied before anything
+# is formatted. "disabled" drops everything below WARNING.
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+
+LEGACY_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class Lazy:
+    """Defers an expensive log argument, e.g. Lazy(array.tolist), until the record is formatted."""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self) -> str:
+        return str(self.fn())
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "pid": record.process,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records below WARNING per logger; warnings and errors always pass.
+    `sample_rates` maps logger names to rates, and a name also applies to its child loggers.
+    Rates are resolved once per logger name and then cached.
+    """
+
+    def __init__(self, sample_rates: dict = None, default_rate: float = 1.0):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.default_rate = default_rate
+        self._resolved = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = self.default_rate
+            # Most specific configured parent wins, e.g. "src.api" applies to "src.api.predict"
+            for prefix in sorted(self.sample_rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = self.sample_rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is.
+    The stock handler formats the message on the calling thread; here the message and its
+    arguments are only stringified by the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _legacy_handlers(log_file: str) -> list:
+    return [
+        logging.FileHandler(log_file),  # Save logs to a file
+        logging.StreamHandler()         # Also print logs to console
+    ]
+
+
+def configure_logging(mode: str = "legacy", log_file: str = "logs/prediction.log",
+                      sample_rates: dict = None, level: str = "INFO"):
+    """Configures the root logger for the API in one of the modes described above."""
+    global _listener
+    stop_logging()
+
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    if mode == "legacy":
+        for handler in _legacy_handlers(log_file):
+            handler.setFormatter(logging.Formatter(LEGACY_FORMAT))
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    elif mode == "queue":
+        handlers = _legacy_handlers(log_file)
+        for handler in handlers:
+            handler.setFormatter(JsonFormatter())
+
+        records = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(records)
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    elif mode == "disabled":
+        root.addHandler(logging.StreamHandler())
+        root.setLevel(logging.WARNING)
+
+    else:
+        raise ValueError(f"Unknown logging mode '{mode}'.")
+
+
+def stop_logging():
+    """Flushes and stops the queue listener, if one is running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
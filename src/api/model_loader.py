@@ -0,0 +1,242 @@
+# This script is developed to resolve and load the Production model with a local artifact cache.
+# The registry is asked once for the Production version, and the fitted estimator is cached as an
+# uncompressed joblib file keyed by model name and version, so restarts can load it with mmap.
+# Specific versions (e.g. canary and shadow models, see src/api/model_pool.py) load the same way.
+# The feature transform and drift reference logged next to the model are cached alongside it.
+
+import json
+import logging
+import os
+import time
+
+import joblib
+
+from src.drift import ARTIFACT_NAME as DRIFT_ARTIFACT
+from src.drift import load_reference
+from src.feature_transform import ARTIFACT_NAME as TRANSFORM_ARTIFACT
+from src.feature_transform import FeatureTransform
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACKING_URI = "file:/app/mlruns"
+
+
+def set_tracking_uri():
+    import mlflow
+
+    mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI))
+    logger.info("MLflow tracking URI: %s", mlflow.get_tracking_uri())
+
+
+def resolve_production_version(model_name: str) -> dict:
+    """Asks the registry for the current Production version of `model_name`."""
+    from mlflow.tracking import MlflowClient
+
+    set_tracking_uri()
+    versions = MlflowClient().get_latest_versions(model_name, stages=["Production"])
+    if not versions:
+        raise Exception(f"No model in Production stage for '{model_name}'.")
+
+    mv = versions[0]
+    return {
+        "name": model_name,
+        "version": str(mv.version),
+        "run_id": mv.run_id,
+        "model_uri": f"runs:/{mv.run_id}/model",
+    }
+
+
+def resolve_model_version(model_name: str, version: str) -> dict:
+    """Asks the registry for a specific version of `model_name`, whatever its stage."""
+    from mlflow.tracking import MlflowClient
+
+    set_tracking_uri()
+    mv = MlflowClient().get_model_version(model_name, str(version))
+    return {
+        "name": model_name,
+        "version": str(mv.version),
+        "run_id": mv.run_id,
+        "model_uri": f"runs:/{mv.run_id}/model",
+    }
+
+
+def resolve_family_version(model_name: str, family: str) -> str:
+    """Latest registered version of `model_name` trained as `family` (the model_family tag set by train_model.py)."""
+    from mlflow.tracking import MlflowClient
+
+    set_tracking_uri()
+    versions = [
+        mv for mv in MlflowClient().search_model_versions(f"name='{model_name}'")
+        if mv.tags.get("model_family") == family
+    ]
+    if not versions:
+        raise Exception(f"No version of '{model_name}' is tagged model_family={family}.")
+    return str(max(int(mv.version) for mv in versions))
+
+
+def load_feature_transform(model_uri: str):
+    """
+    Downloads the feature transform logged next to the model.
+    Returns None for models logged before the transform existed.
+    """
+    import mlflow.artifacts
+
+    try:
+        path = mlflow.artifacts.download_artifacts(artifact_uri=f"{model_uri}/{TRANSFORM_ARTIFACT}")
+    except Exception as e:
+        logger.warning("No feature transform logged with %s (%s); inputs will not be scaled", model_uri, e)
+        return None
+    return FeatureTransform.load(path)
+
+
+def load_drift_reference(meta: dict, cache_dir: str = None):
+    """
+    Loads the drift reference statistics logged next to the model, through the cache when there is one.
+    Returns None for models logged before the reference existed.
+    """
+    cached_path = None
+    if cache_dir:
+        cached_path = os.path.join(_model_dir(cache_dir, meta["name"], meta["version"]), DRIFT_ARTIFACT)
+        if os.path.exists(cached_path):
+            return load_reference(cached_path)
+
+    import mlflow.artifacts
+
+    set_tracking_uri()
+    try:
+        path = mlflow.artifacts.download_artifacts(artifact_uri=f"{meta['model_uri']}/{DRIFT_ARTIFACT}")
+    except Exception as e:
+        logger.warning("No drift reference logged with %s (%s); drift will not be tracked", meta["model_uri"], e)
+        return None
+
+    reference = load_reference(path)
+    if cached_path:
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        _write_json(cached_path, reference)
+    return reference
+
+
+def _model_dir(cache_dir: str, model_name: str, version: str = None) -> str:
+    path = os.path.join(cache_dir, model_name)
+    return path if version is None else os.path.join(path, version)
+
+
+def _read_current(cache_dir: str, model_name: str):
+    path = os.path.join(_model_dir(cache_dir, model_name), "current.json")
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, payload: dict):
+    # Write to a temp file and rename so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _is_cached(cache_dir: str, meta: dict) -> bool:
+    return os.path.exists(os.path.join(_model_dir(cache_dir, meta["name"], meta["version"]), "model.joblib"))
+
+
+def _store(cache_dir: str, meta: dict, estimator, transform):
+    version_dir = _model_dir(cache_dir, meta["name"], meta["version"])
+    os.makedirs(version_dir, exist_ok=True)
+    model_path = os.path.join(version_dir, "model.joblib")
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    # No compression, so numpy arrays can be memory-mapped on load
+    joblib.dump(estimator, tmp_path, compress=0)
+    os.replace(tmp_path, model_path)
+    if transform is not None:
+        _write_json(os.path.join(version_dir, TRANSFORM_ARTIFACT), transform.to_dict())
+    _write_json(os.path.join(version_dir, "meta.json"), meta)
+
+
+def store_local_model(cache_dir: str, model_name: str, version: str, estimator, transform=None,
+                      drift_reference: dict = None) -> dict:
+    """
+    Puts a locally fitted estimator in the cache as the current version of `model_name`, so the API
+    can serve it without a registry (e.g. for load tests) as long as registry_ttl_s covers its age.
+    """
+    meta = {"name": model_name, "version": str(version), "run_id": None, "model_uri": None,
+            "resolved_at": time.time()}
+    _store(cache_dir, meta, estimator, transform)
+    if drift_reference is not None:
+        _write_json(os.path.join(_model_dir(cache_dir, model_name, meta["version"]), DRIFT_ARTIFACT), drift_reference)
+    _write_json(os.path.join(_model_dir(cache_dir, model_name), "current.json"), meta)
+    return meta
+
+
+def resolve_cached_version(model_name: str, cache_dir: str, registry_ttl_s: float = 0) -> dict:
+    """
+    Returns the version metadata to serve.
+    A cached pointer younger than `registry_ttl_s` is trusted without contacting the registry;
+    otherwise the registry is asked once, and the cache is used if the registry is unreachable.
+    """
+    current = _read_current(cache_dir, model_name)
+    if current is not None and time.time() - current.get("resolved_at", 0) < registry_ttl_s:
+        logger.info("Using cached Production version %s of '%s'", current["version"], model_name)
+        return current
+
+    try:
+        meta = resolve_production_version(model_name)
+    except Exception as e:
+        if current is None:
+            raise
+        logger.warning("Registry lookup failed (%s); serving cached version %s", e, current["version"])
+        return current
+
+    meta["resolved_at"] = time.time()
+    return meta
+
+
+def _load_cached(cache_dir: str, meta: dict):
+    """Loads the estimator and transform of `meta` from the cache, downloading and caching them first if needed."""
+    model_name = meta["name"]
+    version_dir = _model_dir(cache_dir, model_name, meta["version"])
+
+    if _is_cached(cache_dir, meta):
+        logger.info("Loading '%s' version %s from cache %s", model_name, meta["version"], version_dir)
+        estimator = joblib.load(os.path.join(version_dir, "model.joblib"), mmap_mode="r")
+        transform_path = os.path.join(version_dir, TRANSFORM_ARTIFACT)
+        transform = FeatureTransform.load(transform_path) if os.path.exists(transform_path) else None
+    else:
+        import mlflow.sklearn
+
+        logger.info("Downloading '%s' version %s from %s", model_name, meta["version"], meta["model_uri"])
+        estimator = mlflow.sklearn.load_model(meta["model_uri"])
+        transform = load_feature_transform(meta["model_uri"])
+        _store(cache_dir, meta, estimator, transform)
+    return estimator, transform
+
+
+def load_estimator(model_name: str, cache_dir: str, registry_ttl_s: float = 0):
+    """
+    Loads the Production sklearn estimator and its feature transform for `model_name`,
+    through the local cache. Returns (estimator, transform, meta) where meta holds the
+    registry version and run id; transform is None if none was logged with the model.
+    """
+    meta = resolve_cached_version(model_name, cache_dir, registry_ttl_s)
+    estimator, transform = _load_cached(cache_dir, meta)
+
+    os.makedirs(_model_dir(cache_dir, model_name), exist_ok=True)
+    _write_json(os.path.join(_model_dir(cache_dir, model_name), "current.json"), meta)
+    return estimator, transform, meta
+
+
+def load_estimator_version(model_name: str, version: str, cache_dir: str):
+    """
+    Loads a specific version of `model_name` through the local cache, like load_estimator.
+    Versions are immutable, so a cached copy is used without asking the registry.
+    """
+    version_dir = _model_dir(cache_dir, model_name, str(version))
+    try:
+        with open(os.path.join(version_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = resolve_model_version(model_name, version)
+    estimator, transform = _load_cached(cache_dir, meta)
+    return estimator, transform, meta
@@ -0,0 +1,132 @@
+# This script is developed to hot reload the Production model without restarting the API.
+# A new registry version is loaded and warmed off the request path, then swapped in atomically;
+# requests that already picked up the old model finish on it.
+# A launcher can preload the model before forking workers (see src/api/server.py); managers created
+# in the workers then serve that copy, whose pages all workers share.
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from src.api.model_loader import load_drift_reference, resolve_production_version
+from src.api.predict import load_model_version, predict_batch
+
+logger = logging.getLogger(__name__)
+
+# A few representative raw rows (one per Iris class) used to warm a model before it serves traffic
+WARMUP_ROWS = np.array([
+    [5.1, 3.5, 1.4, 0.2],
+    [6.4, 3.2, 4.5, 1.5],
+    [6.3, 3.3, 6.0, 2.5],
+])
+
+
+@dataclass(frozen=True)
+class ServingModel:
+    """A loaded model, its feature transform, drift reference and the registry version they came from."""
+    model: Any
+    transform: Any
+    name: str
+    version: str
+    drift_reference: Any = None
+
+
+# Models loaded before the workers were forked, by model name
+_preloaded = {}
+
+
+def manager_options(serving_config: dict) -> dict:
+    """ModelManager keyword arguments from the `serving` config section."""
+    return dict(
+        drift_reference=serving_config.get("drift", {}).get("enabled", False),
+        engine=serving_config.get("engine", "pyfunc"),
+        cache_dir=serving_config.get("model_cache_dir"),
+        registry_ttl_s=serving_config.get("registry_ttl_s", 0),
+    )
+
+
+def load_serving_model(model_name: str, drift_reference: bool = False, **load_options) -> ServingModel:
+    """
+    Loads and warms a model (the Production one, or `version` in load_options) with its feature
+    transform and, if `drift_reference`, the drift reference logged with it.
+    """
+    model, transform, meta = load_model_version(model_name, **load_options)
+    # Warm up caches, lazy imports and compiled paths before serving traffic
+    predict_batch(model, WARMUP_ROWS, transform, version="warmup")
+    reference = load_drift_reference(meta, load_options.get("cache_dir")) if drift_reference else None
+    return ServingModel(
+        model=model, transform=transform, name=model_name, version=meta["version"], drift_reference=reference,
+    )
+
+
+def preload(model_name: str, drift_reference: bool = False, **load_options) -> ServingModel:
+    """Loads and warms the model in this process; ModelManagers created afterwards start from it."""
+    serving = ModelManager(model_name, drift_reference, **load_options).current
+    _preloaded[model_name] = serving
+    return serving
+
+
+class ModelManager:
+    """
+    Holds the model currently being served.
+    Handlers read `current` once per request and use that snapshot throughout,
+    so a swap never changes the model or version under an in-flight request.
+    """
+
+    def __init__(self, model_name: str, drift_reference: bool = False, **load_options):
+        self.model_name = model_name
+        self.drift_reference = drift_reference
+        self.load_options = load_options
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        preloaded = _preloaded.get(model_name)
+        if preloaded is not None:
+            self.current = preloaded
+        else:
+            self.current = self._load(registry_ttl_s=load_options.get("registry_ttl_s", 0))
+
+    def _load(self, **overrides) -> ServingModel:
+        return load_serving_model(self.model_name, self.drift_reference, **dict(self.load_options, **overrides))
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Loads the current Production version if it differs from the one being served.
+        Returns True if a new model was swapped in.
+        """
+        with self._reload_lock:
+            if not force:
+                latest = resolve_production_version(self.model_name)
+                if latest["version"] == self.current.version:
+                    return False
+
+            # Always ask the registry here; a cached pointer would hide the new version
+            candidate = self._load(registry_ttl_s=0)
+            previous = self.current
+            self.current = candidate
+            logger.info("Swapped '%s' version %s -> %s", self.model_name, previous.version, candidate.version)
+            return True
+
+    def _watch(self, interval_s: float):
+        while not self._stop.wait(interval_s):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error("Model reload check failed: %s", e)
+
+    def start_watcher(self, interval_s: float = 60):
+        """Polls the registry for a new Production version in a background thread."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(
+                target=self._watch, args=(interval_s,), name="model-reload-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
@@ -0,0 +1,171 @@
+# This script is developed to serve several registry versions of the model side by side.
+# A canary version answers a configurable share of the requests, and shadow versions score the same
+# inputs on a background executor once the response no longer waits for them. Per-model latency and
+# disagreement with Production are exported as metrics, and the paired predictions are logged.
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+from src.api.instrumentation import BUCKETS
+from src.api.model_loader import resolve_family_version
+from src.api.model_manager import load_serving_model
+from src.api.predict import predict, predict_batch
+
+logger = logging.getLogger(__name__)
+
+PRIMARY, CANARY, SHADOW = "primary", "canary", "shadow"
+
+MODEL_LATENCY = Histogram(
+    "model_pool_predict_seconds",
+    "Duration of the model call (preprocessing and predict) per model version and role.",
+    ["model_version", "role"], buckets=BUCKETS
+)
+COMPARISONS = Counter(
+    "model_pool_comparisons_total",
+    "Rows scored by both a canary or shadow model and the Production model.",
+    ["model_version", "role"]
+)
+DISAGREEMENTS = Counter(
+    "model_pool_disagreements_total",
+    "Rows where a canary or shadow model predicted a different class than the Production model.",
+    ["model_version", "role"]
+)
+SHADOW_DROPPED = Counter(
+    "model_pool_shadow_dropped_total",
+    "Comparisons skipped because too many were already waiting for the executor."
+)
+
+
+def pool_enabled(pool_config: dict) -> bool:
+    canary = pool_config.get("canary") or {}
+    has_canary = (canary.get("version") or canary.get("family")) and canary.get("percent", 0) > 0
+    return bool(has_canary or pool_config.get("shadows"))
+
+
+class ModelPool:
+    """
+    Serves the Production model held by `models` together with an optional canary and shadows.
+    Canary and shadow specs name a registry `version` or a model `family` (its latest version).
+    Handlers call route() to pick the model for a request, predict()/predict_batch() to score
+    with it, and compare() to queue the comparison against the other models.
+    """
+
+    def __init__(self, models, canary: dict = None, shadows: list = None, executor_workers: int = 1,
+                 max_pending: int = 1000, sample_rate: float = 1.0, log_predictions: bool = True,
+                 **load_options):
+        self.models = models
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.log_predictions = log_predictions
+        self.load_options = load_options
+
+        canary = canary or {}
+        self.canary_percent = canary.get("percent", 0)
+        self.canary = self._load(canary) if canary and self.canary_percent > 0 else None
+        self.shadows = [member for member in (self._load(spec) for spec in shadows or []) if member is not None]
+
+        self._latency = {}
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="model-pool-shadow")
+
+    def _load(self, spec: dict):
+        """Loads a canary or shadow model; one that cannot be loaded is skipped so Production keeps serving."""
+        model_name = self.models.model_name
+        try:
+            version = spec.get("version") or resolve_family_version(model_name, spec["family"])
+            serving = load_serving_model(model_name, version=str(version), **self.load_options)
+        except Exception as e:
+            logger.error("Could not load pool model %s: %s", spec, e)
+            return None
+        logger.info("Pool model '%s' version %s loaded (%s)", model_name, serving.version, spec)
+        return serving
+
+    def members(self) -> list:
+        """(role, version) of every model in the pool, Production first."""
+        members = [(PRIMARY, self.models.current.version)]
+        if self.canary is not None:
+            members.append((CANARY, self.canary.version))
+        members.extend((SHADOW, shadow.version) for shadow in self.shadows)
+        return members
+
+    def route(self) -> tuple:
+        """Returns (serving model, role) for a request: the canary for canary_percent of them."""
+        primary = self.models.current
+        canary = self.canary
+        if canary is not None and canary.version != primary.version and random.random() * 100 < self.canary_percent:
+            return canary, CANARY
+        return primary, PRIMARY
+
+    def _observe(self, version, role: str, seconds: float):
+        key = (version, role)
+        child = self._latency.get(key)
+        if child is None:
+            child = self._latency[key] = MODEL_LATENCY.labels(str(version), role)
+        child.observe(seconds)
+
+    def predict(self, serving, role: str, input_data: dict):
+        start = time.perf_counter()
+        prediction = predict(serving.model, input_data, serving.transform, serving.version)
+        self._observe(serving.version, role, time.perf_counter() - start)
+        return prediction
+
+    def predict_batch(self, serving, role: str, raw: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        predictions = predict_batch(serving.model, raw, serving.transform, serving.version)
+        self._observe(serving.version, role, time.perf_counter() - start)
+        return predictions
+
+    def compare(self, serving, role: str, raw, predictions):
+        """
+        Queues the comparison for a scored request: shadows re-score Production's requests, and
+        Production re-scores the canary's. Returns immediately; when max_pending comparisons are
+        already waiting, this one is dropped.
+        """
+        if (role == PRIMARY and not self.shadows) or random.random() >= self.sample_rate:
+            return
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                SHADOW_DROPPED.inc()
+                return
+            self._pending += 1
+        self._executor.submit(self._compare, serving, role, np.asarray(raw, dtype=np.float64), np.asarray(predictions))
+
+    def _compare(self, serving, role: str, raw: np.ndarray, predictions: np.ndarray):
+        try:
+            if role == CANARY:
+                primary = self.models.current
+                primary_predictions = predict_batch(primary.model, raw, primary.transform, primary.version)
+                self._record(serving.version, CANARY, raw, predictions, primary.version, primary_predictions)
+            else:
+                for shadow in self.shadows:
+                    if shadow.version == serving.version:
+                        continue
+                    shadow_predictions = self.predict_batch(shadow, SHADOW, raw)
+                    self._record(shadow.version, SHADOW, raw, shadow_predictions, serving.version, predictions)
+        except Exception as e:
+            logger.warning("Shadow comparison failed: %s", e)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def _record(self, version, role: str, raw, predictions, primary_version, primary_predictions):
+        labels = (str(version), role)
+        COMPARISONS.labels(*labels).inc(len(predictions))
+        DISAGREEMENTS.labels(*labels).inc(int(np.count_nonzero(
+            predictions.astype(str) != primary_predictions.astype(str)
+        )))
+        if self.log_predictions:
+            from app_logging import log_shadow_predictions
+
+            log_shadow_predictions(raw, predictions, version, role, primary_predictions, primary_version)
+
+    def close(self):
+        """Waits for queued comparisons to finish."""
+        self._executor.shutdown(wait=True)
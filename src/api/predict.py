@@ -2,31 +2,28 @@
 # It includes endpoints for making predictions and handling input validation.
 # The API uses FastAPI and integrates with MLflow for model management.
 
-import mlflow.pyfunc
-import pandas as pd
-from mlflow.tracking import MlflowClient
+import numpy as np
 import logging
-import mlflow
-import os
+import time
 
-# ---- Ensure Logs Directory Exists ----
-if not os.path.exists("logs"):
-    os.makedirs("logs")
+from src.api.engine import CompiledModel, compile_estimator
+from src.api.instrumentation import observe_since
+from src.api.log_config import Lazy
+from src.api.model_loader import (
+    load_estimator, load_estimator_version, load_feature_transform, resolve_model_version, resolve_production_version
+)
+from src.feature_transform import FEATURE_COLUMNS, RAW_COLUMNS, engineer
 
-# ---- Setup Logging ----
+# mlflow and pandas are imported where they are needed: a model served from the local cache needs
+# neither to load, and compiled models take NumPy arrays, so the API imports quickly.
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/prediction.log"),  # Save logs to a file
-        logging.StreamHandler()                      # Also print logs to console
-    ]
-)
+# ---- Setup Logging ----
+# Handlers are configured by the app (see src/api/log_config.py). Messages use lazy %-style
+# arguments, so records dropped by sampling are never formatted.
+logger = logging.getLogger(__name__)
 
 #### Uncomment if you want to set up CloudWatch logging
 # # Set logger
-# logger = logging.getLogger(__name__)
 # logger.setLevel(logging.INFO)
 
 # # CloudWatch-compatible log format
@@ -39,76 +36,125 @@ logging.basicConfig(
 
 
 # ---- Model Feature Order ----
-expected_columns = [
-    "sepal_length",
-    "sepal_width",
-    "petal_length",
-    "petal_width",
-    "Petal_ratio", 
-    "Sepal_area",
-    "Petal_area"
-]
+expected_columns = FEATURE_COLUMNS
 
+# ---- Raw Input Feature Order ----
+raw_columns = RAW_COLUMNS
 
-# ---- Load Model from MLflow Registry ----
-def load_production_model(model_name: str):
-
-    mlflow.set_tracking_uri("file:/app/mlruns")
-    logging.info(f"MLflow tracking URI: {mlflow.get_tracking_uri()}")
 
-    client = MlflowClient()
-    for mv in client.search_model_versions(f"name='{model_name}'"):
-        if mv.current_stage == "Production":
-            #model_uri = mv.source
-            model_uri = f"runs:/{mv.run_id}/model"
-            logging.info(f"Loaded production model: {model_uri}")
-            #model = mlflow.pyfunc.load_model(model_uri)
-            model = mlflow.pyfunc.load_model("file:/app/mlruns/739693317334162311/7d6062c9b7e34346bf2e8816f046bd46/artifacts/model")
+# ---- Load Model from MLflow Registry ----
+def load_model_version(model_name: str, engine: str = "pyfunc", cache_dir: str = None,
+                       registry_ttl_s: float = 0, version: str = None):
+    """
+    Loads the Production model (or the given registry `version`) and returns (model, transform, meta).
+    transform is the FeatureTransform logged with the model (None for older models),
+    and meta holds the registry version and run id.
+    With a `cache_dir`, the fitted sklearn estimator is served from the local cache
+    (see src/api/model_loader.py) instead of the pyfunc wrapper.
+    With engine="compiled", the estimator is lowered to NumPy arrays (see src/api/engine.py);
+    unsupported estimators fall back to the uncompiled model.
+    """
+    if cache_dir:
+        if version is not None:
+            estimator, transform, meta = load_estimator_version(model_name, version, cache_dir)
+        else:
+            estimator, transform, meta = load_estimator(model_name, cache_dir, registry_ttl_s)
+        logger.info("Loaded model: %s version %s", model_name, meta["version"])
+        if engine == "compiled":
+            try:
+                return compile_estimator(estimator, expected_columns), transform, meta
+            except ValueError as e:
+                logger.warning("Falling back to sklearn estimator: %s", e)
+        return estimator, transform, meta
+
+    import mlflow.pyfunc
+    import mlflow.sklearn
+
+    meta = resolve_production_version(model_name) if version is None else resolve_model_version(model_name, version)
+    logger.info("Loaded model: %s", meta["model_uri"])
+    transform = load_feature_transform(meta["model_uri"])
+
+    if engine == "compiled":
+        try:
+            compiled = compile_estimator(mlflow.sklearn.load_model(meta["model_uri"]), expected_columns)
+            logger.info("Using compiled inference engine: %s", type(compiled).__name__)
+            return compiled, transform, meta
+        except ValueError as e:
+            logger.warning("Falling back to pyfunc model: %s", e)
+
+    return mlflow.pyfunc.load_model(meta["model_uri"]), transform, meta
+
+def load_production_model(model_name: str, **options):
+    """Loads the Production model from the registry (see load_model_version)."""
+    model, _, _ = load_model_version(model_name, **options)
+    return model
+
+# ---- Build Model Input ----
+def to_model_input(model, features: np.ndarray):
+    """Compiled models take the (n, 7) array directly; pyfunc models need a DataFrame."""
+    if isinstance(model, CompiledModel):
+        return features
+    import pandas as pd
+
+    return pd.DataFrame(features, columns=expected_columns)
+
+# ---- Preprocess Raw Inputs into Full Feature Set ----
+def preprocess_batch(raw: np.ndarray, transform=None) -> np.ndarray:
+    """
+    Takes an (n, 4) array in raw_columns order and returns the (n, 7) model input in expected_columns order.
+    With the model's fitted FeatureTransform this is the same scaling used at training time;
+    without one (models logged before it existed), only the engineered columns are added.
+    """
+    if transform is not None:
+        return transform.transform(raw)
+    return engineer(raw)
 
-            return model
-    raise Exception(f"No model in Production stage for '{model_name}'.")
+# ---- Make Prediction ----
+def predict(model, input_data: dict, transform=None, version=None):
+    """Scores one row of raw features; stage timings are labelled with the model `version`."""
+    logger.info("Received raw input: %s", input_data)
 
-# ---- Preprocess Raw Input into Full Feature Set ----
-def preprocess_input(input_data: dict):
     try:
-        sepal_length = input_data["sepal_length"]
-        sepal_width = input_data["sepal_width"]
-        petal_length = input_data["petal_length"]
-        petal_width = input_data["petal_width"]
-
-        processed = {
-            "sepal_length": sepal_length,
-            "sepal_width": sepal_width,
-            "petal_length": petal_length,
-            "petal_width": petal_width,
-            "Petal_area": petal_length * petal_width,
-            "Petal_ratio": petal_length / petal_width if petal_width != 0 else 0,
-            "Sepal_area": sepal_length * sepal_width,
-        }
-
-        logging.info(f"Processed input features: {processed}")
-        return processed
+        start = time.perf_counter_ns()
+        raw = np.array([[input_data[col] for col in raw_columns]], dtype=np.float64)
+        features = preprocess_batch(raw, transform)
+        start = observe_since("preprocess", version, start)
+        logger.info("Processed input features: %s", Lazy(features[0].tolist))
+
+        model_input = to_model_input(model, features)
+        start = observe_since("model_input", version, start)
+        predictions = model.predict(model_input)
+        observe_since("model_predict", version, start)
+        logger.info("Prediction output: %s", predictions[0])
+
+        return predictions[0]
 
     except KeyError as e:
-        logging.error(f"Missing required input field: {e}")
+        logger.error("Missing required input field: %s", e)
         raise
 
-# ---- Make Prediction ----
-def predict(model, input_data: dict):
-    logging.info(f"Received raw input: {input_data}")
+    except Exception as e:
+        logger.error("Prediction failed: %s", e)
+        raise
+
+# ---- Make Batch Prediction ----
+def predict_batch(model, raw: np.ndarray, transform=None, version=None) -> np.ndarray:
+    """Runs preprocessing and a single model.predict call for an (n, 4) array of raw features."""
+    logger.info("Received batch of %d rows", len(raw))
 
     try:
-        processed_data = preprocess_input(input_data)
-        input_df = pd.DataFrame(
-            [[processed_data[col] for col in expected_columns]],
-            columns=expected_columns
-        )
+        start = time.perf_counter_ns()
+        features = preprocess_batch(raw, transform)
+        start = observe_since("preprocess", version, start)
 
-        predictions = model.predict(input_df)
-        logging.info(f"Prediction output: {predictions[0]}")
+        model_input = to_model_input(model, features)
+        start = observe_since("model_input", version, start)
+        predictions = np.asarray(model.predict(model_input))
+        observe_since("model_predict", version, start)
+        logger.info("Batch prediction completed for %d rows", len(predictions))
 
-        return predictions[0]
+        return predictions
 
     except Exception as e:
-        logging.error(f"Prediction failed: {e}")
+        logger.error("Batch prediction failed: %s", e)
         raise
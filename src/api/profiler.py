@@ -0,0 +1,65 @@
+# This script is developed to profile the running API on demand.
+# A background thread samples the Python stack of every thread at a fixed interval and aggregates
+# the samples into collapsed stacks ("frame;frame;frame count"), the input format of flamegraph.pl,
+# speedscope and similar tools. Nothing is traced between samples, so live traffic is barely affected.
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of threads that are waiting for work (threadpool workers, the log listener, the event loop)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("handlers.py", "dequeue"),
+}
+
+_cwd = os.getcwd()
+_stdlib = sysconfig.get_paths()["stdlib"]
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    elif filename.startswith(_stdlib):
+        filename = os.path.relpath(filename, _stdlib)
+    elif filename.startswith(_cwd):
+        filename = os.path.relpath(filename, _cwd)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def sample_stacks(seconds: float, interval_s: float = 0.005, include_idle: bool = False) -> Counter:
+    """
+    Samples every thread's stack for `seconds` and returns a Counter of collapsed stacks.
+    The root frame of each stack is the thread name. Idle threads are skipped unless `include_idle`.
+    """
+    own_id = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (not include_idle and _is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(f"thread {names.get(thread_id, thread_id)}")
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval_s)
+    return stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    """Formats sampled stacks as collapsed-stack text, most frequent first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,396 @@
+# This script is developed to serve the API from several worker processes that share one copy of the model.
+# The launcher loads and warms the Production model once, then forks the uvicorn workers, so the model's
+# arrays are shared copy-on-write instead of being loaded by every worker. Workers write metrics to
+# PROMETHEUS_MULTIPROC_DIR, are replaced when they die, and are restarted one at a time on SIGHUP.
+#
+# Usage:
+#   python -m src.api.server --host 0.0.0.0 --port 8000    # one worker per CPU of the container's quota
+#   python -m src.api.server --workers 4
+#   kill -HUP <launcher pid>                               # rolling restart onto the current Production model
+
+import argparse
+import gc
+import logging
+import math
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+import uvicorn
+
+from src.utils import load_config
+
+logger = logging.getLogger(__name__)
+
+# Workers that die sooner than this after starting are restarted with a growing delay
+MIN_HEALTHY_UPTIME_S = 10.0
+MAX_RESTART_DELAY_S = 30.0
+
+
+def cpu_limit() -> float:
+    """CPUs available to this process: the cgroup CPU quota if one is set, else its CPU affinity."""
+    if hasattr(os, "sched_getaffinity"):
+        available = len(os.sched_getaffinity(0))
+    else:
+        available = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>", or "max <period>" without a limit
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means no limit
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    return min(available, quota) if quota else available
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY if set, else one worker per CPU of the quota (a fractional CPU counts as one)."""
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    return max(1, math.ceil(cpu_limit()))
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Binds the listening socket shared by all workers.
+    It is created with proto=IPPROTO_TCP so asyncio enables TCP_NODELAY on accepted connections;
+    uvicorn's own --workers socket has proto 0 and every response waits for a delayed ACK.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_metrics_dir(path: str = None) -> tuple:
+    """
+    Points prometheus_client at a directory shared by the workers, emptied of files from earlier runs.
+    Must run before prometheus_client is imported. Returns (path, created).
+    """
+    path = path or os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    created = path is None
+    if created:
+        path = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path, created
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the launcher through a pipe once the app has started."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+
+class Launcher:
+    """
+    Preloads the model, forks `workers` uvicorn processes serving `app` on one shared socket
+    and supervises them until SIGTERM or SIGINT.
+    """
+
+    def __init__(self, app: str, host: str, port: int, workers: int, config_path: str,
+                 startup_timeout_s: float = 120, graceful_timeout_s: float = 30, log_level: str = "info"):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.config_path = config_path
+        self.startup_timeout_s = startup_timeout_s
+        self.graceful_timeout_s = graceful_timeout_s
+        self.log_level = log_level
+
+        config = load_config(config_path)
+        self.model_name = config["model"]["registry_name"]
+        self.serving_config = config.get("serving", {})
+        self.serving = None
+        self.sock = None
+        self.workers = {}  # pid -> start time
+        self._restart_delay = 0.5
+        self._restart_at = 0.0
+        self._stopping = False
+        self._roll_requested = False
+
+    # --- model ---
+
+    def preload(self, registry_ttl_s: float = None):
+        """Loads the model in the launcher, so workers forked afterwards share it."""
+        from src.api.model_manager import manager_options, preload
+
+        options = manager_options(self.serving_config)
+        if registry_ttl_s is not None:
+            options["registry_ttl_s"] = registry_ttl_s
+        # Let the previous model's reference cycles be collected, then keep the new objects out of
+        # the workers' garbage collections, which would otherwise write to (and copy) their pages
+        gc.unfreeze()
+        self.serving = preload(self.model_name, **options)
+        gc.collect()
+        gc.freeze()
+        logger.info("Preloaded '%s' version %s", self.model_name, self.serving.version)
+
+    # --- workers ---
+
+    def _run_worker(self, ready_fd: int):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app, log_level=self.log_level, timeout_graceful_shutdown=self.graceful_timeout_s,
+        )
+        WorkerServer(config, ready_fd).run(sockets=[self.sock])
+
+    def spawn(self) -> tuple:
+        """Forks a worker; returns (pid, fd that becomes readable once it has started)."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 0
+            try:
+                self._run_worker(write_fd)
+            except SystemExit as e:
+                # uvicorn exits with 1 when the app cannot be imported
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                # Straight to stderr: the app's queued log handler does not survive os._exit
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stderr.flush()
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = time.monotonic()
+        return pid, read_fd
+
+    def spawn_ready(self, count: int) -> bool:
+        """Starts `count` workers and waits until they serve; if one fails, all of them are stopped."""
+        pending = {}
+        for _ in range(count):
+            pid, fd = self.spawn()
+            pending[fd] = pid
+        batch = list(pending.values())
+        deadline = time.monotonic() + self.startup_timeout_s
+        ok = True
+        while pending and ok:
+            remaining = deadline - time.monotonic()
+            readable = select.select(list(pending), [], [], remaining)[0] if remaining > 0 else []
+            if not readable:
+                logger.error("Workers %s did not start within %.0fs", list(pending.values()), self.startup_timeout_s)
+                ok = False
+            for fd in readable:
+                pid = pending.pop(fd)
+                if os.read(fd, 1) != b"1":
+                    logger.error("Worker %d did not start", pid)
+                    ok = False
+                os.close(fd)
+        for fd in pending:
+            os.close(fd)
+        if not ok:
+            for pid in batch:
+                if pid in self.workers:
+                    self.stop_worker(pid)
+        return ok
+
+    def stop_worker(self, pid: int):
+        """Asks a worker to finish its requests and exit, killing it after graceful_timeout_s."""
+        self.workers.pop(pid, None)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.graceful_timeout_s + 5
+        while True:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done:
+                break
+            if time.monotonic() > deadline:
+                logger.warning("Worker %d did not exit in time; killing it", pid)
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                break
+            time.sleep(0.05)
+        self._worker_gone(pid)
+
+    def _worker_gone(self, pid: int):
+        from prometheus_client import multiprocess
+
+        # Drops the exited worker's live gauges from the shared metrics
+        multiprocess.mark_process_dead(pid)
+
+    def reap(self):
+        """Collects workers that exited on their own; top_up replaces them."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            self._worker_gone(pid)
+            if started is None or self._stopping:
+                continue
+            logger.warning("Worker %d exited with status %d", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_HEALTHY_UPTIME_S:
+                self._backoff()
+            else:
+                self._restart_delay = 0.5
+
+    def _backoff(self):
+        self._restart_delay = min(self._restart_delay * 2, MAX_RESTART_DELAY_S)
+        self._restart_at = time.monotonic() + self._restart_delay
+
+    def top_up(self):
+        """Starts workers until there are n_workers again, backing off while they keep failing."""
+        missing = self.n_workers - len(self.workers)
+        if missing > 0 and time.monotonic() >= self._restart_at:
+            logger.info("Starting %d replacement workers", missing)
+            if not self.spawn_ready(missing):
+                self._backoff()
+
+    def roll(self):
+        """Loads the current Production model, then replaces the workers one at a time."""
+        previous = self.serving.version
+        try:
+            self.preload(registry_ttl_s=0)
+        except Exception as e:
+            logger.error("Rolling restart aborted, the model could not be loaded: %s", e)
+            return
+        logger.info("Rolling restart: version %s -> %s", previous, self.serving.version)
+        for old_pid in list(self.workers):
+            if not self.spawn_ready(1):
+                logger.error("Rolling restart aborted; remaining workers keep version %s", previous)
+                return
+            self.stop_worker(old_pid)
+        logger.info("Rolling restart finished")
+
+    def _production_changed(self) -> bool:
+        from src.api.model_loader import resolve_production_version
+
+        try:
+            return resolve_production_version(self.model_name)["version"] != self.serving.version
+        except Exception as e:
+            logger.error("Model reload check failed: %s", e)
+            return False
+
+    # --- main loop ---
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_hup(self, signum, frame):
+        self._roll_requested = True
+
+    def run(self) -> int:
+        os.environ["SERVING_LAUNCHER_PID"] = str(os.getpid())
+        self.sock = bind_socket(self.host, self.port)
+        self.preload()
+
+        if not self.spawn_ready(self.n_workers):
+            self.shutdown()
+            return 1
+        logger.info("Serving on %s:%d with %d workers", self.host, self.port, self.n_workers)
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        # Workers do not watch the registry themselves; the launcher rolls them when Production changes
+        hot_reload = self.serving_config.get("hot_reload", {})
+        poll_interval_s = hot_reload.get("poll_interval_s", 60) if hot_reload.get("enabled", False) else None
+        next_poll = time.monotonic() + (poll_interval_s or 0)
+
+        while not self._stopping:
+            self.reap()
+            self.top_up()
+            if poll_interval_s and time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + poll_interval_s
+                self._roll_requested |= self._production_changed()
+            if self._roll_requested:
+                self._roll_requested = False
+                self.roll()
+            time.sleep(0.2)
+
+        self.shutdown()
+        return 0
+
+    def shutdown(self):
+        logger.info("Stopping %d workers", len(self.workers))
+        self._stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from preforked workers sharing one model.")
+    parser.add_argument("--app", default="src.api.app:app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes; defaults to WEB_CONCURRENCY or the container's CPU quota")
+    parser.add_argument("--metrics-dir", default=None,
+                        help="PROMETHEUS_MULTIPROC_DIR; defaults to the variable or a temporary directory")
+    parser.add_argument("--graceful-timeout-s", type=float, default=30)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s - launcher - %(levelname)s - %(message)s")
+    workers = args.workers or default_workers()
+    logger.info("Starting %d workers (CPU limit %.2f)", workers, cpu_limit())
+
+    metrics_dir, created = prepare_metrics_dir(args.metrics_dir)
+    launcher = Launcher(
+        args.app, args.host, args.port, workers,
+        config_path=os.getenv("MODEL_CONFIG_PATH", "src/config/model_config.yaml"),
+        graceful_timeout_s=args.graceful_timeout_s, log_level=args.log_level,
+    )
+    try:
+        code = launcher.run()
+    finally:
+        if created:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+    raise SystemExit(code)
+
+
+if __name__ == "__main__":
+    main()
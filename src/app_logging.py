@@ -1,38 +1,164 @@
 # This script is developed to log predictions and errors in a database.
 # It includes functions to initialize the database, log predictions, and log errors.
-# The database is SQLite by default but can be configured via an environment variable.
+# Writes can be routed through a background writer that bulk inserts rows off the request path.
+# The database is SQLite by default but can be configured via an environment variable, and rows can
+# go to another storage backend (see src/log_storage.py) selected by the LOG_STORAGE variable or config.
+# A compaction job keeps per-minute and per-hour rollups of the logs for monitoring queries and prunes
+# raw rows past their retention (python src/app_logging.py, or the API's background compactor).
 
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Integer
+from sqlalchemy import (
+    Column, String, Float, DateTime, Integer, UniqueConstraint, and_, case, delete, func, literal_column, select,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
+import argparse
+import logging
 import os
+import queue
+import threading
+import time
 from contextlib import contextmanager
 
+from prometheus_client import Counter, Gauge
+
+from log_storage import DatabaseStorage, create_log_engine, create_storage
+
 Base = declarative_base()
 
 class PredictionLog(Base):
     __tablename__ = "prediction_logs"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     sepal_length = Column(Float, nullable=True)
     sepal_width = Column(Float, nullable=True)
     petal_length = Column(Float, nullable=True)
     petal_width = Column(Float, nullable=True)
     prediction = Column(String, nullable=True)
-    model_version = Column(String, nullable=True)
+    model_version = Column(String, nullable=True, index=True)
     error = Column(String, nullable=True)
+    # True class, filled in once the prediction has been labeled; incremental retraining
+    # (src/train_model.py --incremental) folds labeled rows into the training data
+    label = Column(String, nullable=True)
+
+class ShadowPredictionLog(Base):
+    """Predictions of canary and shadow models next to the Production model's, for offline comparison."""
+    __tablename__ = "shadow_predictions"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    sepal_length = Column(Float, nullable=True)
+    sepal_width = Column(Float, nullable=True)
+    petal_length = Column(Float, nullable=True)
+    petal_width = Column(Float, nullable=True)
+    model_version = Column(String, nullable=True, index=True)
+    role = Column(String, nullable=True)
+    prediction = Column(String, nullable=True)
+    primary_version = Column(String, nullable=True)
+    primary_prediction = Column(String, nullable=True)
+
+class PredictionRollup(Base):
+    """
+    Request and error counts and feature sums per minute or hour bucket and model version, built from
+    prediction_logs by compact_rollups(). Feature sums cover the scored rows (requests - errors), so
+    mean = sum / n and variance = sumsq / n - mean ** 2. Rows logged without a version have "".
+    """
+    __tablename__ = "prediction_rollups"
+    __table_args__ = (UniqueConstraint("resolution", "bucket_start", "model_version"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resolution = Column(String, nullable=False)  # "minute" or "hour"
+    bucket_start = Column(DateTime, nullable=False)
+    model_version = Column(String, nullable=False)
+    requests = Column(Integer, nullable=False)
+    errors = Column(Integer, nullable=False)
+    sepal_length_sum = Column(Float, nullable=False)
+    sepal_length_sumsq = Column(Float, nullable=False)
+    sepal_width_sum = Column(Float, nullable=False)
+    sepal_width_sumsq = Column(Float, nullable=False)
+    petal_length_sum = Column(Float, nullable=False)
+    petal_length_sumsq = Column(Float, nullable=False)
+    petal_width_sum = Column(Float, nullable=False)
+    petal_width_sumsq = Column(Float, nullable=False)
+
+class PredictionClassRollup(Base):
+    """Predictions per class, minute or hour bucket and model version, next to PredictionRollup."""
+    __tablename__ = "prediction_class_rollups"
+    __table_args__ = (UniqueConstraint("resolution", "bucket_start", "model_version", "prediction"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    model_version = Column(String, nullable=False)
+    prediction = Column(String, nullable=False)
+    count = Column(Integer, nullable=False)
+
+ROLLUP_FEATURES = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+ROLLUP_SUMS = ("requests", "errors", *(f"{name}_{kind}" for name in ROLLUP_FEATURES for kind in ("sum", "sumsq")))
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 default_db_path = os.path.join(project_root, 'logs', 'logs.db')
 
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{default_db_path}")
 
-engine = create_engine(DATABASE_URL)
+engine = create_log_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+_storage = None
+_shadow_storage = None
+
+logger = logging.getLogger(__name__)
+
+# Updated by the writer thread rather than at scrape time, so it also works with multi-process metrics
+LOG_QUEUE_DEPTH = Gauge(
+    "prediction_log_queue_depth",
+    "Prediction log rows waiting in the background writer queue.",
+    multiprocess_mode="liveall"
+)
+LOG_ROWS_DROPPED = Counter(
+    "prediction_log_rows_dropped_total",
+    "Prediction log rows dropped because the writer queue was full."
+)
+
+def configure_storage(backend: str = None, segments: dict = None):
+    """
+    Selects where log rows are written: "sqlite", "postgres" or "segments".
+    The LOG_STORAGE environment variable overrides `backend`; with neither set,
+    the backend follows DATABASE_URL. `segments` holds the SegmentStorage options.
+    """
+    global _storage, _shadow_storage
+    backend = os.getenv("LOG_STORAGE") or backend
+    options = dict(segments or {}) if backend == "segments" else {}
+    if backend == "segments":
+        options.setdefault("directory", os.path.join(project_root, "logs", "segments"))
+    _storage = create_storage(backend, engine, PredictionLog.__table__, **options)
+    _shadow_storage = create_storage(backend, engine, ShadowPredictionLog.__table__, **options)
+    logger.info("Prediction log storage: %s", type(_storage).__name__)
+    return _storage
+
+def get_storage():
+    if _storage is None:
+        configure_storage()
+    return _storage
+
+def get_shadow_storage():
+    if _shadow_storage is None:
+        configure_storage()
+    return _shadow_storage
+
 def init_db():
-    Base.metadata.create_all(engine)
+    get_storage().init()
+    get_shadow_storage().init()
+
+def ping_storage():
+    """Raises if the prediction log storage cannot be reached (used by the API readiness check)."""
+    get_storage().ping()
+
+def close_storage():
+    """Closes the storage backends, e.g. finishing the open log segments."""
+    global _storage, _shadow_storage
+    storages, _storage, _shadow_storage = (_storage, _shadow_storage), None, None
+    for storage in storages:
+        if storage is not None:
+            storage.close()
 
 @contextmanager
 def get_db_session():
@@ -47,27 +173,403 @@ def get_db_session():
     finally:
         session.close()
 
+def _log_record(data: dict, prediction, version, error=None) -> dict:
+    """Builds a PredictionLog row as a plain mapping, stamped at call time."""
+    return {
+        "timestamp": datetime.utcnow(),
+        "sepal_length": data.get("sepal_length"),
+        "sepal_width": data.get("sepal_width"),
+        "petal_length": data.get("petal_length"),
+        "petal_width": data.get("petal_width"),
+        "prediction": prediction,
+        "model_version": version,
+        "error": error,
+    }
+
+def write_records(records: list):
+    """Writes PredictionLog mappings to the storage backend in a single batch."""
+    if not records:
+        return
+    get_storage().write(records)
+
+
+class LogWriter:
+    """
+    Background writer for prediction logs.
+    Records are put on a bounded queue and a worker thread bulk inserts them
+    every `batch_size` rows or `flush_interval_ms` milliseconds, whichever comes first.
+    When the queue is full, records are dropped (default) or the caller blocks.
+    """
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval_ms: float = 200, block_when_full: bool = False):
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.block_when_full = block_when_full
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, records: list):
+        for record in records:
+            try:
+                self.queue.put(record, block=self.block_when_full)
+            except queue.Full:
+                LOG_ROWS_DROPPED.inc()
+
+    def _drain(self) -> list:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        try:
+            write_records(batch)
+        except Exception as e:
+            logger.error("Failed to write %d prediction log rows: %s", len(batch), e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            LOG_QUEUE_DEPTH.set(self.queue.qsize())
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Give the batch a chance to fill up before writing
+            deadline = time.monotonic() + self.flush_interval
+            batch = [first]
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the worker and flushes everything still queued."""
+        self._stop.set()
+        self._thread.join(timeout)
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._write(batch)
+
+
+_writer = None
+
+def start_log_writer(**options) -> LogWriter:
+    """Routes log_prediction/log_error through a background LogWriter."""
+    global _writer
+    if _writer is None:
+        _writer = LogWriter(**options).start()
+    return _writer
+
+def stop_log_writer():
+    """Flushes pending rows and returns to synchronous writes."""
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+def _submit(records: list):
+    writer = _writer
+    if writer is not None:
+        writer.submit(records)
+    else:
+        write_records(records)
+
 def log_prediction(data: dict, prediction: str, version: str):
-    with get_db_session() as session:
-        log = PredictionLog(
-            sepal_length=data.get("sepal_length"),
-            sepal_width=data.get("sepal_width"),
-            petal_length=data.get("petal_length"),
-            petal_width=data.get("petal_width"),
-            prediction=prediction,
-            model_version=version,
-        )
-        session.add(log)
+    _submit([_log_record(data, prediction, version)])
 
 def log_error(data: dict, error_message: str, version: str = None):
-    with get_db_session() as session:
-        log = PredictionLog(
-            sepal_length=data.get("sepal_length"),
-            sepal_width=data.get("sepal_width"),
-            petal_length=data.get("petal_length"),
-            petal_width=data.get("petal_width"),
-            prediction=None,
-            model_version=version,
-            error=error_message
-        )
-        session.add(log)
\ No newline at end of file
+    _submit([_log_record(data, None, version, error_message)])
+
+def log_predictions(rows: list, predictions: list, version: str):
+    """Logs a batch of predictions in a single transaction."""
+    _submit([_log_record(data, prediction, version) for data, prediction in zip(rows, predictions)])
+
+def log_errors(rows: list, error_messages: list, version: str = None):
+    """Logs a batch of errors in a single transaction."""
+    _submit([_log_record(data, None, version, error_message) for data, error_message in zip(rows, error_messages)])
+
+def log_prediction_array(raw, predictions, version: str):
+    """Logs an (n, 4) array of raw features and their predictions, stamped with one timestamp."""
+    timestamp = datetime.utcnow()
+    _submit([
+        {
+            "timestamp": timestamp,
+            "sepal_length": sepal_length,
+            "sepal_width": sepal_width,
+            "petal_length": petal_length,
+            "petal_width": petal_width,
+            "prediction": str(prediction),
+            "model_version": version,
+            "error": None,
+        }
+        for (sepal_length, sepal_width, petal_length, petal_width), prediction
+        in zip(raw.tolist(), predictions.tolist())
+    ])
+
+def log_shadow_predictions(raw, predictions, version: str, role: str, primary_predictions, primary_version: str):
+    """
+    Writes a canary or shadow model's predictions for an (n, 4) array of raw features next to the
+    Production model's. Called from the shadow executor, so it writes directly instead of queueing.
+    """
+    timestamp = datetime.utcnow()
+    get_shadow_storage().write([
+        {
+            "timestamp": timestamp,
+            "sepal_length": sepal_length,
+            "sepal_width": sepal_width,
+            "petal_length": petal_length,
+            "petal_width": petal_width,
+            "model_version": version,
+            "role": role,
+            "prediction": str(prediction),
+            "primary_version": primary_version,
+            "primary_prediction": str(primary_prediction),
+        }
+        for (sepal_length, sepal_width, petal_length, petal_width), prediction, primary_prediction
+        in zip(raw.tolist(), predictions.tolist(), primary_predictions.tolist())
+    ])
+
+def _floor(moment: datetime, resolution: str) -> datetime:
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+def _minute_bucket(column):
+    # Literal arguments, so the expression renders identically in SELECT and GROUP BY
+    if engine.dialect.name == "postgresql":
+        return func.date_trunc(literal_column("'minute'"), column)
+    return func.strftime(literal_column("'%Y-%m-%d %H:%M:00'"), column)
+
+def _add(totals: dict, key: tuple, row, fields: tuple):
+    """Adds the `fields` of `row` (None counts as 0) to the running sums for `key`."""
+    current = totals.setdefault(key, dict.fromkeys(fields, 0))
+    for field in fields:
+        current[field] += row[field] or 0
+
+def init_rollups():
+    """Creates the rollup tables; they live next to prediction_logs, so only the database backends have them."""
+    if not isinstance(get_storage(), DatabaseStorage):
+        raise RuntimeError(f"Rollups need a database log storage, not {type(get_storage()).__name__}")
+    for table in (PredictionRollup.__table__, PredictionClassRollup.__table__):
+        DatabaseStorage(engine, table).init()
+
+def rolled_up_until():
+    """End of the last minute bucket in the rollups, or None before the first compaction."""
+    rollups = PredictionRollup.__table__
+    with engine.connect() as conn:
+        last = conn.execute(
+            select(func.max(rollups.c.bucket_start)).where(rollups.c.resolution == "minute")
+        ).scalar()
+    return None if last is None else last + timedelta(minutes=1)
+
+def _compact_window(start: datetime, end: datetime) -> int:
+    """
+    Rolls up the prediction_logs rows in [start, end) into minute buckets, then rebuilds the hour
+    buckets those minutes fall in from the minute rollups. Returns the number of rows read.
+    """
+    logs = PredictionLog.__table__
+    rollups = PredictionRollup.__table__
+    class_rollups = PredictionClassRollup.__table__
+    bucket = _minute_bucket(logs.c.timestamp)
+    in_window = and_(logs.c.timestamp >= start, logs.c.timestamp < end)
+    scored = logs.c.error.is_(None)
+
+    totals_query = select(
+        bucket.label("bucket_start"), logs.c.model_version,
+        func.count().label("requests"), func.count(logs.c.error).label("errors"),
+        *[func.sum(case((scored, logs.c[name]))).label(f"{name}_sum") for name in ROLLUP_FEATURES],
+        *[func.sum(case((scored, logs.c[name] * logs.c[name]))).label(f"{name}_sumsq") for name in ROLLUP_FEATURES],
+    ).where(in_window).group_by(bucket, logs.c.model_version)
+    classes_query = select(
+        bucket.label("bucket_start"), logs.c.model_version, logs.c.prediction, func.count().label("count"),
+    ).where(in_window, scored).group_by(bucket, logs.c.model_version, logs.c.prediction)
+
+    def as_datetime(value):
+        # SQLite's strftime() buckets come back as text
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+    minutes, minute_classes = {}, {}
+    with engine.begin() as conn:
+        for row in conn.execute(totals_query).mappings():
+            _add(minutes, (as_datetime(row["bucket_start"]), row["model_version"] or ""), row, ROLLUP_SUMS)
+        for row in conn.execute(classes_query).mappings():
+            key = (as_datetime(row["bucket_start"]), row["model_version"] or "", row["prediction"] or "")
+            _add(minute_classes, key, row, ("count",))
+        if not minutes:
+            return 0
+
+        # A second compactor working on the same window fails here on the unique constraint and rolls back
+        conn.execute(rollups.insert(), [
+            dict(values, resolution="minute", bucket_start=moment, model_version=version)
+            for (moment, version), values in minutes.items()
+        ])
+        if minute_classes:
+            conn.execute(class_rollups.insert(), [
+                dict(values, resolution="minute", bucket_start=moment, model_version=version, prediction=prediction)
+                for (moment, version, prediction), values in minute_classes.items()
+            ])
+
+        # Hours that started in an earlier window already have minute rollups, so they are rebuilt whole
+        first_hour = _floor(min(key[0] for key in minutes), "hour")
+        end_hour = _floor(max(key[0] for key in minutes), "hour") + timedelta(hours=1)
+        for table, key_columns, fields in ((rollups, ("model_version",), ROLLUP_SUMS),
+                                           (class_rollups, ("model_version", "prediction"), ("count",))):
+            hour_range = and_(table.c.bucket_start >= first_hour, table.c.bucket_start < end_hour)
+            hours = {}
+            for row in conn.execute(select(table).where(table.c.resolution == "minute", hour_range)).mappings():
+                key = (_floor(row["bucket_start"], "hour"), *(row[column] for column in key_columns))
+                _add(hours, key, row, fields)
+            conn.execute(delete(table).where(table.c.resolution == "hour", hour_range))
+            if not hours:
+                continue
+            conn.execute(table.insert(), [
+                dict(values, resolution="hour", bucket_start=key[0], **dict(zip(key_columns, key[1:])))
+                for key, values in hours.items()
+            ])
+    return sum(values["requests"] for values in minutes.values())
+
+def compact_rollups(grace_s: float = 120, max_window_hours: float = 24) -> int:
+    """
+    Adds the prediction_logs rows written since the last compaction to the minute and hour rollups,
+    up to the last minute that ended `grace_s` seconds ago; rows that arrive later than that with an
+    older timestamp are not counted. Each pass reads only the new rows, by timestamp, in windows of at
+    most `max_window_hours`. Returns the number of rows rolled up.
+    """
+    end = _floor(datetime.utcnow() - timedelta(seconds=grace_s), "minute")
+    start = rolled_up_until()
+    if start is None:
+        with engine.connect() as conn:
+            first = conn.execute(select(func.min(PredictionLog.__table__.c.timestamp))).scalar()
+        if first is None:
+            return 0
+        start = _floor(first, "minute")
+
+    rows = 0
+    while start < end:
+        window_end = min(end, start + timedelta(hours=max_window_hours))
+        rows += _compact_window(start, window_end)
+        start = window_end
+    return rows
+
+def prune_logs(retention_days: float, keep_labeled: bool = True, batch_size: int = 10000) -> int:
+    """
+    Deletes prediction_logs rows older than `retention_days`, `batch_size` rows per transaction so
+    writers are not held up. Rows not rolled up yet are kept, and so are labeled rows when
+    `keep_labeled` (incremental retraining uses them). Returns the number of rows deleted.
+    """
+    logs = PredictionLog.__table__
+    rolled_up = rolled_up_until()
+    if rolled_up is None:
+        return 0
+    cutoff = min(datetime.utcnow() - timedelta(days=retention_days), rolled_up)
+    condition = logs.c.timestamp < cutoff
+    if keep_labeled:
+        condition = and_(condition, logs.c.label.is_(None))
+
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            count = conn.execute(
+                delete(logs).where(logs.c.id.in_(select(logs.c.id).where(condition).limit(batch_size)))
+            ).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class RollupCompactor:
+    """
+    Runs compact_rollups() every `interval_s` seconds on a background thread, followed by
+    prune_logs() when `retention_days` is set. Several API workers can each run one.
+    """
+
+    def __init__(self, interval_s: float = 60, grace_s: float = 120, max_window_hours: float = 24,
+                 retention_days: float = None, keep_labeled: bool = True):
+        self.interval_s = interval_s
+        self.grace_s = grace_s
+        self.max_window_hours = max_window_hours
+        self.retention_days = retention_days
+        self.keep_labeled = keep_labeled
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prediction-log-rollups", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def run_once(self):
+        try:
+            rows = compact_rollups(self.grace_s, self.max_window_hours)
+            pruned = prune_logs(self.retention_days, self.keep_labeled) if self.retention_days else 0
+        except IntegrityError:
+            logger.debug("Rollup window was compacted by another process")
+            return
+        except Exception as e:
+            logger.error("Prediction log compaction failed: %s", e)
+            return
+        if rows or pruned:
+            logger.info("Rolled up %d prediction log rows, pruned %d", rows, pruned)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.run_once()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_compactor = None
+
+def start_rollup_compactor(**options):
+    """Starts the background rollup compactor; returns None when the log storage is not a database."""
+    global _compactor
+    if _compactor is None:
+        try:
+            init_rollups()
+        except RuntimeError as e:
+            logger.warning("Prediction log rollups disabled: %s", e)
+            return None
+        _compactor = RollupCompactor(**options).start()
+    return _compactor
+
+def stop_rollup_compactor():
+    global _compactor
+    compactor, _compactor = _compactor, None
+    if compactor is not None:
+        compactor.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up prediction_logs and prune raw rows past their retention.")
+    parser.add_argument("--grace-s", type=float, default=120, help="leave rows younger than this for the next run")
+    parser.add_argument("--retention-days", type=float, help="delete raw rows older than this once rolled up")
+    parser.add_argument("--prune-labeled", action="store_true", help="also delete labeled rows past the retention")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    configure_storage()
+    init_db()
+    init_rollups()
+    start = time.perf_counter()
+    print(f"Rolled up {compact_rollups(args.grace_s)} rows in {time.perf_counter() - start:.2f}s")
+    if args.retention_days is not None:
+        start = time.perf_counter()
+        pruned = prune_logs(args.retention_days, keep_labeled=not args.prune_labeled)
+        print(f"Pruned {pruned} rows older than {args.retention_days} days in {time.perf_counter() - start:.2f}s")
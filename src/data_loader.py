@@ -5,6 +5,8 @@
 
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 import logging
 
@@ -24,16 +26,44 @@ def read_config(config_path: str = "src/config/model_config.yaml") -> dict:
         logger.error(f"Failed to load config: {e}")
         raise
 
+# Explicit dtypes, so CSV reads skip type inference and columnar reads are cast consistently
+TARGET_COLUMNS = {"target": "int64", "target_name": "object"}
+
+def _dtypes(columns, feature_dtype: str) -> dict:
+    return {col: TARGET_COLUMNS.get(col, feature_dtype) for col in columns}
+
+def _read_arrow(data_path: str, columns=None) -> pd.DataFrame:
+    """Memory-maps an Arrow IPC file and materializes only the requested columns."""
+    with pa.memory_map(data_path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+def _read_parquet(data_path: str, columns=None) -> pd.DataFrame:
+    return pq.read_table(data_path, columns=columns, memory_map=True).to_pandas()
+
+def _read_csv(data_path: str, columns=None, feature_dtype: str = "float64") -> pd.DataFrame:
+    header = pd.read_csv(data_path, nrows=0).columns
+    return pd.read_csv(data_path, usecols=columns, dtype=_dtypes(header, feature_dtype))
+
 # Load data based on config
 
-def load_data(config: dict, processed: bool = False) -> pd.DataFrame:
+def load_data(config: dict, processed: bool = False, columns: list = None,
+              feature_dtype: str = "float64") -> pd.DataFrame:
     """
     Loads data based on config.
     If processed is True, loads the processed file, else loads the raw file.
+    The processed data is read from the Arrow IPC file (`data.processed_arrow`) when it exists,
+    falling back to CSV. `columns` limits the read to those columns, and feature columns are
+    returned as `feature_dtype` (float64 or float32).
     """
     try:
         if processed:
             data_path = config["data"]["processed"]
+            arrow_path = config["data"].get("processed_arrow")
+            if arrow_path and os.path.exists(arrow_path):
+                data_path = arrow_path
             logger.info("Loading processed data...")
         else:
             data_path = config["data"]["raw"]
@@ -42,8 +72,15 @@ def load_data(config: dict, processed: bool = False) -> pd.DataFrame:
         if not os.path.exists(data_path):
             raise FileNotFoundError(f"File not found at {data_path}")
 
-        df = pd.read_csv(data_path)
-        logger.info(f"Data loaded. Shape: {df.shape}")
+        if data_path.endswith((".arrow", ".feather")):
+            df = _read_arrow(data_path, columns)
+        elif data_path.endswith(".parquet"):
+            df = _read_parquet(data_path, columns)
+        else:
+            df = _read_csv(data_path, columns, feature_dtype)
+        df = df.astype(_dtypes(df.columns, feature_dtype), copy=False)
+
+        logger.info(f"Data loaded from {data_path}. Shape: {df.shape}")
         return df
 
     except Exception as e:
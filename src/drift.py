@@ -0,0 +1,191 @@
+# This script is developed to track input and prediction drift against the training data.
+# Training saves reference statistics for the four raw features (quantile bins, mean, variance) and the
+# class frequencies; serving keeps streaming Welford moments, histograms and class counts per thread
+# and compares them with the reference as PSI and KL scores.
+
+import bisect
+import json
+import threading
+
+import numpy as np
+
+from feature_transform import RAW_COLUMNS
+
+ARTIFACT_NAME = "drift_reference.json"
+
+# Floor for empty bins, so PSI and KL stay finite
+EPSILON = 1e-4
+
+
+def build_reference(raw: np.ndarray, labels, bins: int = 10) -> dict:
+    """
+    Builds the reference from an (n, 4) array of raw training measurements and their labels.
+    Each feature gets `bins` quantile bins (fewer when values repeat), open-ended at both sides.
+    """
+    raw = np.asarray(raw, dtype=np.float64).reshape(-1, len(RAW_COLUMNS))
+    features = {}
+    for i, name in enumerate(RAW_COLUMNS):
+        values = raw[:, i]
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        features[name] = {
+            "count": int(len(values)),
+            "mean": float(values.mean()),
+            "var": float(values.var()),
+            "edges": edges.tolist(),
+            "proportions": (counts / len(values)).tolist(),
+        }
+
+    classes, counts = np.unique(np.asarray(labels).astype(str), return_counts=True)
+    return {
+        "features": features,
+        "classes": {str(label): float(count / counts.sum()) for label, count in zip(classes, counts)},
+    }
+
+
+def save_reference(reference: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(reference, f)
+
+
+def load_reference(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def psi(expected, actual) -> float:
+    """Population stability index between two distributions over the same bins."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def kl_divergence(expected, actual) -> float:
+    """KL(actual || expected): how far the observed distribution has moved from the reference."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), EPSILON)
+    return float(np.sum(actual * np.log(actual / expected)))
+
+
+class _Accumulator:
+    """Streaming statistics owned by a single thread."""
+
+    __slots__ = ("n", "mean", "m2", "hist", "classes")
+
+    def __init__(self, n_bins: list):
+        self.n = 0
+        self.mean = [0.0] * len(n_bins)
+        self.m2 = [0.0] * len(n_bins)
+        self.hist = [[0] * k for k in n_bins]
+        self.classes = {}
+
+    def merge(self, other):
+        """Adds `other` into this accumulator (Chan et al. parallel variance)."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        for i in range(len(self.mean)):
+            delta = other.mean[i] - self.mean[i]
+            self.mean[i] += delta * other.n / n
+            self.m2[i] += other.m2[i] + delta * delta * self.n * other.n / n
+            self.hist[i] = [a + b for a, b in zip(self.hist[i], other.hist[i])]
+        self.n = n
+        for label, count in other.classes.items():
+            self.classes[label] = self.classes.get(label, 0) + count
+
+
+class DriftStats:
+    """
+    Incremental feature and prediction statistics compared against a training reference.
+    Every thread updates its own accumulator, so the request path takes no lock; `scores`
+    merges them. A score read can miss an update that is in progress on another thread,
+    which only shifts the result by one observation.
+    """
+
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self.edges = [reference["features"][name]["edges"] for name in RAW_COLUMNS]
+        self._n_bins = [len(edges) + 1 for edges in self.edges]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._accumulators = []
+        # Statistics from threads that have exited
+        self._retired = _Accumulator(self._n_bins)
+
+    def _accumulator(self) -> _Accumulator:
+        acc = getattr(self._local, "acc", None)
+        if acc is None:
+            acc = self._local.acc = _Accumulator(self._n_bins)
+            with self._lock:
+                self._accumulators.append((threading.current_thread(), acc))
+        return acc
+
+    def update(self, values, prediction):
+        """Adds one observation: the four raw features in RAW_COLUMNS order and its predicted class."""
+        acc = self._accumulator()
+        acc.n += 1
+        for i, x in enumerate(values):
+            delta = x - acc.mean[i]
+            acc.mean[i] += delta / acc.n
+            acc.m2[i] += delta * (x - acc.mean[i])
+            acc.hist[i][bisect.bisect_right(self.edges[i], x)] += 1
+        label = str(prediction)
+        acc.classes[label] = acc.classes.get(label, 0) + 1
+
+    def update_batch(self, raw: np.ndarray, predictions):
+        """Adds an (n, 4) array of raw features and their predictions in one vectorized step."""
+        raw = np.asarray(raw, dtype=np.float64)
+        if len(raw) == 0:
+            return
+        batch = _Accumulator(self._n_bins)
+        batch.n = len(raw)
+        batch.mean = raw.mean(axis=0).tolist()
+        batch.m2 = (raw.var(axis=0) * len(raw)).tolist()
+        batch.hist = [
+            np.bincount(np.searchsorted(self.edges[i], raw[:, i], side="right"), minlength=self._n_bins[i]).tolist()
+            for i in range(len(RAW_COLUMNS))
+        ]
+        labels, counts = np.unique(np.asarray(predictions).astype(str), return_counts=True)
+        batch.classes = dict(zip(labels.tolist(), counts.tolist()))
+        self._accumulator().merge(batch)
+
+    def merged(self) -> _Accumulator:
+        """Merges every thread's statistics, folding those of exited threads into one."""
+        total = _Accumulator(self._n_bins)
+        with self._lock:
+            alive = []
+            for thread, acc in self._accumulators:
+                if thread.is_alive():
+                    alive.append((thread, acc))
+                else:
+                    self._retired.merge(acc)
+            self._accumulators = alive
+            total.merge(self._retired)
+        for _, acc in alive:
+            total.merge(acc)
+        return total
+
+    def scores(self) -> dict:
+        """
+        Returns the observation count and, per feature, the streaming mean/std and the PSI/KL
+        of the observed histogram against the reference; the "class" entry compares predictions.
+        """
+        total = self.merged()
+        result = {"count": total.n, "mean": {}, "std": {}, "psi": {}, "kl": {}}
+        if total.n == 0:
+            return result
+
+        for i, name in enumerate(RAW_COLUMNS):
+            observed = np.asarray(total.hist[i]) / total.n
+            expected = self.reference["features"][name]["proportions"]
+            result["mean"][name] = total.mean[i]
+            result["std"][name] = float(np.sqrt(total.m2[i] / total.n))
+            result["psi"][name] = psi(expected, observed)
+            result["kl"][name] = kl_divergence(expected, observed)
+
+        labels = sorted(set(self.reference["classes"]) | set(total.classes))
+        expected = [self.reference["classes"].get(label, 0.0) for label in labels]
+        observed = [total.classes.get(label, 0) / total.n for label in labels]
+        result["psi"]["class"] = psi(expected, observed)
+        result["kl"]["class"] = kl_divergence(expected, observed)
+        return result
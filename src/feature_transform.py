@@ -0,0 +1,98 @@
+# This script is developed to hold the fitted feature transform shared by training and serving.
+# It computes the engineered columns (with the Petal_ratio zero-division guard) and applies the fitted
+# standard scaling as NumPy operations on an (n, 4) array of raw measurements.
+# The transform is saved as JSON next to the processed data and logged with the model in MLflow.
+
+import json
+
+import numpy as np
+
+# Raw measurement order expected by the transform
+RAW_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+# Output order, matching the processed dataset the models are trained on
+FEATURE_COLUMNS = [
+    "sepal_length",
+    "sepal_width",
+    "petal_length",
+    "petal_width",
+    "Petal_ratio",
+    "Sepal_area",
+    "Petal_area",
+]
+
+ARTIFACT_NAME = "feature_transform.json"
+
+
+def engineer(raw: np.ndarray) -> np.ndarray:
+    """Maps an (n, 4) array of raw measurements to the (n, 7) unscaled feature array."""
+    raw = np.asarray(raw, dtype=np.float64).reshape(-1, len(RAW_COLUMNS))
+    sepal_length, sepal_width, petal_length, petal_width = raw.T
+
+    # Ratio is 0 when petal_width is 0
+    petal_ratio = np.divide(
+        petal_length, petal_width,
+        out=np.zeros_like(petal_length),
+        where=petal_width != 0
+    )
+
+    return np.column_stack([
+        sepal_length,
+        sepal_width,
+        petal_length,
+        petal_width,
+        petal_ratio,
+        sepal_length * sepal_width,
+        petal_length * petal_width,
+    ])
+
+
+class FeatureTransform:
+    """
+    Feature engineering plus standard scaling with the statistics fitted at preprocessing time.
+    `transform` gives the same result as StandardScaler.transform on the engineered columns.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    @classmethod
+    def from_scaler(cls, scaler):
+        """Builds the transform from a StandardScaler fitted on the FEATURE_COLUMNS."""
+        feature_names = getattr(scaler, "feature_names_in_", None)
+        if feature_names is not None and list(feature_names) != FEATURE_COLUMNS:
+            raise ValueError(f"Scaler was fitted on {list(feature_names)}, expected {FEATURE_COLUMNS}")
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(FEATURE_COLUMNS))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(FEATURE_COLUMNS))
+        return cls(mean, scale)
+
+    def transform(self, raw: np.ndarray) -> np.ndarray:
+        """Maps an (n, 4) array of raw measurements to the (n, 7) scaled model input."""
+        features = engineer(raw)
+        features -= self.mean
+        features /= self.scale
+        return features
+
+    def to_dict(self) -> dict:
+        return {
+            "raw_columns": RAW_COLUMNS,
+            "feature_columns": FEATURE_COLUMNS,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict):
+        if payload.get("feature_columns", FEATURE_COLUMNS) != FEATURE_COLUMNS:
+            raise ValueError(f"Unsupported feature columns: {payload['feature_columns']}")
+        return cls(payload["mean"], payload["scale"])
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
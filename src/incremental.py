@@ -0,0 +1,197 @@
+# This script is developed to turn a full retrain into a short refresh job (train_model.py --incremental).
+# The train/val/test splits are cached under the hash DVC records for the processed dataset, the Optuna
+# search is narrowed around the Production model's params from MLflow, and prediction log rows that
+# have been labeled are folded into the training data. Wall-clock time is recorded per stage.
+
+import hashlib
+import math
+import os
+import time
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+
+from feature_transform import FEATURE_COLUMNS, RAW_COLUMNS, FeatureTransform
+
+
+class StageTimer:
+    """Records the wall-clock time of each named stage of a job."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+            print(f"[{name}] {self.stages[name]:.2f}s")
+
+    def report(self) -> dict:
+        total = sum(self.stages.values())
+        print(f"\n{'stage':<20}{'seconds':>10}{'share':>8}")
+        for name, seconds in self.stages.items():
+            print(f"{name:<20}{seconds:>10.2f}{seconds / max(total, 1e-9):>8.0%}")
+        print(f"{'total':<20}{total:>10.2f}")
+        return dict(self.stages, total=total)
+
+
+def data_hash(config: dict, dvc_lock_path: str = "dvc.lock") -> str:
+    """
+    MD5 of the processed dataset as recorded in dvc.lock, so no data has to be read to compute it.
+    Falls back to hashing the file when DVC has no record of it.
+    """
+    path = config["data"]["processed"]
+    try:
+        with open(dvc_lock_path, "r") as f:
+            lock = yaml.safe_load(f) or {}
+        for stage in lock.get("stages", {}).values():
+            for out in stage.get("outs", []):
+                if os.path.normpath(out["path"]) == os.path.normpath(path) and out.get("md5"):
+                    return out["md5"]
+    except OSError:
+        pass
+
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def cached_splits(config: dict, prepare_data, cache_dir: str) -> tuple:
+    """
+    Returns (splits, cache hit). Splits are cached per data hash and split settings, so an
+    unchanged dataset is neither read nor split again; `prepare_data(config)` builds them on a miss.
+    """
+    model_config = config["model"]
+    key = f"{data_hash(config)}-{model_config['test_size']}-{model_config['random_state']}"
+    path = os.path.join(cache_dir, f"splits-{key}.joblib")
+    if os.path.exists(path):
+        return joblib.load(path), True
+
+    data = prepare_data(config)
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(data, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return data, False
+
+
+def production_run(registry_name: str) -> dict:
+    """Version, run id, model family and logged params of the current Production model."""
+    from mlflow.tracking import MlflowClient
+
+    client = MlflowClient()
+    versions = client.get_latest_versions(registry_name, stages=["Production"])
+    if not versions:
+        raise Exception(f"No model in Production stage for '{registry_name}'; run a full training first.")
+    mv = versions[0]
+    run = client.get_run(mv.run_id)
+    # Versions registered before the model_family tag existed are recognized by their run name
+    family = mv.tags.get("model_family") or run.data.tags.get("mlflow.runName", "").removesuffix("_run")
+    return {"version": mv.version, "run_id": mv.run_id, "family": family, "params": run.data.params}
+
+
+def parse_params(params: dict, search_space: dict) -> dict:
+    """Converts the string params MLflow stores back to the types of the search space."""
+    parsed = {}
+    for name, definition in search_space.items():
+        if name not in params:
+            continue
+        value = params[name]
+        if definition["type"] == "int":
+            parsed[name] = int(float(value))
+        elif definition["type"] == "float":
+            parsed[name] = float(value)
+        elif definition["type"] == "categorical":
+            parsed[name] = next((choice for choice in definition["choices"] if str(choice) == value), value)
+    return parsed
+
+
+def narrow_search_space(search_space: dict, params: dict, factor: float) -> dict:
+    """
+    Search space around `params`: numeric ranges shrink to `factor` of their width (of their log
+    width for log ranges), centered on the param and kept within the original bounds, and
+    categoricals keep only the current choice. Params without a value keep their full range.
+    """
+    narrowed = {}
+    for name, definition in search_space.items():
+        if name not in params:
+            narrowed[name] = definition
+            continue
+        value = params[name]
+        if definition["type"] == "categorical":
+            narrowed[name] = dict(definition, choices=[value])
+            continue
+
+        low, high = definition["low"], definition["high"]
+        if definition.get("log", False):
+            half = (math.log(high) - math.log(low)) * factor / 2
+            new_low, new_high = value * math.exp(-half), value * math.exp(half)
+        else:
+            half = (high - low) * factor / 2
+            new_low, new_high = value - half, value + half
+        if definition["type"] == "int":
+            new_low, new_high = math.floor(new_low), math.ceil(new_high)
+        narrowed[name] = dict(definition, low=max(low, new_low), high=min(high, new_high))
+    return narrowed
+
+
+def labeled_rows(transform_path: str, target_column: str, limit: int = None) -> tuple:
+    """
+    Features and labels of the labeled rows in the prediction_logs table (most recent first), with the
+    fitted feature transform applied so they match the processed dataset. Returns (X, y).
+    """
+    from sqlalchemy import select
+    from sqlalchemy.exc import SQLAlchemyError
+
+    from app_logging import PredictionLog, engine
+
+    table = PredictionLog.__table__
+    query = (
+        select(*[table.c[col] for col in RAW_COLUMNS], table.c.label)
+        .where(table.c.label.isnot(None), table.c.error.is_(None))
+        .order_by(table.c.id.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(query).fetchall()
+    except SQLAlchemyError as e:
+        print(f"Warning: could not read labeled prediction logs ({e}); training on the dataset only.")
+        rows = []
+
+    # label is a String column filled in by whoever labels predictions; rows whose label is not a class id are skipped
+    parsed, skipped = [], 0
+    for row in rows:
+        try:
+            parsed.append((row[:len(RAW_COLUMNS)], int(row[-1])))
+        except ValueError:
+            skipped += 1
+    if skipped:
+        print(f"Warning: skipped {skipped} labeled prediction log rows whose label is not an integer class.")
+
+    raw = np.array([features for features, _ in parsed], dtype=np.float64).reshape(-1, len(RAW_COLUMNS))
+    labels = np.array([label for _, label in parsed], dtype=np.int64)
+    keep = np.isfinite(raw).all(axis=1)
+    raw, labels = raw[keep], labels[keep]
+
+    features = FeatureTransform.load(transform_path).transform(raw) if len(raw) else np.empty((0, len(FEATURE_COLUMNS)))
+    return pd.DataFrame(features, columns=FEATURE_COLUMNS), pd.Series(labels, name=target_column)
+
+
+def fold_in(data: dict, X_new: pd.DataFrame, y_new: pd.Series) -> dict:
+    """Adds rows to the training splits; validation and test stay as they are, so scores remain comparable."""
+    if len(X_new) == 0:
+        return data
+    data = dict(data)
+    for X_key, y_key in (("X_train_full", "y_train_full"), ("X_train", "y_train")):
+        data[X_key] = pd.concat([data[X_key], X_new[data[X_key].columns]], ignore_index=True)
+        data[y_key] = pd.concat([data[y_key], y_new.astype(data[y_key].dtype)], ignore_index=True)
+    return data
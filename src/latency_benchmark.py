@@ -0,0 +1,91 @@
+# This script is developed to benchmark model inference latency for model selection.
+# Each candidate is timed with warmup and repeated perf_counter_ns measurements at several batch sizes,
+# recording p50/p99 latency, rows/sec and peak memory, and a configurable policy picks the model to promote.
+
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZES = (1, 32, 1024, 65536)
+
+
+def synthetic_rows(X_reference: pd.DataFrame, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Resamples reference rows with small noise so large batches follow the real feature distribution."""
+    rng = np.random.default_rng(seed)
+    values = X_reference.to_numpy(dtype=np.float64)
+    sampled = values[rng.integers(0, len(values), size=n_rows)]
+    noise = rng.normal(scale=0.05, size=sampled.shape) * values.std(axis=0)
+    return pd.DataFrame(sampled + noise, columns=X_reference.columns)
+
+
+def benchmark_model(model, X_reference: pd.DataFrame, batch_sizes=DEFAULT_BATCH_SIZES, warmup: int = 10,
+                    repeats: int = 200, max_seconds_per_size: float = 2.0) -> dict:
+    """
+    Measures model.predict latency at each batch size.
+    Returns flat metrics such as latency_p99_us_b1, rows_per_s_b1024 and peak_mem_mb_b65536.
+    Repeats stop early once `max_seconds_per_size` is spent, but at least 5 timings are kept.
+    """
+    metrics = {}
+    for batch_size in batch_sizes:
+        X = synthetic_rows(X_reference, batch_size)
+
+        for _ in range(warmup):
+            model.predict(X)
+
+        timings = []
+        budget_end = time.perf_counter() + max_seconds_per_size
+        for i in range(repeats):
+            start = time.perf_counter_ns()
+            model.predict(X)
+            timings.append(time.perf_counter_ns() - start)
+            if i >= 4 and time.perf_counter() > budget_end:
+                break
+
+        # Peak memory is measured on a separate call, since tracing slows allocation down
+        tracemalloc.start()
+        model.predict(X)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings_us = np.asarray(timings) / 1000.0
+        p50 = float(np.percentile(timings_us, 50))
+        metrics[f"latency_p50_us_b{batch_size}"] = p50
+        metrics[f"latency_p99_us_b{batch_size}"] = float(np.percentile(timings_us, 99))
+        metrics[f"rows_per_s_b{batch_size}"] = batch_size / (p50 / 1e6)
+        metrics[f"peak_mem_mb_b{batch_size}"] = peak / 2**20
+
+    return metrics
+
+
+def select_best(candidates: list, selection_config: dict) -> dict:
+    """
+    Picks the candidate to promote.
+    Candidates are dicts with a "metrics" mapping. The policy maximizes `metric` among candidates
+    whose `constraint_metric` is at most `max_constraint`, breaking ties on the lowest `tie_breaker`.
+    If no candidate meets the constraint, `on_no_eligible` decides: "skip" (default) returns None so
+    nothing is promoted, "relax" ignores the constraint with a warning.
+    """
+    if not candidates:
+        return None
+
+    metric = selection_config.get("metric", "test_f1_macro")
+    constraint_metric = selection_config.get("constraint_metric", "latency_p99_us_b1")
+    max_constraint = selection_config.get("max_constraint")
+    tie_breaker = selection_config.get("tie_breaker", "latency_p50_us_b1")
+
+    eligible = candidates
+    if max_constraint is not None:
+        eligible = [c for c in candidates if c["metrics"][constraint_metric] <= max_constraint]
+        if not eligible:
+            if selection_config.get("on_no_eligible", "skip") != "relax":
+                logger.error("No candidate has %s <= %s; promoting nothing.", constraint_metric, max_constraint)
+                return None
+            logger.warning("No candidate has %s <= %s; ignoring the constraint.", constraint_metric, max_constraint)
+            eligible = candidates
+
+    return max(eligible, key=lambda c: (c["metrics"][metric], -c["metrics"][tie_breaker]))
@@ -0,0 +1,275 @@
+# This script is developed to store prediction log rows in one of several backends.
+# "sqlite" and "postgres" insert into the prediction_logs table through a tuned SQLAlchemy engine
+# (SQLite in WAL mode, Postgres with a sized pool and COPY bulk loads), and "segments" appends rows
+# to rotating JSONL or Parquet files that can be loaded into a warehouse later.
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, Integer, create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+BACKENDS = ("sqlite", "postgres", "segments")
+
+
+def create_log_engine(url: str, pool_size: int = None, max_overflow: int = None):
+    """
+    Creates the SQLAlchemy engine for the prediction log database.
+    SQLite connections run in WAL mode with synchronous=NORMAL, so readers (Grafana, sqlite-web)
+    do not block the writer and commits do not fsync every transaction.
+    Postgres gets an explicit pool size, sized by the arguments or DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    """
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+
+        @event.listens_for(engine, "connect")
+        def _tune_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if ":memory:" not in url:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+
+        return engine
+
+    if url.startswith("postgres"):
+        return create_engine(
+            url,
+            pool_size=pool_size or int(os.getenv("DB_POOL_SIZE", 10)),
+            max_overflow=max_overflow if max_overflow is not None else int(os.getenv("DB_MAX_OVERFLOW", 20)),
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+
+    return create_engine(url)
+
+
+class DatabaseStorage:
+    """Inserts rows into `table` with a single Core executemany per batch, without ORM objects."""
+
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+        self._insert = table.insert()
+
+    def init(self):
+        """Creates the table and its indexes, including columns and indexes missing from older databases."""
+        self._create(self.table)
+        self._add_missing_columns()
+        for index in self.table.indexes:
+            self._create(index)
+
+    def _create(self, schema_item):
+        try:
+            schema_item.create(self.engine, checkfirst=True)
+        except (OperationalError, ProgrammingError):
+            # Another worker starting at the same time created it between the check and the
+            # CREATE; checking again skips it, and any other error is raised again
+            schema_item.create(self.engine, checkfirst=True)
+
+    def _missing_columns(self) -> list:
+        existing = {column["name"] for column in inspect(self.engine).get_columns(self.table.name)}
+        return [column for column in self.table.columns if column.name not in existing]
+
+    def _add_missing_columns(self):
+        """Adds nullable columns introduced after the table was created (e.g. prediction_logs.label)."""
+        for column in self._missing_columns():
+            statement = f"ALTER TABLE {self.table.name} ADD COLUMN {column.name} {column.type.compile(self.engine.dialect)}"
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(statement))
+            except (OperationalError, ProgrammingError):
+                # Added by another worker in the meantime
+                if column.name in {c.name for c in self._missing_columns()}:
+                    raise
+
+    def write(self, records: list):
+        if not records:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(self._insert, records)
+
+    def ping(self):
+        """Raises if the database cannot be reached."""
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    def close(self):
+        self.engine.dispose()
+
+
+class SQLiteStorage(DatabaseStorage):
+    """SQLite in WAL mode (see create_log_engine), checkpointed and optimized on close."""
+
+    def close(self):
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.exec_driver_sql("PRAGMA optimize")
+        super().close()
+
+
+class PostgresStorage(DatabaseStorage):
+    """Postgres with bulk loads through COPY ... FROM STDIN (psycopg2 or psycopg 3)."""
+
+    def __init__(self, engine, table):
+        super().__init__(engine, table)
+        self.columns = [c.name for c in table.columns if not c.primary_key]
+        self._copy_sql = f"COPY {table.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    def _csv(self, records: list) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            # None becomes an unquoted empty field, which COPY reads as NULL
+            writer.writerow([record.get(column) for column in self.columns])
+        return buffer.getvalue()
+
+    def write(self, records: list):
+        if not records:
+            return
+        data = self._csv(records)
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(self._copy_sql, io.StringIO(data))
+            elif hasattr(cursor, "copy"):       # psycopg 3
+                with cursor.copy(self._copy_sql) as copy:
+                    copy.write(data)
+            else:
+                cursor.close()
+                connection.close()
+                connection = None
+                return super().write(records)
+            cursor.close()
+            connection.commit()
+        except Exception:
+            if connection is not None:
+                connection.rollback()
+            raise
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+class SegmentStorage:
+    """
+    Appends rows to JSONL or Parquet segment files under `directory`.
+    A segment is written as <name>.open and renamed to <name> once it reaches `max_segment_mb`
+    or `max_segment_age_s` (checked on each write), so anything without the .open suffix is complete and safe to load.
+    Each write is one Parquet row group, so batches should be reasonably large.
+    """
+
+    def __init__(self, table, directory: str, segment_format: str = "jsonl", max_segment_mb: float = 64,
+                 max_segment_age_s: float = 3600):
+        if segment_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown segment format '{segment_format}'.")
+        self.directory = directory
+        self.segment_format = segment_format
+        self.max_bytes = max_segment_mb * 2**20
+        self.max_age_s = max_segment_age_s
+        self.prefix = table.name
+        self.columns = [c for c in table.columns if not c.primary_key]
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._path = None
+        self._opened_at = 0.0
+        self._sequence = 0
+        self._arrow_schema = None
+
+    def init(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def ping(self):
+        """Raises if segments cannot be written to `directory`."""
+        if not os.access(self.directory, os.W_OK):
+            raise OSError(f"Segment directory {self.directory} is not writable.")
+
+    def _schema(self):
+        import pyarrow as pa
+
+        if self._arrow_schema is None:
+            types = {DateTime: pa.timestamp("us"), Float: pa.float64(), Integer: pa.int64()}
+            self._arrow_schema = pa.schema([
+                (column.name, next((t for sa_type, t in types.items() if isinstance(column.type, sa_type)), pa.string()))
+                for column in self.columns
+            ])
+        return self._arrow_schema
+
+    def _open(self):
+        self._sequence += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        name = f"{self.prefix}-{stamp}-{os.getpid()}-{self._sequence:04d}.{self.segment_format}"
+        self._path = os.path.join(self.directory, name)
+        self._opened_at = time.monotonic()
+        if self.segment_format == "jsonl":
+            self._file = open(f"{self._path}.open", "a", encoding="utf-8")
+        else:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(f"{self._path}.open", self._schema())
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        else:
+            return
+        os.replace(f"{self._path}.open", self._path)
+
+    def _is_open(self) -> bool:
+        return self._file is not None or self._writer is not None
+
+    def _size(self) -> int:
+        return os.path.getsize(f"{self._path}.open")
+
+    def write(self, records: list):
+        if not records:
+            return
+        with self._lock:
+            if self._is_open() and time.monotonic() - self._opened_at >= self.max_age_s:
+                self._close_segment()
+            if not self._is_open():
+                self._open()
+
+            if self.segment_format == "jsonl":
+                self._file.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+                self._file.flush()
+            else:
+                import pyarrow as pa
+
+                self._writer.write_table(pa.Table.from_pylist(records, schema=self._schema()))
+
+            if self._size() >= self.max_bytes:
+                self._close_segment()
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+def create_storage(backend: str, engine, table, **options):
+    """Builds a storage backend; `backend` is one of BACKENDS, or None to follow the engine's dialect."""
+    if backend is None:
+        backend = "postgres" if engine.dialect.name == "postgresql" else "sqlite"
+
+    if backend == "segments":
+        return SegmentStorage(table, **options)
+    if backend == "postgres":
+        if engine.dialect.name != "postgresql":
+            raise ValueError(f"Log storage 'postgres' needs a postgresql DATABASE_URL, got {engine.dialect.name}.")
+        return PostgresStorage(engine, table)
+    if backend == "sqlite":
+        # Any other SQLAlchemy database gets the plain executemany path
+        return SQLiteStorage(engine, table) if engine.dialect.name == "sqlite" else DatabaseStorage(engine, table)
+    raise ValueError(f"Unknown log storage backend '{backend}', expected one of {BACKENDS}.")
@@ -1,15 +1,27 @@
 # This script is developed to load the Iris dataset, preprocess it, and save it for further use.
 # It includes functions to load raw data, perform feature engineering, and save the processed data.
+# Processed data is written as CSV and also as Parquet and Arrow IPC for fast columnar reads.
+# Inputs larger than memory can be streamed in chunks, optionally across a process pool.
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from sklearn.datasets import load_iris
 from sklearn.preprocessing import StandardScaler
+from feature_transform import ARTIFACT_NAME as TRANSFORM_ARTIFACT
+from feature_transform import FEATURE_COLUMNS, RAW_COLUMNS, FeatureTransform, engineer
+import argparse
 import os
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Streamed inputs up to this many rows are fitted in one piece, matching the in-memory path bit for bit
+EXACT_ROWS = 1_000_000
+
 def get_data(output_path="data/raw"):
     """Loads Iris data from the API and saves it as a CSV."""
     logger.info("Loading Iris dataset from scikit-learn API")
@@ -25,31 +37,64 @@ def get_data(output_path="data/raw"):
     logger.info(f"Saving raw data to {file_path}")
     df.to_csv(file_path, index=False)
 
-def preprocess_data(input_path="data/raw/iris_raw.csv", output_path="data/processed"):
-    """Loads raw data, performs feature engineering and scaling, and saves it."""
-    logger.info(f"Loading raw data from {input_path}")
-    df = pd.read_csv(input_path)
+def save_columnar(df: pd.DataFrame, output_path: str, name: str):
+    """
+    Saves a frame as Parquet (compressed, for storage) and as an uncompressed Arrow IPC file,
+    which load_data can memory-map and read column by column without parsing.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    parquet_path = os.path.join(output_path, f"{name}.parquet")
+    logger.info(f"Saving Parquet to {parquet_path}")
+    pq.write_table(table, parquet_path)
+
+    arrow_path = os.path.join(output_path, f"{name}.arrow")
+    logger.info(f"Saving Arrow IPC to {arrow_path}")
+    with pa.OSFile(arrow_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
 
+def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Cleans column names and adds the engineered ratio and area columns (same code path as serving)."""
     # Clean column names
     df.columns = [col.replace(" (cm)", "").replace(" ", "_") for col in df.columns]
 
-    # Feature Engineering
-    logger.info("Performing feature engineering...")
-    df['Petal_ratio'] = df['petal_length'] / df['petal_width']
-    df['Sepal_area'] = df['sepal_length'] * df['sepal_width']
-    df['Petal_area'] = df['petal_length'] * df['petal_width']
+    engineered = engineer(df[RAW_COLUMNS].to_numpy())
+    for i, col in enumerate(FEATURE_COLUMNS[len(RAW_COLUMNS):], start=len(RAW_COLUMNS)):
+        df[col] = engineered[:, i]
+    return df
 
+def scale_features(df: pd.DataFrame, scaler: StandardScaler) -> pd.DataFrame:
+    """Applies a fitted scaler to the feature columns and adds the target back."""
     # Drop target_name before scaling (keep only numeric features)
     features = df.drop(columns=['target', 'target_name'])
+    df_scaled = pd.DataFrame(scaler.transform(features), columns=features.columns).astype("float64")
+
+    # Add target back
+    df_scaled['target'] = df['target'].astype("int64").to_numpy()
+    return df_scaled
+
+def preprocess_data(input_path="data/raw/iris_raw.csv", output_path="data/processed",
+                    chunksize: int = None, n_jobs: int = 1, exact_rows: int = EXACT_ROWS):
+    """
+    Loads raw data, performs feature engineering and scaling, and saves it as CSV, Parquet and Arrow.
+    With `chunksize`, the input is streamed so memory stays bounded by the chunk size and `exact_rows`
+    (see _preprocess_streaming); `n_jobs` > 1 processes chunks in a process pool.
+    """
+    if chunksize:
+        return _preprocess_streaming(input_path, output_path, chunksize, n_jobs, exact_rows)
+
+    logger.info(f"Loading raw data from {input_path}")
+    df = pd.read_csv(input_path)
+
+    # Feature Engineering
+    logger.info("Performing feature engineering...")
+    df = engineer_features(df)
 
     # Scaling
     logger.info("Scaling features...")
-    scaler = StandardScaler()
-    scaled_features = scaler.fit_transform(features)
-    df_scaled = pd.DataFrame(scaled_features, columns=features.columns)
-
-    # Add target back
-    df_scaled['target'] = df['target']
+    scaler = StandardScaler().fit(df.drop(columns=['target', 'target_name']))
+    df_scaled = scale_features(df, scaler)
 
     # Save to processed folder 
     os.makedirs(output_path, exist_ok=True)
@@ -57,7 +102,114 @@ def preprocess_data(input_path="data/raw/iris_raw.csv", output_path="data/proces
     
     logger.info(f"Saving cleaned and scaled data to {file_path}")
     df_scaled.to_csv(file_path, index=False)
+    save_columnar(df_scaled, output_path, "iris_cleaned")
+    save_transform(scaler, output_path)
+
+def save_transform(scaler: StandardScaler, output_path: str):
+    """Saves the fitted feature transform that serving applies to raw inputs."""
+    transform_path = os.path.join(output_path, TRANSFORM_ARTIFACT)
+    logger.info(f"Saving feature transform to {transform_path}")
+    FeatureTransform.from_scaler(scaler).save(transform_path)
+
+def _engineered_features(chunk: pd.DataFrame) -> pd.DataFrame:
+    return engineer_features(chunk).drop(columns=['target', 'target_name'])
+
+def _scaled_chunk(chunk: pd.DataFrame, scaler: StandardScaler) -> pd.DataFrame:
+    return scale_features(engineer_features(chunk), scaler)
+
+def _map_chunks(fn, chunks, n_jobs: int, *args):
+    """
+    Yields fn(chunk, *args) in input order. With n_jobs > 1, chunks run in a process pool
+    with at most 2 * n_jobs chunks in flight, so memory stays bounded.
+    """
+    if n_jobs <= 1:
+        for chunk in chunks:
+            yield fn(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(fn, chunk, *args))
+            if len(in_flight) >= 2 * n_jobs:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+def _fit_scaler(features_chunks, exact_rows: int) -> StandardScaler:
+    """
+    Fits the scaler on a stream of engineered feature chunks. Chunks are buffered while they total at most
+    `exact_rows` rows; if the stream ends by then, the scaler is fitted on them in one piece, exactly as the
+    in-memory path does. Otherwise the buffer is flushed into StandardScaler.partial_fit and the remaining
+    chunks follow, so memory stays bounded by `exact_rows` and the chunk size.
+    """
+    scaler = StandardScaler()
+    buffered, buffered_rows = [], 0
+    for features in features_chunks:
+        if buffered is None:
+            scaler.partial_fit(features)
+            continue
+        buffered.append(features)
+        buffered_rows += len(features)
+        if buffered_rows > exact_rows:
+            for part in buffered:
+                scaler.partial_fit(part)
+            buffered = None
+    if buffered:
+        scaler.fit(pd.concat(buffered, ignore_index=True))
+    return scaler
+
+def _preprocess_streaming(input_path: str, output_path: str, chunksize: int, n_jobs: int = 1,
+                          exact_rows: int = EXACT_ROWS):
+    """
+    Two-pass streaming preprocessing.
+    Pass 1 reads the input in chunks and fits the scaler (see _fit_scaler).
+    Pass 2 streams the input again, transforms each chunk and appends it to the CSV, Parquet and Arrow outputs.
+    Inputs of at most `exact_rows` rows give output identical to the in-memory path, bit for bit. Larger
+    inputs use running statistics, whose mean and scale differ from a single fit by floating-point rounding
+    only (relative differences around 1e-15), and so does the scaled output.
+    """
+    logger.info(f"Streaming raw data from {input_path} in chunks of {chunksize} rows")
+
+    # Pass 1: statistics
+    chunks = pd.read_csv(input_path, chunksize=chunksize)
+    scaler = _fit_scaler(_map_chunks(_engineered_features, chunks, n_jobs), exact_rows)
+    logger.info(f"Fitted scaler on {int(scaler.n_samples_seen_)} rows")
+    os.makedirs(output_path, exist_ok=True)
+    save_transform(scaler, output_path)
+
+    # Pass 2: transform and write chunk by chunk
+    csv_path = os.path.join(output_path, "iris_cleaned.csv")
+    parquet_path = os.path.join(output_path, "iris_cleaned.parquet")
+    arrow_path = os.path.join(output_path, "iris_cleaned.arrow")
+    logger.info(f"Saving cleaned and scaled data to {csv_path}, {parquet_path} and {arrow_path}")
+
+    parquet_writer = arrow_sink = arrow_writer = None
+    try:
+        chunks = pd.read_csv(input_path, chunksize=chunksize)
+        for i, df_scaled in enumerate(_map_chunks(_scaled_chunk, chunks, n_jobs, scaler)):
+            df_scaled.to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+
+            table = pa.Table.from_pandas(df_scaled, preserve_index=False)
+            if parquet_writer is None:
+                parquet_writer = pq.ParquetWriter(parquet_path, table.schema)
+                arrow_sink = pa.OSFile(arrow_path, "wb")
+                arrow_writer = pa.ipc.new_file(arrow_sink, table.schema)
+            parquet_writer.write_table(table)
+            arrow_writer.write_table(table)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+            arrow_writer.close()
+            arrow_sink.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunksize", type=int, default=None, help="stream the input in chunks of this many rows")
+    parser.add_argument("--n-jobs", type=int, default=1, help="processes used for chunk processing")
+    parser.add_argument("--exact-rows", type=int, default=EXACT_ROWS,
+                        help="streamed inputs up to this many rows match the in-memory output bit for bit")
+    args = parser.parse_args()
+
     get_data()
-    preprocess_data()
\ No newline at end of file
+    preprocess_data(chunksize=args.chunksize, n_jobs=args.n_jobs, exact_rows=args.exact_rows)
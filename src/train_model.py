@@ -1,14 +1,22 @@
 # This script is used to train and tune machine learning models using Optuna for hyperparameter optimization.
 # It loads the Iris dataset, splits it into training and validation sets, and optimizes multiple models.
-# The best model is registered in MLflow and promoted to production.
+# Trials can run concurrently, and model families can be tuned in parallel processes sharing a local Optuna storage.
+# Candidates are benchmarked for inference latency, and the model chosen by the selection policy
+# is registered in MLflow and promoted to production. Reference statistics of the training data are
+# logged with every model so serving can track drift.
+# With --incremental, only the Production model's family is re-tuned, in a search space narrowed around
+# its current params, on cached splits plus labeled prediction logs (see src/incremental.py).
 
-import pandas as pd
-import optuna
+import argparse
 import importlib
-import yaml
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import optuna
 import mlflow
 import mlflow.sklearn
-import time
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     accuracy_score,
@@ -17,134 +25,271 @@ from sklearn.metrics import (
     recall_score
 )
 from mlflow.tracking import MlflowClient
-from utils import load_config
+from data_loader import load_data
+from drift import ARTIFACT_NAME as DRIFT_ARTIFACT
+from drift import build_reference, save_reference
+from feature_transform import FEATURE_COLUMNS, RAW_COLUMNS, FeatureTransform
+from incremental import (
+    StageTimer, cached_splits, fold_in, labeled_rows, narrow_search_space, parse_params, production_run
+)
+from latency_benchmark import DEFAULT_BATCH_SIZES, benchmark_model, select_best
+from utils import load_config, sample_hyperparameters
 
-# Load config file
-config = load_config("src/config/model_config.yaml")
-models_config = config["models"]
-target_column = config["model"]["target_column"]
+BEST_MODEL_REGISTRY_NAME = "iris_best_model"
 
-# Load dataset from config
-df = pd.read_csv(config["data"]["processed"])
-X = df.drop(columns=[target_column])
-y = df[target_column]
 
-# Split data: train -> train + val, test 
-X_train_full, X_test, y_train_full, y_test = train_test_split(
-    X, y, test_size=config["model"]["test_size"], random_state=config["model"]["random_state"]
-)
-X_train, X_val, y_train, y_val = train_test_split(
-    X_train_full, y_train_full, test_size=0.25, random_state=42
-)
+def load_class(class_path: str):
+    """Resolves a dotted class path such as sklearn.svm.SVC."""
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def prepare_data(config: dict) -> dict:
+    """Loads the processed dataset and splits it into train/val/test."""
+    target_column = config["model"]["target_column"]
+    df = load_data(config, processed=True)
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    # Split data: train -> train + val, test
+    X_train_full, X_test, y_train_full, y_test = train_test_split(
+        X, y, test_size=config["model"]["test_size"], random_state=config["model"]["random_state"]
+    )
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train_full, y_train_full, test_size=0.25, random_state=42
+    )
+    return {
+        "X_train_full": X_train_full, "y_train_full": y_train_full,
+        "X_train": X_train, "y_train": y_train,
+        "X_val": X_val, "y_val": y_val,
+        "X_test": X_test, "y_test": y_test,
+    }
+
+
+def make_objective(ModelClass, search_space: dict, data: dict, prune_steps: int = 0):
+    """
+    Builds the Optuna objective for one model family.
+    For ensembles that support warm_start, the model is grown in `prune_steps` stages and the
+    validation F1 is reported after each stage so the pruner can stop unpromising trials early.
+    """
+    staged = prune_steps > 1 and "n_estimators" in search_space and "warm_start" in ModelClass().get_params()
 
-# Track best model across all candidates
-best_model_name = None
-best_model_score = -1  # Initialize with a low score
-best_inference_time = float('inf') # Initialize with a high value for comparison
-best_model_instance = None
-best_model_params = {}
-best_model_module_class = ""
-best_run_id = None
-
-# Set MLflow experiment
-mlflow.set_experiment(config["experiment"]["name"])
-
-# Loop through each model
-for model_name, model_info in models_config.items():
-    print(f"\n Tuning model: {model_name}")
-    
     def objective(trial):
-        trial_params = {}
-        search_space = model_info.get("optuna_search_space", {})
-        for param_name, param_def in search_space.items():
-            if param_def["type"] == "int":
-                trial_params[param_name] = trial.suggest_int(param_name, param_def["low"], param_def["high"])
-            elif param_def["type"] == "float":
-                trial_params[param_name] = trial.suggest_float(param_name, param_def["low"], param_def["high"], log=param_def.get("log", False))
-            elif param_def["type"] == "categorical":
-                trial_params[param_name] = trial.suggest_categorical(param_name, param_def["choices"])
-
-        # Dynamic model loading
-        module_name, class_name = model_info["class"].rsplit(".", 1)
-        ModelClass = getattr(importlib.import_module(module_name), class_name)
-        model = ModelClass(**trial_params)
-        model.fit(X_train, y_train)
-        preds = model.predict(X_val)
-        
-        # Use macro F1-score for optimization
-        f1_macro = f1_score(y_val, preds, average='macro')
+        trial_params = sample_hyperparameters(trial, search_space)
+
+        if not staged:
+            model = ModelClass(**trial_params)
+            model.fit(data["X_train"], data["y_train"])
+            preds = model.predict(data["X_val"])
+            # Use macro F1-score for optimization
+            return f1_score(data["y_val"], preds, average='macro')
+
+        n_estimators = trial_params["n_estimators"]
+        model = ModelClass(**dict(trial_params, warm_start=True))
+        for step in range(1, prune_steps + 1):
+            model.set_params(n_estimators=max(1, n_estimators * step // prune_steps))
+            model.fit(data["X_train"], data["y_train"])
+            preds = model.predict(data["X_val"])
+            f1_macro = f1_score(data["y_val"], preds, average='macro')
+            trial.report(f1_macro, step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
         return f1_macro
 
-    # Run Optuna study
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=20)
-
-    # Best from this model
-    model_best_params = study.best_params
-    model_best_score = study.best_value
-    print(f"{model_name} best F1-score: {model_best_score:.4f} with params: {model_best_params}")
-
-    # Train final model with best params
-    module_name, class_name = model_info["class"].rsplit(".", 1)
-    ModelClass = getattr(importlib.import_module(module_name), class_name)
-    final_model = ModelClass(**model_best_params)
-
-    # Log to MLflow
-    with mlflow.start_run(run_name=f"{model_name}_run") as run:
-        final_model.fit(X_train_full, y_train_full)
-        
-        # --- INFERENCE TIME MEASUREMENT ---
-        start_inference_time = time.time()
-        preds = final_model.predict(X_test)
-        inference_time = time.time() - start_inference_time
-        
-        # Calculate and log all key metrics
-        test_acc = accuracy_score(y_test, preds)
-        test_f1_macro = f1_score(y_test, preds, average='macro')
-        test_precision_macro = precision_score(y_test, preds, average='macro', zero_division=0)
-        test_recall_macro = recall_score(y_test, preds, average='macro')
-
-        mlflow.log_params(model_best_params)
-        mlflow.log_metric("test_accuracy", test_acc)
-        mlflow.log_metric("test_f1_macro", test_f1_macro)
-        mlflow.log_metric("test_precision_macro", test_precision_macro)
-        mlflow.log_metric("test_recall_macro", test_recall_macro)
-        mlflow.log_metric("inference_time", inference_time) # Log the new metric
-        mlflow.sklearn.log_model(final_model, "model")
-
-        print(f"Logged {model_name} to MLflow with metrics: Accuracy={test_acc:.4f}, F1={test_f1_macro:.4f}, Inference Time={inference_time:.4f}s")
-
-        # --- LOGIC FOR BEST MODEL SELECTION ---
-        # If the new model's F1-score is higher
-        if test_f1_macro > best_model_score:
-            best_model_score = test_f1_macro
-            best_model_name = model_name
-            best_inference_time = inference_time
-            best_model_instance = final_model
-            best_model_params = model_best_params
-            best_model_module_class = model_info["class"]
-            best_run_id = run.info.run_id
-        # OR if the F1-scores are tied, but the new model is faster
-        elif test_f1_macro == best_model_score and inference_time < best_inference_time:
-            best_model_score = test_f1_macro
-            best_model_name = model_name
-            best_inference_time = inference_time
-            best_model_instance = final_model
-            best_model_params = model_best_params
-            best_model_module_class = model_info["class"]
-            best_run_id = run.info.run_id
-
-
-# Register best model
-if best_model_instance:
-    print(f"\nBest model overall: {best_model_name} with F1-score {best_model_score:.4f} and Inference Time {best_inference_time:.4f}s")
-    model_uri = f"runs:/{best_run_id}/model"
-
-    BEST_MODEL_REGISTRY_NAME = "iris_best_model"
-
-    result = mlflow.register_model(model_uri=model_uri, name=BEST_MODEL_REGISTRY_NAME)
-
-    # Promote to Production 
+    return objective
+
+
+def tune_model(model_name: str, model_info: dict, data: dict, tuning_config: dict, study_suffix: str,
+               serial: bool = False, initial_params: dict = None) -> dict:
+    """
+    Runs the Optuna study for one model family and returns its best params and timing.
+    `initial_params` are tried first, e.g. the params of the model being refreshed.
+    """
+    model_tuning = model_info.get("tuning", {})
+    n_trials = model_tuning.get("n_trials", 20)
+    n_jobs = 1 if serial else model_tuning.get("n_jobs", 1)
+    timeout = model_tuning.get("timeout_s")
+    # The serial run is the baseline for --compare-serial, so it matches the original flow: no pruning
+    prune_steps = model_tuning.get("prune_steps", 0) if tuning_config.get("pruning", False) and not serial else 0
+
+    print(f"\n Tuning model: {model_name} ({n_trials} trials, n_jobs={n_jobs})")
+    ModelClass = load_class(model_info["class"])
+
+    storage = tuning_config.get("storage")
+    if storage and storage.startswith("sqlite"):
+        # Several processes write to the same SQLite file; wait on the lock instead of failing
+        storage = optuna.storages.RDBStorage(storage, engine_kwargs={"connect_args": {"timeout": 30}})
+
+    study = optuna.create_study(
+        direction="maximize",
+        study_name=f"{model_name}-{study_suffix}",
+        storage=storage,
+        load_if_exists=True,
+        pruner=optuna.pruners.MedianPruner(n_warmup_steps=1),
+    )
+    if initial_params:
+        study.enqueue_trial(initial_params)
+
+    start = time.perf_counter()
+    study.optimize(
+        make_objective(ModelClass, model_info.get("optuna_search_space", {}), data, prune_steps),
+        n_trials=n_trials,
+        n_jobs=n_jobs,
+        timeout=timeout,
+    )
+    wall_s = time.perf_counter() - start
+
+    pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in study.trials)
+    print(f"{model_name} best F1-score: {study.best_value:.4f} with params: {study.best_params} "
+          f"({len(study.trials)} trials, {pruned} pruned, {wall_s:.2f}s)")
+    result = {"best_params": study.best_params, "best_value": study.best_value, "wall_s": wall_s}
+
+    # Every run creates new studies; without this the shared storage grows with each one
+    if storage and not tuning_config.get("keep_studies", False):
+        optuna.delete_study(study_name=study.study_name, storage=storage)
+    return result
+
+
+def tune_all(models_config: dict, data: dict, tuning_config: dict, serial: bool = False) -> dict:
+    """
+    Tunes every model family. Families run in parallel processes when
+    tuning.parallel_models is set (and serial is False), otherwise one after another.
+    """
+    study_suffix = f"{int(time.time())}{'-serial' if serial else ''}"
+    start = time.perf_counter()
+
+    if serial or not tuning_config.get("parallel_models", False):
+        results = {
+            model_name: tune_model(model_name, model_info, data, tuning_config, study_suffix, serial)
+            for model_name, model_info in models_config.items()
+        }
+    else:
+        max_workers = tuning_config.get("max_workers") or min(len(models_config), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                model_name: pool.submit(tune_model, model_name, model_info, data, tuning_config, study_suffix)
+                for model_name, model_info in models_config.items()
+            }
+            results = {model_name: future.result() for model_name, future in futures.items()}
+
+    total_s = time.perf_counter() - start
+    print(f"\nTuning wall-clock time{' (serial)' if serial else ''}: {total_s:.2f}s")
+    return {"models": results, "wall_s": total_s}
+
+
+def log_feature_transform(config: dict):
+    """Logs the fitted feature transform next to the model, so serving applies the same scaling."""
+    transform_path = config["data"].get("feature_transform")
+    if transform_path and os.path.exists(transform_path):
+        mlflow.log_artifact(transform_path, artifact_path="model")
+    else:
+        print(f"Warning: feature transform not found at {transform_path}; serving will not scale inputs.")
+
+
+def save_drift_reference(config: dict, data: dict):
+    """
+    Saves reference statistics of the raw training features and labels for drift monitoring.
+    Returns the file path, or None when there is no feature transform to undo the scaling with.
+    """
+    transform_path = config["data"].get("feature_transform")
+    if not transform_path or not os.path.exists(transform_path):
+        print(f"Warning: feature transform not found at {transform_path}; no drift reference will be logged.")
+        return None
+
+    # Processed features are scaled, while serving sees raw measurements, so undo the scaling
+    transform = FeatureTransform.load(transform_path)
+    index = [FEATURE_COLUMNS.index(col) for col in RAW_COLUMNS]
+    raw = data["X_train_full"][RAW_COLUMNS].to_numpy() * transform.scale[index] + transform.mean[index]
+
+    bins = config.get("serving", {}).get("drift", {}).get("reference_bins", 10)
+    path = os.path.join(tempfile.mkdtemp(), DRIFT_ARTIFACT)
+    save_reference(build_reference(raw, data["y_train_full"], bins=bins), path)
+    return path
+
+
+def train_and_select(config: dict, models_config: dict, data: dict, tuning_results: dict):
+    """
+    Retrains each family with its best params, benchmarks its inference latency,
+    logs everything to MLflow and returns (candidate chosen by the selection policy, all candidates).
+    """
+    selection_config = config.get("selection", {})
+    candidates = []
+    drift_reference_path = save_drift_reference(config, data)
+
+    # Set MLflow experiment
+    mlflow.set_experiment(config["experiment"]["name"])
+
+    for model_name, model_info in models_config.items():
+        model_best_params = tuning_results[model_name]["best_params"]
+
+        # Train final model with best params
+        ModelClass = load_class(model_info["class"])
+        final_model = ModelClass(**model_best_params)
+
+        # Log to MLflow
+        with mlflow.start_run(run_name=f"{model_name}_run") as run:
+            final_model.fit(data["X_train_full"], data["y_train_full"])
+
+            # --- INFERENCE TIME MEASUREMENT ---
+            start_inference_time = time.perf_counter()
+            preds = final_model.predict(data["X_test"])
+            inference_time = time.perf_counter() - start_inference_time
+
+            # Calculate and log all key metrics
+            y_test = data["y_test"]
+            metrics = {
+                "test_accuracy": accuracy_score(y_test, preds),
+                "test_f1_macro": f1_score(y_test, preds, average='macro'),
+                "test_precision_macro": precision_score(y_test, preds, average='macro', zero_division=0),
+                "test_recall_macro": recall_score(y_test, preds, average='macro'),
+                "inference_time": inference_time,
+                "tuning_wall_time": tuning_results[model_name]["wall_s"],
+            }
+
+            # --- LATENCY BENCHMARK ---
+            metrics.update(benchmark_model(
+                final_model,
+                data["X_test"],
+                batch_sizes=selection_config.get("batch_sizes", DEFAULT_BATCH_SIZES),
+                warmup=selection_config.get("warmup", 10),
+                repeats=selection_config.get("repeats", 200),
+                max_seconds_per_size=selection_config.get("max_seconds_per_size", 2.0),
+            ))
+
+            mlflow.log_params(model_best_params)
+            mlflow.log_metrics(metrics)
+            mlflow.sklearn.log_model(final_model, "model")
+            log_feature_transform(config)
+            if drift_reference_path:
+                mlflow.log_artifact(drift_reference_path, artifact_path="model")
+
+            print(f"Logged {model_name} to MLflow with metrics: Accuracy={metrics['test_accuracy']:.4f}, "
+                  f"F1={metrics['test_f1_macro']:.4f}, p50/p99 single-row latency="
+                  f"{metrics['latency_p50_us_b1']:.1f}/{metrics['latency_p99_us_b1']:.1f}us")
+
+            candidates.append({"model_name": model_name, "run_id": run.info.run_id, "metrics": metrics})
+
+    # --- LOGIC FOR BEST MODEL SELECTION ---
+    return select_best(candidates, selection_config), candidates
+
+
+def register_best(best: dict):
+    """Registers the best run's model and promotes it to Production."""
+    if not best:
+        print("No model eligible for promotion; nothing registered.")
+        return
+
+    metrics = best["metrics"]
+    print(f"\nBest model overall: {best['model_name']} with F1-score {metrics['test_f1_macro']:.4f} "
+          f"and p99 single-row latency {metrics['latency_p99_us_b1']:.1f}us")
+    model_uri = f"runs:/{best['run_id']}/model"
+
+    # The model_family tag lets the API pick canary and shadow versions by family
+    result = mlflow.register_model(
+        model_uri=model_uri, name=BEST_MODEL_REGISTRY_NAME, tags={"model_family": best["model_name"]}
+    )
+
+    # Promote to Production
     client = MlflowClient()
     client.transition_model_version_stage(
         name=BEST_MODEL_REGISTRY_NAME,
@@ -154,5 +299,111 @@ if best_model_instance:
     )
 
     print(f"Model '{BEST_MODEL_REGISTRY_NAME}' version {result.version} promoted to Production")
-else:
-    print("No valid model found.")
\ No newline at end of file
+
+
+def register_candidates(candidates: list, best: dict):
+    """
+    Registers the other candidates as Staging versions tagged with their model family,
+    so the API can serve them as canaries or shadows next to the Production model.
+    """
+    client = MlflowClient()
+    for candidate in candidates:
+        if best and candidate["run_id"] == best["run_id"]:
+            continue
+        result = mlflow.register_model(
+            model_uri=f"runs:/{candidate['run_id']}/model", name=BEST_MODEL_REGISTRY_NAME,
+            tags={"model_family": candidate["model_name"]},
+        )
+        client.transition_model_version_stage(name=BEST_MODEL_REGISTRY_NAME, version=result.version, stage="Staging")
+        print(f"Candidate {candidate['model_name']} registered as version {result.version} (Staging)")
+
+
+def incremental_retrain(config: dict, timer: StageTimer):
+    """
+    Refreshes the Production model: re-tunes its family with a few trials in a search space narrowed
+    around its current params, on the cached splits plus labeled prediction logs, then registers
+    and promotes the result like a full run.
+    """
+    incremental_config = config.get("incremental", {})
+    target_column = config["model"]["target_column"]
+
+    with timer.stage("load_splits"):
+        data, hit = cached_splits(config, prepare_data, incremental_config.get("cache_dir", "data/cache"))
+        print(f"Splits {'loaded from the cache' if hit else 'prepared and cached'}")
+
+    if incremental_config.get("include_labeled_logs", True):
+        with timer.stage("labeled_rows"):
+            X_new, y_new = labeled_rows(
+                config["data"]["feature_transform"], target_column, incremental_config.get("max_labeled_rows")
+            )
+            data = fold_in(data, X_new, y_new)
+            print(f"Folded {len(X_new)} labeled prediction log rows into the training data")
+
+    with timer.stage("warm_start"):
+        production = production_run(BEST_MODEL_REGISTRY_NAME)
+        family = production["family"]
+        model_info = config["models"][family]
+        search_space = model_info.get("optuna_search_space", {})
+        current_params = parse_params(production["params"], search_space)
+        model_info = dict(
+            model_info,
+            optuna_search_space=narrow_search_space(
+                search_space, current_params, incremental_config.get("narrow_factor", 0.25)
+            ),
+            tuning=dict(model_info.get("tuning", {}), n_trials=incremental_config.get("n_trials", 5)),
+        )
+        print(f"Refreshing {family} (Production version {production['version']}) from params {current_params}")
+
+    with timer.stage("tune"):
+        tuning_results = {family: tune_model(
+            family, model_info, data, config.get("tuning", {}), f"{int(time.time())}-incremental",
+            initial_params=current_params,
+        )}
+
+    with timer.stage("train_and_register"):
+        best, _ = train_and_select(config, {family: model_info}, data, tuning_results)
+        register_best(best)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="src/config/model_config.yaml")
+    parser.add_argument("--compare-serial", action="store_true",
+                        help="also tune serially first and report the wall-clock speedup")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refresh the Production model instead of tuning every family from scratch")
+    args = parser.parse_args()
+
+    # Load config file
+    config = load_config(args.config)
+    models_config = config["models"]
+    tuning_config = config.get("tuning", {})
+    timer = StageTimer()
+
+    if args.incremental:
+        incremental_retrain(config, timer)
+        timer.report()
+        return
+
+    with timer.stage("load_splits"):
+        data = prepare_data(config)
+
+    serial_results = None
+    if args.compare_serial:
+        serial_results = tune_all(models_config, data, tuning_config, serial=True)
+
+    with timer.stage("tune"):
+        tuning_results = tune_all(models_config, data, tuning_config)
+    if serial_results is not None:
+        print(f"Speedup over serial tuning: {serial_results['wall_s'] / tuning_results['wall_s']:.2f}x")
+
+    with timer.stage("train_and_register"):
+        best, candidates = train_and_select(config, models_config, data, tuning_results["models"])
+        if best and config.get("selection", {}).get("register_candidates", False):
+            register_candidates(candidates, best)
+        register_best(best)
+    timer.report()
+
+
+if __name__ == "__main__":
+    main()
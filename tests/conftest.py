@@ -0,0 +1,81 @@
+# Shared fixtures for the test suite: import paths and the processed dataset.
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from src.utils import load_config  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def config() -> dict:
+    return load_config(os.path.join(project_root, "src/config/model_config.yaml"))
+
+
+@pytest.fixture(scope="session")
+def processed(config, tmp_path_factory) -> pd.DataFrame:
+    """The processed dataset, regenerated in a temp dir if DVC outputs are missing."""
+    path = os.path.join(project_root, config["data"]["processed"])
+    if not os.path.exists(path):
+        from src.preprocess import get_data, preprocess_data
+        tmp = tmp_path_factory.mktemp("data")
+        get_data(str(tmp / "raw"))
+        preprocess_data(str(tmp / "raw" / "iris_raw.csv"), str(tmp / "processed"))
+        path = str(tmp / "processed" / "iris_cleaned.csv")
+    return pd.read_csv(path)
+
+
+@pytest.fixture(scope="session")
+def iris_raw():
+    """The raw Iris measurements (n, 4) in RAW_COLUMNS order, and their classes."""
+    from sklearn.datasets import load_iris
+
+    iris = load_iris()
+    return iris.data.astype("float64"), iris.target
+
+
+@pytest.fixture(scope="session")
+def serving(iris_raw):
+    """A served model as the API sees it: a LogisticRegression fitted on the engineered features, no transform."""
+    from types import SimpleNamespace
+
+    from sklearn.linear_model import LogisticRegression
+
+    from src.feature_transform import FEATURE_COLUMNS, engineer
+
+    raw, y = iris_raw
+    model = LogisticRegression(max_iter=1000).fit(pd.DataFrame(engineer(raw), columns=FEATURE_COLUMNS), y)
+    return SimpleNamespace(model=model, transform=None, version="1")
+
+
+@pytest.fixture
+def api(serving, monkeypatch):
+    """
+    A TestClient for the API serving `serving`, without the lifespan startup: the model manager is
+    stubbed and prediction logs are collected in `api.logged` instead of the log storage.
+    """
+    from types import SimpleNamespace
+
+    from fastapi.testclient import TestClient
+
+    from src.api import app as api_module
+
+    logged = []
+    monkeypatch.setattr(api_module, "models", SimpleNamespace(current=serving))
+    monkeypatch.setattr(api_module, "log_prediction", lambda *args, **kwargs: logged.append(("prediction", args or kwargs)))
+    monkeypatch.setattr(api_module, "log_error", lambda *args, **kwargs: logged.append(("error", args or kwargs)))
+    monkeypatch.setattr(api_module, "log_predictions", lambda *args, **kwargs: logged.append(("predictions", args or kwargs)))
+    monkeypatch.setattr(api_module, "log_errors", lambda *args, **kwargs: logged.append(("errors", args or kwargs)))
+    monkeypatch.setattr(api_module, "log_prediction_array", lambda *args, **kwargs: logged.append(("prediction_array", args or kwargs)))
+    api_module._ready.set()
+    client = TestClient(api_module.create_app())
+    client.logged = logged
+    yield client
+    api_module._ready.clear()
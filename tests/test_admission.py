@@ -0,0 +1,74 @@
+# Checks the admission controller and middleware (src/api/admission.py).
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.api.admission import DEADLINE, QUEUE_FULL, QUEUE_TIMEOUT, AdmissionController, AdmissionMiddleware
+
+
+def test_default_paths_cover_every_prediction_route():
+    assert AdmissionController().paths == {"/predict", "/predict/batch", "/predict/bulk"}
+
+
+def test_shed_reasons():
+    async def scenario():
+        controller = AdmissionController(initial_limit=1, max_queue=1, max_queue_wait_ms=50)
+        assert await controller.acquire() is None
+        now = time.monotonic()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        # The queue holds one request; the next is shed at once
+        assert await controller.acquire() == QUEUE_FULL
+        assert await waiting == QUEUE_TIMEOUT
+        # A deadline shorter than max_queue_wait, or already passed, is what the request runs out of
+        assert await controller.acquire(now + 0.01) == DEADLINE
+        assert await controller.acquire(now - 1) == DEADLINE
+        assert await controller.acquire(time.monotonic() + 5) == QUEUE_TIMEOUT
+
+    asyncio.run(scenario())
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        controller = AdmissionController(initial_limit=1, max_queue_wait_ms=1000)
+        assert await controller.acquire() is None
+        first = asyncio.ensure_future(controller.acquire())
+        second = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        controller.release()
+        assert await first is None
+        assert not second.done()
+        controller.release()
+        assert await second is None
+        assert controller.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_middleware_sheds_with_503():
+    controller = AdmissionController(paths=["/slow"], initial_limit=1, max_queue=0, retry_after_s=3)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=lambda: controller)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            admitted = asyncio.ensure_future(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            overloaded = await client.get("/slow")
+            expired = await client.get("/slow", headers={"X-Request-Timeout-Ms": "0"})
+            return await admitted, overloaded, expired
+
+    admitted, overloaded, expired = asyncio.run(scenario())
+    assert admitted.status_code == 200
+    assert overloaded.status_code == 503 and overloaded.headers["Retry-After"] == "3"
+    assert expired.status_code == 503 and "Retry-After" not in expired.headers
+    assert "deadline" in expired.json()["detail"]
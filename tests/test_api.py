@@ -0,0 +1,106 @@
+# Checks the prediction endpoints of src/api/app.py against a stubbed model manager.
+
+import json
+
+import numpy as np
+
+from src.api.predict import predict_batch, raw_columns
+
+GOOD = {"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2}
+
+
+def post_json(api, path: str, payload):
+    # json.dumps writes NaN and Infinity, which the API's JSON parser accepts
+    return api.post(path, content=json.dumps(payload), headers={"Content-Type": "application/json"})
+
+
+def test_predict(api, serving):
+    response = post_json(api, "/predict", GOOD)
+    assert response.status_code == 200
+    expected = predict_batch(serving.model, np.array([[GOOD[col] for col in raw_columns]]))[0]
+    assert response.json() == {"prediction": int(expected)}
+
+
+def test_predict_rejects_non_finite_features(api):
+    for value in (float("nan"), float("inf"), float("-inf")):
+        response = post_json(api, "/predict", dict(GOOD, petal_width=value))
+        assert response.status_code == 422
+
+
+def test_batch_reports_bad_rows_and_scores_the_rest(api, serving, iris_raw):
+    raw, _ = iris_raw
+    rows = [dict(zip(raw_columns, row)) for row in raw[:5].tolist()]
+    rows[1] = dict(rows[1], sepal_length=float("nan"))
+    rows[3] = dict(rows[3], petal_length=float("inf"))
+    response = post_json(api, "/predict/batch", rows)
+    assert response.status_code == 200
+
+    body = response.json()
+    good = [0, 2, 4]
+    expected = predict_batch(serving.model, raw[good]).tolist()
+    assert [body["predictions"][i] for i in good] == expected
+    assert body["predictions"][1] is None and body["predictions"][3] is None
+    assert [error["index"] for error in body["errors"]] == [1, 3]
+
+
+def test_columnar_batch(api, serving, iris_raw):
+    raw, _ = iris_raw
+    payload = {col: raw[:3, i].tolist() for i, col in enumerate(raw_columns)}
+    response = post_json(api, "/predict/batch", payload)
+    assert response.status_code == 200
+    assert response.json() == {"predictions": predict_batch(serving.model, raw[:3]).tolist(), "errors": []}
+
+
+def test_bulk_scores_raw_float32_rows(api, serving, iris_raw):
+    raw, _ = iris_raw
+    rows = raw[:6].copy()
+    rows[2, 0] = np.nan
+    response = api.post("/predict/bulk", content=rows.astype("<f4").tobytes(),
+                        headers={"Content-Type": "application/octet-stream", "Accept": "application/json"})
+    assert response.status_code == 200
+    assert response.headers["X-Invalid-Rows"] == "1"
+    predictions = response.json()["predictions"]
+    good = [0, 1, 3, 4, 5]
+    expected = predict_batch(serving.model, rows[good].astype("<f4").astype(np.float64)).tolist()
+    assert [predictions[i] for i in good] == expected and predictions[2] is None
+
+
+def test_bulk_rejects_oversized_body_before_reading_it(api, monkeypatch):
+    from src.api import app as api_module
+    from src.api import bulk_formats
+
+    monkeypatch.setattr(api_module, "bulk_max_rows", 10)
+    limit = bulk_formats.max_body_bytes(10, bulk_formats.RAW_FLOAT32)
+    read = []
+
+    def body():
+        read.append(True)
+        yield b"\0" * (limit + 16)
+
+    response = api.post("/predict/bulk", content=body(), headers={
+        "Content-Type": "application/octet-stream", "Content-Length": str(limit + 16),
+    })
+    assert response.status_code == 413
+    assert not read
+
+
+def test_bulk_rejects_oversized_chunked_body(api, monkeypatch):
+    from src.api import app as api_module
+
+    monkeypatch.setattr(api_module, "bulk_max_rows", 10)
+    # Not a whole number of rows either: without the size limit it would be decoded and rejected with 422
+    chunks = (b"\0" * 65531 for _ in range(63))
+    response = api.post("/predict/bulk", content=chunks, headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 413
+
+
+def test_bulk_logs_undecodable_body(api):
+    response = api.post("/predict/bulk", content=b"\0" * 5, headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 422
+    assert [kind for kind, _ in api.logged] == ["error"]
+
+
+def test_predict_rejects_a_body_that_is_not_json(api):
+    response = api.post("/predict", content=b"sepal_length=5.1", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 422
+    assert [kind for kind, _ in api.logged] == ["error"]
@@ -0,0 +1,40 @@
+# Checks that the micro-batcher (src/api/batching.py) gives each caller its own result.
+
+import asyncio
+from types import SimpleNamespace
+
+from src.api.batching import MicroBatcher
+from src.api.predict import predict_batch, raw_columns
+
+
+async def submit_together(batcher: MicroBatcher, rows: list) -> list:
+    """Submits `rows` within one batching window; returns (prediction, version) or the exception per row."""
+    try:
+        return await asyncio.gather(
+            *[batcher.submit(dict(zip(raw_columns, row))) for row in rows], return_exceptions=True
+        )
+    finally:
+        await batcher.close()
+
+
+def test_window_results_match_batch_prediction(serving, iris_raw):
+    raw, _ = iris_raw
+    rows = raw[::15]
+    batcher = MicroBatcher(SimpleNamespace(current=serving), window_ms=50)
+    results = asyncio.run(submit_together(batcher, rows.tolist()))
+
+    assert [prediction for prediction, _ in results] == predict_batch(serving.model, rows).tolist()
+    assert {version for _, version in results} == {serving.version}
+
+
+def test_bad_row_fails_only_its_request(serving, iris_raw):
+    raw, _ = iris_raw
+    rows = raw[:4].tolist()
+    rows[2] = [float("nan")] * len(raw_columns)
+    batcher = MicroBatcher(SimpleNamespace(current=serving), window_ms=50)
+    results = asyncio.run(submit_together(batcher, rows))
+
+    assert isinstance(results[2], ValueError)
+    good = [0, 1, 3]
+    expected = predict_batch(serving.model, raw[good]).tolist()
+    assert [results[i][0] for i in good] == expected
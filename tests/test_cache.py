@@ -0,0 +1,107 @@
+# Checks the prediction cache (src/api/cache.py): hits, LRU and TTL eviction, version keys and the shared backend.
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.api import cache as cache_module
+from src.api.cache import LocalCache, PredictionCache
+
+ROW = {"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2}
+OTHER = dict(ROW, petal_length=4.5)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the cache's clocks with one the test moves forward."""
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now.t, time=lambda: now.t))
+    return now
+
+
+def test_hit_after_set():
+    cache = PredictionCache()
+    assert cache.get(ROW, "1") is None
+    cache.set(ROW, "1", 0)
+    assert cache.get(ROW, "1") == 0
+    assert cache.get(OTHER, "1") is None
+
+
+def test_quantized_keys_share_entries():
+    cache = PredictionCache(quantize_decimals=1)
+    cache.set(ROW, "1", 0)
+    assert cache.get(dict(ROW, sepal_length=5.1004), "1") == 0
+    assert cache.get(dict(ROW, sepal_length=5.2), "1") is None
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LocalCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_entries_expire(clock):
+    cache = LocalCache(ttl_s=10)
+    cache.set("a", 1)
+    clock.t += 9
+    assert cache.get("a") == 1
+    clock.t += 2
+    assert cache.get("a") is None
+
+
+def test_versions_are_keyed_separately():
+    # Production and a canary are cached side by side; a new version never sees the old one's entries
+    cache = PredictionCache()
+    cache.set(ROW, "1", 0)
+    cache.set(ROW, "2", 1)
+    assert cache.get(ROW, "1") == 0
+    assert cache.get(ROW, "2") == 1
+    assert cache.get(ROW, "3") is None
+
+
+def test_shared_backend_serves_other_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer, reader = PredictionCache(shared_path=path), PredictionCache(shared_path=path)
+    writer.set(ROW, "1", 2)
+
+    assert reader.get(ROW, "1") == 2
+    # Shared values come back as text and are converted, then kept in the local layer
+    assert reader.local.get(reader.key(ROW, "1")) == 2
+    assert reader.get(ROW, "2") is None
+
+
+def test_shared_entries_expire(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    writer, reader = PredictionCache(shared_path=path, ttl_s=10), PredictionCache(shared_path=path, ttl_s=10)
+    writer.set(ROW, "1", 2)
+    clock.t += 11
+    assert reader.get(ROW, "1") is None
+
+
+def test_shared_backend_failure_is_a_miss(tmp_path):
+    cache = PredictionCache(shared_path=str(tmp_path / "cache.db"))
+    cache.shared._connect().execute("DROP TABLE prediction_cache")
+    cache.set(ROW, "1", 0)
+    cache.local.clear()
+    assert cache.get(ROW, "1") is None
+
+
+def test_reload_does_not_serve_the_previous_versions_predictions(api, serving, monkeypatch):
+    from src.api import app as api_module
+
+    cache = PredictionCache()
+    monkeypatch.setattr(api_module, "prediction_cache", cache)
+    expected = api.post("/predict", json=ROW).json()["prediction"]
+
+    # A cached answer is served while the version is unchanged ...
+    cache.set(ROW, serving.version, expected + 1)
+    assert api.post("/predict", json=ROW).json()["prediction"] == expected + 1
+
+    # ... and ignored once a reload swaps in another version
+    api_module.models.current = SimpleNamespace(model=serving.model, transform=None, version="2")
+    assert api.post("/predict", json=ROW).json()["prediction"] == expected
+    assert cache.get(ROW, "2") == expected
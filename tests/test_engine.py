@@ -0,0 +1,90 @@
+# Checks that compiled estimators (src/api/engine.py) predict exactly what model.predict does.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.engine import compile_estimator
+from src.model_builder import get_model
+
+SUPPORTED_MODELS = ["logistic_regression", "decision_tree", "random_forest"]
+
+
+@pytest.fixture(scope="module")
+def dataset(config, processed):
+    target_column = config["model"]["target_column"]
+    return processed.drop(columns=[target_column]), processed[target_column]
+
+
+@pytest.fixture(scope="module", params=SUPPORTED_MODELS)
+def fitted(request, config, dataset):
+    X, y = dataset
+    return get_model(request.param, config["models"][request.param]["params"]).fit(X, y)
+
+
+def test_batch_parity(fitted, dataset):
+    X, _ = dataset
+    compiled = compile_estimator(fitted, list(X.columns))
+    np.testing.assert_array_equal(compiled.predict(X.values), fitted.predict(X))
+
+
+def test_single_row_parity(fitted, dataset):
+    X, _ = dataset
+    compiled = compile_estimator(fitted, list(X.columns))
+    for i in range(len(X)):
+        row = X.values[i]
+        assert compiled.predict(row)[0] == fitted.predict(X.iloc[[i]])[0]
+
+
+def test_synthetic_batch_parity(fitted, dataset):
+    # Rows around the data, so thresholds and decision boundaries are crossed from both sides
+    X, _ = dataset
+    rng = np.random.default_rng(0)
+    synthetic = rng.normal(size=(4096, X.shape[1])) * X.values.std(axis=0) + X.values.mean(axis=0)
+    compiled = compile_estimator(fitted, list(X.columns))
+    np.testing.assert_array_equal(
+        compiled.predict(synthetic), fitted.predict(pd.DataFrame(synthetic, columns=X.columns))
+    )
+
+
+def test_serving_column_order(fitted, dataset):
+    X, _ = dataset
+    columns = list(X.columns)[::-1]
+    compiled = compile_estimator(fitted, columns)
+    np.testing.assert_array_equal(compiled.predict(X[columns].values), fitted.predict(X))
+
+
+def test_unsupported_estimator():
+    from sklearn.neighbors import KNeighborsClassifier
+
+    with pytest.raises(ValueError):
+        compile_estimator(KNeighborsClassifier())
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_non_finite_input_like_sklearn(fitted, dataset, value):
+    # sklearn rejects infinity, and NaN for linear models; its trees route NaN down a learned branch
+    X, _ = dataset
+    bad = X.iloc[::10].copy()
+    bad.iloc[1::2, 0] = value
+    bad.iloc[2::3, 3] = value
+    compiled = compile_estimator(fitted, list(X.columns))
+    try:
+        expected = fitted.predict(bad)
+    except ValueError:
+        with pytest.raises(ValueError):
+            compiled.predict(bad.values)
+        with pytest.raises(ValueError):
+            compiled.predict(bad.values[1])
+        return
+    np.testing.assert_array_equal(compiled.predict(bad.values), expected)
+    assert compiled.predict(bad.values[1])[0] == expected[1]
+
+
+def test_nan_raises_for_linear_models(dataset):
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = dataset
+    compiled = compile_estimator(LogisticRegression(max_iter=1000).fit(X, y))
+    with pytest.raises(ValueError):
+        compiled.predict(np.full(X.shape[1], np.nan))
@@ -0,0 +1,47 @@
+# Checks that streaming preprocessing (src/preprocess.py) matches the in-memory path.
+
+import filecmp
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocess import get_data, preprocess_data
+
+
+@pytest.fixture(scope="module")
+def raw_csv(tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp("raw")
+    get_data(str(path))
+    return str(path / "iris_raw.csv")
+
+
+@pytest.fixture(scope="module")
+def in_memory(raw_csv, tmp_path_factory):
+    output = tmp_path_factory.mktemp("in_memory")
+    preprocess_data(raw_csv, str(output))
+    return output
+
+
+@pytest.mark.parametrize("chunksize, n_jobs", [(40, 1), (40, 2), (1000, 1)])
+def test_streaming_is_bit_for_bit_on_small_inputs(raw_csv, in_memory, tmp_path, chunksize, n_jobs):
+    preprocess_data(raw_csv, str(tmp_path), chunksize=chunksize, n_jobs=n_jobs)
+    for name in ("iris_cleaned.csv", "feature_transform.json"):
+        assert filecmp.cmp(in_memory / name, tmp_path / name, shallow=False), name
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(tmp_path / "iris_cleaned.parquet"), pd.read_parquet(in_memory / "iris_cleaned.parquet")
+    )
+
+
+def test_running_statistics_within_tolerance(raw_csv, in_memory, tmp_path):
+    # Past exact_rows, statistics are accumulated chunk by chunk and differ by rounding only
+    preprocess_data(raw_csv, str(tmp_path), chunksize=40, exact_rows=0)
+    expected = json.loads((in_memory / "feature_transform.json").read_text())
+    actual = json.loads((tmp_path / "feature_transform.json").read_text())
+    for key in ("mean", "scale"):
+        np.testing.assert_allclose(actual[key], expected[key], rtol=1e-12)
+    np.testing.assert_allclose(
+        pd.read_csv(tmp_path / "iris_cleaned.csv").values, pd.read_csv(in_memory / "iris_cleaned.csv").values,
+        rtol=1e-12, atol=1e-12,
+    )